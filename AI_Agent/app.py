@@ -1,8 +1,16 @@
 import logging
+import time
 import uuid
 
+from AI_Agent.graph.deadline import deadline_after
 from AI_Agent.graph.graph import build_graph
+from AI_Agent.graph.nodes.intent import _heuristic_intent
+from AI_Agent.graph.nodes.retrieval import CODE_CHANGE_INTENTS
 from AI_Agent.memory.store import memory
+from AI_Agent.schemas.intent import Intent
+from backend.infra.generation import index_generation
+from backend.tasks.query.answer.semantic_cache import SEMANTIC_CACHE_ENABLED, lookup_answer, store_answer
+from backend.tasks.query.rag.embed_query import aembed_query, embed_query
 
 
 # Configure logger
@@ -14,26 +22,12 @@ if not logger.handlers:
     )
 
 
-def run_agent(user_query: str, repo_url: str, session_id: str | None = None):
-    """
-    Runs the agent graph with conversational memory support.
-    """
-
-    # 🔹 Ensure session_id exists
-    session_id = session_id or str(uuid.uuid4())
-
-    # 🔹 Load previous conversation history
-    previous_history = memory.get_history(session_id)
-
-    # 🔹 Build graph
-    graph = build_graph()
-
-    # 🔹 Construct initial state
-    initial_state = {
+def _initial_state(user_query: str, repo_url: str, session_id: str, deadline_ms: float | None = None) -> dict:
+    return {
         "user_query": user_query,
         "repo_url": repo_url,
         "session_id": session_id,
-        "chat_history": previous_history,  # ✅ conversational memory injected
+        "chat_history": memory.get_history(session_id),  # ✅ conversational memory injected
         "intent": None,
         "plan": None,
         "retrieved_chunks": [],
@@ -42,18 +36,87 @@ def run_agent(user_query: str, repo_url: str, session_id: str | None = None):
         "explanation": None,
         "proposed_diff_id": None,
         "approved": False,
+        "deadline": deadline_after(deadline_ms),
+        "skipped_stages": [],
     }
 
-    logger.info(
-        "session=%s agent_run_start user_query=%r repo_url=%s",
-        session_id,
-        user_query,
-        repo_url,
+
+def _cacheable(state: dict) -> bool:
+    # Follow-ups depend on the conversation, so only first questions are shared.
+    if not SEMANTIC_CACHE_ENABLED or state.get("chat_history"):
+        return False
+    # Same classification the intent node starts from: code changes must reach the
+    # propose step, and Locate answers come from the symbol indexes without an embedding.
+    # Queries it cannot classify might be change requests, so they are not shared.
+    intent = _heuristic_intent(state["user_query"])
+    return intent is not None and intent not in CODE_CHANGE_INTENTS and intent != Intent.LOCATE
+
+
+def _lookup_cached(state: dict, embedding) -> dict | None:
+    """
+    Looks up an earlier answer to a near-identical question on the same repo
+    index. Returns the lookup context `_store_cached` needs, with the answer
+    already placed in `state["explanation"]` on a hit.
+    """
+    if not embedding:
+        return None
+
+    lookup = {"embedding": embedding, "generation": index_generation(state["repo_url"]), "hit": False}
+    hit = lookup_answer("agent", state["repo_url"], embedding, state["user_query"])
+    if hit is not None:
+        state["explanation"] = hit.answer
+        lookup["hit"] = True
+        logger.info(
+            "session=%s agent_semantic_cache_hit similarity=%.4f cached_question=%r",
+            state["session_id"],
+            hit.similarity,
+            hit.cached_question,
+        )
+    return lookup
+
+
+def _embed_for_cache(state: dict):
+    if not _cacheable(state):
+        return None
+    try:
+        # Same cached embedding the retrieval step uses for a history-free question.
+        return embed_query(state["user_query"])
+    except Exception as exc:
+        logger.warning("session=%s semantic_cache_skipped error=%s", state["session_id"], exc)
+        return None
+
+
+async def _aembed_for_cache(state: dict):
+    if not _cacheable(state):
+        return None
+    try:
+        return await aembed_query(state["user_query"])
+    except Exception as exc:
+        logger.warning("session=%s semantic_cache_skipped error=%s", state["session_id"], exc)
+        return None
+
+
+def _store_cached(state: dict, lookup: dict | None) -> None:
+    # Code changes, degraded (deadline-trimmed) answers and empty answers are not reused.
+    if (
+        lookup is None
+        or state.get("intent") in CODE_CHANGE_INTENTS
+        or state.get("proposed_diff_id")
+        or state.get("skipped_stages")
+        or not state.get("explanation")
+    ):
+        return
+    store_answer(
+        "agent",
+        state["repo_url"],
+        lookup["embedding"],
+        state["user_query"],
+        state["explanation"],
+        generation=lookup["generation"],
     )
 
-    # 🔹 Run agent graph
-    state = graph.invoke(initial_state)
 
+def _finish_run(state: dict, session_id: str, user_query: str) -> dict:
     explanation = state.get("explanation") or ""
 
     # 🔹 Store turn in memory
@@ -61,15 +124,129 @@ def run_agent(user_query: str, repo_url: str, session_id: str | None = None):
         memory.add_turn(session_id, user_query, explanation)
 
     logger.info(
-        "session=%s agent_run_end intent=%s approved=%s",
+        "session=%s agent_run_end intent=%s approved=%s skipped_stages=%s",
         session_id,
         getattr(state.get("intent"), "value", state.get("intent")),
         state.get("approved"),
+        state.get("skipped_stages") or [],
     )
 
     return state
 
 
+def run_agent(
+    user_query: str,
+    repo_url: str,
+    session_id: str | None = None,
+    deadline_ms: float | None = None,
+):
+    """
+    Runs the agent graph with conversational memory support.
+
+    `deadline_ms` bounds the run (default `AGENT_DEADLINE_MS`); stages that
+    would overrun it are skipped or shortened and listed in `skipped_stages`.
+    """
+
+    # 🔹 Ensure session_id exists
+    session_id = session_id or str(uuid.uuid4())
+
+    logger.info(
+        "session=%s agent_run_start user_query=%r repo_url=%s",
+        session_id,
+        user_query,
+        repo_url,
+    )
+
+    state = _initial_state(user_query, repo_url, session_id, deadline_ms)
+    lookup = _lookup_cached(state, _embed_for_cache(state))
+    if lookup and lookup["hit"]:
+        return _finish_run(state, session_id, user_query)
+
+    # 🔹 Run agent graph
+    state = build_graph().invoke(state)
+    _store_cached(state, lookup)
+    return _finish_run(state, session_id, user_query)
+
+
+async def arun_agent(
+    user_query: str,
+    repo_url: str,
+    session_id: str | None = None,
+    deadline_ms: float | None = None,
+):
+    """
+    Async twin of `run_agent`, used by the API so slow model calls do not hold a worker thread.
+    """
+    session_id = session_id or str(uuid.uuid4())
+
+    logger.info(
+        "session=%s agent_run_start user_query=%r repo_url=%s",
+        session_id,
+        user_query,
+        repo_url,
+    )
+
+    state = _initial_state(user_query, repo_url, session_id, deadline_ms)
+    lookup = _lookup_cached(state, await _aembed_for_cache(state))
+    if lookup and lookup["hit"]:
+        return _finish_run(state, session_id, user_query)
+
+    state = await build_graph().ainvoke(state)
+    _store_cached(state, lookup)
+    return _finish_run(state, session_id, user_query)
+
+
+async def astream_agent(
+    user_query: str,
+    repo_url: str,
+    session_id: str | None = None,
+    deadline_ms: float | None = None,
+):
+    """
+    Streaming twin of `arun_agent`: yields `(event, data)` pairs for the SSE
+    endpoint and stores the finished answer in memory like a regular run.
+    """
+    session_id = session_id or str(uuid.uuid4())
+    started = time.perf_counter()
+    first_token = True
+
+    logger.info(
+        "session=%s agent_stream_start user_query=%r repo_url=%s",
+        session_id,
+        user_query,
+        repo_url,
+    )
+    yield "session", {"session_id": session_id}
+
+    state = _initial_state(user_query, repo_url, session_id, deadline_ms)
+    lookup = _lookup_cached(state, await _aembed_for_cache(state))
+    if lookup and lookup["hit"]:
+        state = _finish_run(state, session_id, user_query)
+        yield "token", {"text": state["explanation"]}
+        yield "done", {"session_id": session_id, "answer": state["explanation"], "skipped_stages": []}
+        return
+
+    async for event, data in build_graph().astream(state):
+        if event == "final":
+            _store_cached(data, lookup)
+            state = _finish_run(data, session_id, user_query)
+            yield "done", {
+                "session_id": session_id,
+                "answer": state.get("explanation") or "",
+                "skipped_stages": state.get("skipped_stages") or [],
+            }
+            return
+
+        if event == "token" and first_token:
+            first_token = False
+            logger.info(
+                "session=%s agent_stream_first_token ttft_ms=%.1f",
+                session_id,
+                (time.perf_counter() - started) * 1000,
+            )
+        yield event, data
+
+
 if __name__ == "__main__":
     repo = input("GitHub repo URL: ")
     query = input("Ask the agent: ")
@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import List, Optional
+
+from AI_Agent.graph.state import AgentState
+from AI_Agent.schemas.chunk import Chunk
+
+
+# A top hit at least this similar to the query is treated as a confident match.
+CONFIDENT_SCORE = float(os.getenv("CONFIDENT_SCORE", "0.65"))
+# Chunks scoring more than this below the top hit are dropped from the context.
+SCORE_MARGIN = float(os.getenv("SCORE_MARGIN", "0.12"))
+MIN_KEPT_CHUNKS = int(os.getenv("MIN_KEPT_CHUNKS", "2"))
+# Answer length for confident, narrow questions (a couple of closely matching chunks).
+CONFIDENT_MAX_TOKENS = int(os.getenv("CONFIDENT_MAX_TOKENS", "120"))
+ADAPTIVE_PIPELINE = os.getenv("ADAPTIVE_PIPELINE", "true").lower() == "true"
+
+# Chunk types same-file expansion would fetch; kept with any file that keeps a chunk.
+HEADER_TYPES = {"imports", "class_header", "class"}
+
+logger = logging.getLogger("ai_agent.confidence")
+
+_stats_lock = threading.Lock()
+_decisions: Counter = Counter()
+_latency: dict = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+
+def _is_header(chunk: Chunk) -> bool:
+    return (chunk.code_type or "").split(":")[-1] in HEADER_TYPES
+
+
+def _covers_headers(kept: List[Chunk], retrieved: List[Chunk]) -> bool:
+    """
+    True when every file in `kept` already has its imports in `retrieved`,
+    plus its class header whenever a kept chunk is a method.
+
+    Those are exactly the regions same-file expansion would fetch.
+    """
+    by_file = defaultdict(set)
+    for c in retrieved:
+        by_file[c.file_path].add((c.code_type or "").split(":")[-1])
+
+    for c in kept:
+        present = by_file[c.file_path]
+        if "imports" not in present:
+            return False
+        is_method = len(c.symbols or []) > 1
+        if is_method and not present & {"class_header", "class"}:
+            return False
+    return True
+
+
+def assess_retrieval(state: AgentState) -> Optional[dict]:
+    """
+    Decides from the retrieval scores whether expansion is worth its round
+    trips, which chunks are close enough to the top hit to keep, and whether
+    a shorter answer will do. The decision is stored in `state["confidence"]`.
+
+    Returns None (and changes nothing) when the chunks carry no scores.
+    """
+    chunks = state.get("retrieved_chunks") or []
+    scored = [c for c in chunks if c.score is not None]
+    if not ADAPTIVE_PIPELINE or not scored:
+        return None
+
+    scored.sort(key=lambda c: c.score, reverse=True)
+    top = scored[0].score
+    kept = [c for c in scored if c.score >= top - SCORE_MARGIN]
+    if len(kept) < MIN_KEPT_CHUNKS:
+        kept = scored[:MIN_KEPT_CHUNKS]
+
+    # Headers of the kept files stay in the context even when they scored
+    # below the margin, since skipping expansion relies on them being there.
+    kept_files = {c.file_path for c in kept}
+    headers = [c for c in chunks if c not in kept and c.file_path in kept_files and _is_header(c)]
+
+    confident = top >= CONFIDENT_SCORE
+    covered = _covers_headers(kept, kept + headers)
+    if covered and confident and len(kept) <= MIN_KEPT_CHUNKS:
+        path = "narrow"
+    elif covered:
+        path = "covered"
+    else:
+        path = "expand"
+
+    kept += headers
+    decision = {
+        "path": path,
+        "top_score": round(top, 4),
+        "kept": len(kept),
+        "dropped": len(chunks) - len(kept),
+        "expand": path == "expand",
+        "max_tokens": CONFIDENT_MAX_TOKENS if path == "narrow" else None,
+    }
+    state["retrieved_chunks"] = kept
+    state["confidence"] = decision
+
+    logger.info(
+        "session=%s step=confidence path=%s top_score=%.3f kept=%d dropped=%d",
+        state.get("session_id"),
+        path,
+        top,
+        decision["kept"],
+        decision["dropped"],
+    )
+    return decision
+
+
+def record_path(path: str, elapsed_ms: float) -> None:
+    with _stats_lock:
+        _decisions[path] += 1
+        entry = _latency[path]
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+
+def pipeline_stats() -> dict:
+    """Decision counters and latency per pipeline path since startup."""
+    with _stats_lock:
+        return {
+            "decisions": dict(_decisions),
+            "latency_ms": {
+                path: {
+                    "count": entry["count"],
+                    "avg_ms": round(entry["total_ms"] / entry["count"], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                }
+                for path, entry in _latency.items()
+            },
+        }
+
+
+def reset_pipeline_stats() -> None:
+    with _stats_lock:
+        _decisions.clear()
+        _latency.clear()
@@ -0,0 +1,52 @@
+import logging
+import os
+import time
+from typing import Optional
+
+from AI_Agent.graph.state import AgentState
+
+
+# Default end-to-end latency budget for one agent run.
+AGENT_DEADLINE_MS = float(os.getenv("AGENT_DEADLINE_MS", "30000"))
+# Smallest timeout handed to a RAG call, even when the budget is nearly spent.
+MIN_REQUEST_TIMEOUT_S = float(os.getenv("MIN_REQUEST_TIMEOUT_S", "1"))
+DEFAULT_REQUEST_TIMEOUT_S = 60.0
+
+logger = logging.getLogger("ai_agent.deadline")
+
+
+def deadline_after(deadline_ms: Optional[float] = None) -> float:
+    """Absolute `time.monotonic()` deadline for a run starting now."""
+    return time.monotonic() + (deadline_ms or AGENT_DEADLINE_MS) / 1000
+
+
+def remaining_ms(state: AgentState) -> Optional[float]:
+    """Milliseconds left before the run's deadline, or None when it has none."""
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return max((deadline - time.monotonic()) * 1000, 0.0)
+
+
+def has_budget(state: AgentState, needed_ms: float) -> bool:
+    left = remaining_ms(state)
+    return left is None or left >= needed_ms
+
+
+def skip_stage(state: AgentState, stage: str) -> None:
+    """Records a stage skipped (or degraded) to stay within the deadline."""
+    state.setdefault("skipped_stages", []).append(stage)
+    logger.info(
+        "session=%s step=%s status=skipped remaining_ms=%.0f",
+        state.get("session_id"),
+        stage,
+        remaining_ms(state) or 0.0,
+    )
+
+
+def request_timeout(state: AgentState) -> float:
+    """Timeout for a RAG call: whatever is left of the budget."""
+    left = remaining_ms(state)
+    if left is None:
+        return DEFAULT_REQUEST_TIMEOUT_S
+    return max(left / 1000, MIN_REQUEST_TIMEOUT_S)
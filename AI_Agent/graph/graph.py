@@ -1,16 +1,21 @@
+import asyncio
+import os
 import time
 import logging
 
-from AI_Agent.graph.nodes.apply import apply_node
-from AI_Agent.graph.nodes.expansion import expansion_node
-from AI_Agent.graph.nodes.file_loader import file_loader_node
-from AI_Agent.graph.nodes.intent import intent_node
-from AI_Agent.graph.nodes.planner import planner_node
-from AI_Agent.graph.nodes.propose import propose_node
-from AI_Agent.graph.nodes.reasoning import reasoning_node
-from AI_Agent.graph.nodes.retrieval import retrieval_node
+from AI_Agent.graph.confidence import assess_retrieval, record_path
+from AI_Agent.graph.nodes.apply import aapply_node, apply_node
+from AI_Agent.graph.nodes.expansion import aexpansion_node, expansion_node
+from AI_Agent.graph.nodes.file_loader import afile_loader_node, file_loader_node
+from AI_Agent.graph.nodes.intent import _heuristic_intent, aintent_node, intent_node
+from AI_Agent.graph.nodes.locate import alocate_node, locate_node
+from AI_Agent.graph.nodes.planner import aplanner_node, planner_node
+from AI_Agent.graph.nodes.propose import apropose_node, propose_node
+from AI_Agent.graph.nodes.reasoning import areasoning_node, astream_reasoning_node, reasoning_node
+from AI_Agent.graph.nodes.retrieval import CODE_CHANGE_INTENTS, aretrieval_node, retrieval_node, retrieval_scope
 from AI_Agent.graph.state import AgentState
 from AI_Agent.memory.store import memory
+from AI_Agent.schemas.intent import Intent
 from AI_Agent.utils.logger import get_logger
 
 
@@ -26,6 +31,85 @@ propose_logger = get_logger("ProposeAgent")
 
 logger = logging.getLogger("ai_agent.orchestrator")
 
+# Start retrieval alongside intent classification and planning instead of after them.
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+
+
+class StageRunner:
+    """
+    Minimal dependency-graph executor for the pipeline stages.
+
+    Each stage runs as a task once its dependencies have finished and records
+    its start offset and duration. Speculative stages work on a copy of the
+    state; their output only lands in the real state when `commit`ted.
+    """
+
+    def __init__(self, state: AgentState):
+        self.state = state
+        self.started = time.perf_counter()
+        self.tasks: dict[str, asyncio.Future] = {}
+        self.timings: dict[str, dict] = {}
+
+    def start(self, name: str, node, deps: tuple = (), speculative: bool = False) -> asyncio.Future:
+        target = dict(self.state) if speculative else self.state
+
+        async def run():
+            for dep in deps:
+                await self.tasks[dep]
+            began = time.perf_counter()
+            try:
+                return await node(target)
+            finally:
+                self.timings[name] = {
+                    "start_ms": round((began - self.started) * 1000, 1),
+                    "ms": round((time.perf_counter() - began) * 1000, 1),
+                    "speculative": speculative,
+                }
+
+        self.tasks[name] = asyncio.ensure_future(run())
+        return self.tasks[name]
+
+    async def run(self, name: str, node, deps: tuple = ()) -> AgentState:
+        await self.start(name, node, deps)
+        return self.state
+
+    async def commit(self, name: str, stage: str, *keys: str) -> None:
+        """Adopts a speculative stage's output as `stage`, copying the given state keys."""
+        result = await self.tasks[name]
+        for key in keys:
+            self.state[key] = result[key]
+        self.tasks[stage] = self.tasks[name]
+
+    def discard(self, name: str) -> None:
+        task = self.tasks.pop(name, None)
+        if task is None:
+            return
+        task.cancel()
+        # A discarded stage's failure is irrelevant; retrieve it so asyncio does not warn.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        if name in self.timings:
+            self.timings[name]["discarded"] = True
+        else:
+            self.timings[name] = {"discarded": True}
+
+    def summary(self) -> dict:
+        wall_ms = (time.perf_counter() - self.started) * 1000
+        serial_ms = sum(t.get("ms", 0.0) for t in self.timings.values() if not t.get("discarded"))
+        return {
+            "stages": self.timings,
+            "wall_ms": round(wall_ms, 1),
+            "serial_ms": round(serial_ms, 1),
+            # Time the overlapped stages would have added had they run in sequence.
+            "saved_ms": round(max(serial_ms - wall_ms, 0.0), 1),
+        }
+
+
+def _threaded(node):
+    async def run(state):
+        return await asyncio.to_thread(node, state)
+
+    return run
+
 
 class OrchestratorGraph:
     """
@@ -33,12 +117,25 @@ class OrchestratorGraph:
 
     Flow:
       1) intent classification
+         (Locate questions that resolve via the symbol indexes return here)
       2) planning
       3) retrieval from RAG index
       4) rulebook-gated context expansion
       5) optional full-file loading
       6) route to reasoning (Q&A) or propose (code change) node
       7) for code changes, require explicit user approval before apply/push
+
+    Retrieval only depends on the query, so it is started speculatively next
+    to steps 1-2. It is discarded when the Locate fast path answers, and
+    re-run when the plan narrows it to target files.
+
+    For informational intents the retrieval scores then decide how many
+    chunks to keep, whether step 4 is needed and how long the answer may be
+    (see `confidence.assess_retrieval`); each run is counted per path.
+
+    `invoke` runs the blocking nodes in worker threads; `ainvoke` awaits the
+    async nodes; `astream` additionally yields stage events and the answer's
+    token deltas. Per-stage timings end up in `state["timings"]`.
     """
 
     @staticmethod
@@ -46,104 +143,208 @@ class OrchestratorGraph:
         normalized = text.strip().lower()
         return normalized in {"approve", "approved", "yes push", "approve changes", "yes"}
 
-    def invoke(self, state: AgentState) -> AgentState:
-        session_id = state.get("session_id")
+    @staticmethod
+    def _sync_nodes() -> dict:
+        # Looked up per call so tests (and callers) can swap individual nodes.
+        return {
+            "intent": _threaded(intent_node),
+            "locate": _threaded(locate_node),
+            "planner": _threaded(planner_node),
+            "retrieval": _threaded(retrieval_node),
+            "expansion": _threaded(expansion_node),
+            "file_loader": _threaded(file_loader_node),
+            "propose": _threaded(propose_node),
+            "reasoning": _threaded(reasoning_node),
+            "apply": _threaded(apply_node),
+        }
 
-        if session_id and self._is_approval_query(state["user_query"]):
+    @staticmethod
+    def _async_nodes() -> dict:
+        return {
+            "intent": aintent_node,
+            "locate": alocate_node,
+            "planner": aplanner_node,
+            "retrieval": aretrieval_node,
+            "expansion": aexpansion_node,
+            "file_loader": afile_loader_node,
+            "propose": apropose_node,
+            "reasoning": areasoning_node,
+            "apply": aapply_node,
+        }
+
+    async def _approve(self, state: AgentState, apply) -> AgentState:
+        session_id = state["session_id"]
+        logger.info(
+            "session=%s step=approval_check status=approval_query_detected",
+            session_id,
+        )
+        pending = memory.get_pending_diff(session_id)
+        if not pending:
             logger.info(
-                "session=%s step=approval_check status=approval_query_detected",
+                "session=%s step=approval_check status=no_pending_diff", session_id
+            )
+            state["explanation"] = "No pending proposed changes found to approve."
+            return state
+
+        state["proposed_diff_id"] = pending.bundle_id
+        state["approved"] = True
+
+        try:
+            logger.info(
+                "session=%s step=apply_node status=start proposed_diff_id=%s",
                 session_id,
+                pending.bundle_id,
             )
-            pending = memory.get_pending_diff(session_id)
-            if not pending:
-                logger.info(
-                    "session=%s step=approval_check status=no_pending_diff", session_id
-                )
-                state["explanation"] = "No pending proposed changes found to approve."
-                return state
+            state = await apply(state)
+            logger.info(
+                "session=%s step=apply_node status=done proposed_diff_id=%s",
+                session_id,
+                pending.bundle_id,
+            )
+            memory.clear_pending_diff(session_id)
+            memory.add_turn(session_id, state["user_query"], state["explanation"])
+        except Exception as exc:
+            logger.exception(
+                "session=%s step=apply_node status=error error=%s",
+                session_id,
+                exc,
+            )
+            state["explanation"] = f"Approval received, but apply/push failed: {exc}"
+        return state
 
-            state["proposed_diff_id"] = pending.bundle_id
-            state["approved"] = True
+    async def _pipeline(self, state: AgentState, nodes: dict, stream: bool = False):
+        """Yields `(event, data)` stage events and ends with `("final", state)`."""
+        session_id = state.get("session_id")
 
-            try:
-                logger.info(
-                    "session=%s step=apply_node status=start proposed_diff_id=%s",
-                    session_id,
-                    pending.bundle_id,
-                )
-                state = apply_node(state)
+        if session_id and self._is_approval_query(state["user_query"]):
+            state = await self._approve(state, nodes["apply"])
+            if stream:
+                yield "token", {"text": state.get("explanation") or ""}
+            yield "final", state
+            return
+
+        runner = StageRunner(state)
+
+        # Locate questions usually resolve from the symbol indexes without an
+        # embedding call, so they are not worth a speculative search.
+        speculate = SPECULATIVE_RETRIEVAL and _heuristic_intent(state["user_query"]) != Intent.LOCATE
+        if speculate:
+            runner.start("retrieval:speculative", nodes["retrieval"], speculative=True)
+
+        # Orchestration stage 1–5: gather and refine context safely.
+        await runner.run("intent", nodes["intent"])
+        intent = getattr(state.get("intent"), "value", state.get("intent"))
+        logger.info("session=%s step=intent_node status=done intent=%s", session_id, intent)
+        yield "intent", {"intent": intent}
+
+        # Locate fast path: answer from indexed identifiers without embedding or chat calls.
+        if state["intent"] == Intent.LOCATE:
+            await runner.run("locate", nodes["locate"], deps=("intent",))
+            if state.get("explanation"):
+                runner.discard("retrieval:speculative")
+                state["timings"] = runner.summary()
                 logger.info(
-                    "session=%s step=apply_node status=done proposed_diff_id=%s",
-                    session_id,
-                    pending.bundle_id,
-                )
-                memory.clear_pending_diff(session_id)
-                memory.add_turn(session_id, state["user_query"], state["explanation"])
-            except Exception as exc:
-                logger.exception(
-                    "session=%s step=apply_node status=error error=%s",
+                    "session=%s step=locate_node status=done path=locate_fast elapsed_ms=%.1f",
                     session_id,
-                    exc,
+                    state["timings"]["wall_ms"],
                 )
-                state["explanation"] = f"Approval received, but apply/push failed: {exc}"
-            return state
+                record_path("locate_fast", state["timings"]["wall_ms"])
+                yield "retrieval", {"chunk_ids": [c.chunk_id for c in state.get("retrieved_chunks") or []]}
+                if stream:
+                    yield "token", {"text": state["explanation"]}
+                yield "final", state
+                return
+            logger.info("session=%s step=locate_node status=unresolved", session_id)
 
-        # Orchestration stage 1–5: gather and refine context safely.
-        logger.info(
-            "session=%s step=intent_node status=start user_query=%r",
-            session_id,
-            state.get("user_query"),
-        )
-        state = intent_node(state)
-        logger.info(
-            "session=%s step=intent_node status=done intent=%s",
-            session_id,
-            getattr(state.get("intent"), "value", state.get("intent")),
-        )
+        await runner.run("planner", nodes["planner"], deps=("intent",))
 
-        logger.info("session=%s step=planner_node status=start", session_id)
-        state = planner_node(state)
-        logger.info("session=%s step=planner_node status=done", session_id)
-
-        logger.info("session=%s step=retrieval_node status=start", session_id)
-        state = retrieval_node(state)
+        speculation_kept = speculate and retrieval_scope(state) is None
+        if speculation_kept:
+            await runner.commit("retrieval:speculative", "retrieval", "retrieved_chunks")
+        else:
+            if speculate:
+                # The plan narrowed retrieval to its target files: the speculative search is stale.
+                runner.discard("retrieval:speculative")
+                logger.info("session=%s step=retrieval_node status=speculation_discarded", session_id)
+            await runner.run("retrieval", nodes["retrieval"], deps=("planner",))
         logger.info(
-            "session=%s step=retrieval_node status=done retrieved_chunks=%d",
+            "session=%s step=retrieval_node status=done retrieved_chunks=%d speculative=%s",
             session_id,
             len(state.get("retrieved_chunks") or []),
+            speculation_kept,
         )
+        # Informational answers: let the score distribution trim context and decide on expansion.
+        if state["intent"] not in CODE_CHANGE_INTENTS:
+            assess_retrieval(state)
+        yield "retrieval", {"chunk_ids": [c.chunk_id for c in state.get("retrieved_chunks") or []]}
 
-        logger.info("session=%s step=expansion_node status=start", session_id)
-        state = expansion_node(state)
-        logger.info(
-            "session=%s step=expansion_node status=done expanded_chunks=%d",
-            session_id,
-            len(state.get("expanded_chunks") or []),
-        )
+        await runner.run("expansion", nodes["expansion"], deps=("planner", "retrieval"))
+        yield "expansion", {"chunk_ids": [c.chunk_id for c in state.get("expanded_chunks") or []]}
 
-        logger.info("session=%s step=file_loader_node status=start", session_id)
-        state = file_loader_node(state)
-        logger.info(
-            "session=%s step=file_loader_node status=done file_chunks=%d",
-            session_id,
-            len(state.get("file_chunks") or []),
-        )
+        await runner.run("file_loader", nodes["file_loader"], deps=("planner", "expansion"))
 
         # Orchestration stage 6: route by intent family.
         if state["intent"].value in {"Modify", "Refactor", "Debug"}:
-            logger.info(
-                "session=%s step=propose_node status=start intent=%s",
-                session_id,
-                state["intent"].value,
-            )
-            return propose_node(state)
+            await runner.run("propose", nodes["propose"], deps=("file_loader",))
+            if stream:
+                # Proposals are parsed into a diff bundle, so they are sent whole.
+                yield "token", {"text": state.get("explanation") or ""}
+        elif stream:
+            began = time.perf_counter()
+            async for delta in astream_reasoning_node(state):
+                yield "token", {"text": delta}
+            runner.timings["reasoning"] = {
+                "start_ms": round((began - runner.started) * 1000, 1),
+                "ms": round((time.perf_counter() - began) * 1000, 1),
+                "speculative": False,
+            }
+        else:
+            await runner.run("reasoning", nodes["reasoning"], deps=("file_loader",))
 
+        state["timings"] = runner.summary()
+        if state["intent"] in CODE_CHANGE_INTENTS:
+            path = "change"
+        else:
+            path = (state.get("confidence") or {}).get("path", "unscored")
+        record_path(path, state["timings"]["wall_ms"])
         logger.info(
-            "session=%s step=reasoning_node status=start intent=%s",
+            "session=%s step=pipeline status=done path=%s elapsed_ms=%.1f serial_ms=%.1f saved_ms=%.1f stages=%s",
             session_id,
-            getattr(state.get("intent"), "value", state.get("intent")),
+            path,
+            state["timings"]["wall_ms"],
+            state["timings"]["serial_ms"],
+            state["timings"]["saved_ms"],
+            {name: t.get("ms") for name, t in state["timings"]["stages"].items()},
         )
-        return reasoning_node(state)
+        yield "final", state
+
+    async def _run(self, state: AgentState, nodes: dict) -> AgentState:
+        async for event, data in self._pipeline(state, nodes):
+            if event == "final":
+                return data
+        return state
+
+    def invoke(self, state: AgentState) -> AgentState:
+        """Blocking entry point; it drives its own event loop, so it cannot be called from inside one."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._run(state, self._sync_nodes()))
+        raise RuntimeError(
+            "OrchestratorGraph.invoke() (and run_agent) cannot be called from a running event loop; "
+            "await ainvoke() (or arun_agent) instead"
+        )
+
+    async def ainvoke(self, state: AgentState) -> AgentState:
+        return await self._run(state, self._async_nodes())
+
+    async def astream(self, state: AgentState):
+        """
+        Yields `(event, data)` pairs: `intent`, `retrieval` and `expansion`
+        stage events, `token` deltas of the answer, and finally `("final", state)`.
+        """
+        async for event, data in self._pipeline(state, self._async_nodes(), stream=True):
+            yield event, data
 
 
 def build_graph():
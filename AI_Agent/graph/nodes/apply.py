@@ -1,3 +1,5 @@
+import asyncio
+
 from AI_Agent.graph.state import AgentState
 from AI_Agent.tools.git_ops import GitClient
 
@@ -35,3 +37,8 @@ def apply_node(state: AgentState) -> AgentState:
         f"committed, and pushed to origin/{branch}."
     )
     return state
+
+
+async def aapply_node(state: AgentState) -> AgentState:
+    # Apply runs git; run the blocking node in a worker thread.
+    return await asyncio.to_thread(apply_node, state)
@@ -1,7 +1,11 @@
+import asyncio
+
+from AI_Agent.graph.deadline import has_budget, request_timeout, skip_stage
 from AI_Agent.graph.state import AgentState
 from AI_Agent.rulebook.validator import RulebookValidator, RulebookViolation
 from AI_Agent.tools.rag import RAGClient
 from AI_Agent.utils.logger import get_logger
+from backend.tasks.query.rag.agent_rag import BLIND_CODE_TYPE
 
 expand_logger = get_logger("ContextExpansionAgent")
 import os
@@ -17,6 +21,8 @@ validator = RulebookValidator()
 # Global expansion controls (per query), aligned with policy/plan.md.
 EXPANSION_BUDGET = int(os.getenv("EXPANSION_BUDGET", "4"))
 MAX_EXPANSION_DEPTH = int(os.getenv("MAX_EXPANSION_DEPTH", "1"))
+# Budget that must remain for expansion to run and still leave time to answer.
+EXPANSION_MIN_BUDGET_MS = float(os.getenv("EXPANSION_MIN_BUDGET_MS", "6000"))
 
 DEFAULT_EXPANSION_TYPES = ["py:imports", "py:class_header"]
 
@@ -33,6 +39,18 @@ def _requested_code_types(state: AgentState) -> list[str]:
     return DEFAULT_EXPANSION_TYPES
 
 
+def _expansion_scope(state: AgentState) -> str:
+    """
+    Blind chunks (files no parser handles) and other untyped chunks have no
+    imports or headers to fetch, but their real line spans let the
+    neighbouring lines in.
+    """
+    chunks = state.get("retrieved_chunks") or []
+    if chunks and all(c.code_type in (None, BLIND_CODE_TYPE) and c.start_line for c in chunks):
+        return "adjacent"
+    return "same_file"
+
+
 def expansion_node(state: AgentState) -> AgentState:
 
     expand_logger.info("ContextExpansionAgent -> Starting context expansion process")
@@ -46,6 +64,17 @@ def expansion_node(state: AgentState) -> AgentState:
     if not plan or not plan.requires_expansion:
         return state
 
+    confidence = state.get("confidence")
+    if confidence and not confidence["expand"]:
+        # The retrieved chunks already hold the imports/headers expansion would add.
+        state["expanded_chunks"] = []
+        return state
+
+    if not has_budget(state, EXPANSION_MIN_BUDGET_MS):
+        state["expanded_chunks"] = []
+        skip_stage(state, "expansion")
+        return state
+
     # Budget/depth guard: this implementation supports a single expansion hop per query.
     # If the configured budget is exhausted (or disabled via 0), skip expansion and
     # let downstream reasoning work with the initial retrieved chunks only.
@@ -75,8 +104,8 @@ def expansion_node(state: AgentState) -> AgentState:
         state["expanded_chunks"] = []
         return state
 
-    requested_code_types = _requested_code_types(state)
-    scope = "same_file"
+    scope = _expansion_scope(state)
+    requested_code_types = _requested_code_types(state) if scope == "same_file" else []
     max_chunks = 3
 
     expand_logger.info(
@@ -124,6 +153,7 @@ def expansion_node(state: AgentState) -> AgentState:
         requested_code_types=requested_code_types,
         scope=scope,
         max_chunks=max_chunks,
+        timeout=request_timeout(state),
     )
 
     expand_logger.info(
@@ -141,3 +171,8 @@ def expansion_node(state: AgentState) -> AgentState:
 
     state["expanded_chunks"] = expanded
     return state
+
+
+async def aexpansion_node(state: AgentState) -> AgentState:
+    # Expansion is a metadata scroll; run the blocking node in a worker thread.
+    return await asyncio.to_thread(expansion_node, state)
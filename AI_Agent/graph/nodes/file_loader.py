@@ -1,10 +1,31 @@
 # graph/nodes/file_loader.py
+import asyncio
+import os
+from collections import defaultdict
+
+from AI_Agent.graph.deadline import has_budget, skip_stage
 from AI_Agent.graph.state import AgentState
+from AI_Agent.repo_registry import get_repo_path
 from AI_Agent.tools.filesystem import FileSystemClient
 
 
 fs = FileSystemClient()
 
+# Lines of surrounding context kept around each known chunk span.
+FILE_CONTEXT_MARGIN = int(os.getenv("FILE_CONTEXT_MARGIN", "10"))
+# Full files inflate the answer prompt; below this budget the chunks must do.
+FILE_LOADER_MIN_BUDGET_MS = float(os.getenv("FILE_LOADER_MIN_BUDGET_MS", "5000"))
+
+
+def _known_spans(state: AgentState) -> dict:
+    spans = defaultdict(list)
+    for c in state.get("retrieved_chunks", []) + state.get("expanded_chunks", []):
+        if c.start_line and c.end_line:
+            spans[c.file_path].append(
+                (c.start_line - FILE_CONTEXT_MARGIN, c.end_line + FILE_CONTEXT_MARGIN)
+            )
+    return spans
+
 
 def file_loader_node(state: AgentState) -> AgentState:
     plan = state["plan"]
@@ -12,9 +33,24 @@ def file_loader_node(state: AgentState) -> AgentState:
     if not plan or not plan.requires_full_file:
         return state
 
+    if not has_budget(state, FILE_LOADER_MIN_BUDGET_MS):
+        skip_stage(state, "file_loader")
+        return state
+
+    # Files we already hold precise chunk spans for are sliced to those regions.
+    spans = _known_spans(state)
+    root = get_repo_path(state.get("repo_url") or "")
+
     file_chunks = []
     for file_path in plan.target_files or []:
-        file_chunks.extend(fs.get_file_chunks(file_path))
+        file_chunks.extend(
+            fs.get_file_chunks(file_path, spans=spans.get(file_path), root=root)
+        )
 
     state["file_chunks"] = file_chunks
     return state
+
+
+async def afile_loader_node(state: AgentState) -> AgentState:
+    # File loading is local disk I/O; run the blocking node in a worker thread.
+    return await asyncio.to_thread(file_loader_node, state)
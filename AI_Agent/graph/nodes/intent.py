@@ -1,5 +1,7 @@
+import re
+
 from AI_Agent.graph.state import AgentState
-from AI_Agent.infra.llm import chat, render_prompt
+from AI_Agent.infra.llm import achat, chat, render_prompt
 from AI_Agent.schemas.intent import Intent
 
 
@@ -18,41 +20,128 @@ MODIFY_HINTS = {
     "optimize",
 }
 
+# Hints match whole words (plus plain inflections), so "address", "editor" or
+# "fixture" are not read as requests to add, edit or fix something.
+_MODIFY_HINT = re.compile(r"\b(?:" + "|".join(sorted(MODIFY_HINTS)) + r")(?:s|es|d|ed|ing)?\b")
+_REFACTOR_HINT = re.compile(r"\brefactor\w*")
+_DEBUG_HINT = re.compile(r"\b(?:bug|fix)(?:s|es|ed|ing)?\b")
+
+# Clearly informational questions; anything else unclear goes to the LLM classifier.
+EXPLAIN_PATTERNS = [
+    r"^(what|how|why|which|who|when)\b",
+    r"^(explain|describe|summari[sz]e|walk\s+me\s+through|tell\s+me)\b",
+    r"^(can|could)\s+you\s+(explain|describe|summari[sz]e)\b",
+]
+
+# Definition / location questions, e.g. "where is `X` set", "which file defines Y".
+LOCATE_PATTERNS = [
+    r"^where\s+(is|are|does|do)\b",
+    r"^where'?s\b",
+    r"\bwhich\s+file\b",
+    r"\b(definition|declaration)\s+of\b",
+    r"\bwhere\b.*\b(defined|declared|set|initiali[sz]ed|implemented|located)\b",
+    r"^(locate|find)\b",
+]
+
+_BACKTICK_SYMBOL = re.compile(r"`([^`]+)`")
+_LOCATE_SYMBOL = re.compile(
+    r"\b(?:where\s+(?:is|are)|where'?s|definition\s+of|declaration\s+of|defines?|locate|find)"
+    r"\s+(?:the\s+)?(?:class|function|method|constant|variable|symbol)?\s*"
+    r"([A-Za-z_][\w.]*)"
+)
+_STOPWORDS = {"the", "a", "an", "this", "that", "it"}
+
+
+def looks_like_identifier(symbol: str) -> bool:
+    """snake_case, dotted or CamelCase names; plain words ("config", "tests") are not."""
+    if "_" in symbol or "." in symbol:
+        return True
+    return any(c.isupper() for c in symbol[1:]) and any(c.islower() for c in symbol)
+
+
+def parse_locate_query(user_query: str):
+    """
+    Returns `(symbol, confident)` for a Locate question, or None when there
+    isn't a clear symbol. `confident` is False for plain words, which should
+    only be answered from an exact identifier/class_name index hit.
+    """
+    quoted = _BACKTICK_SYMBOL.search(user_query)
+    if quoted:
+        symbol = quoted.group(1).strip().rstrip("()")
+        return (symbol, True) if symbol else None
+
+    match = _LOCATE_SYMBOL.search(user_query)
+    if not match:
+        return None
+
+    symbol = match.group(1).rstrip(".")
+    if symbol.lower() in _STOPWORDS:
+        return None
+    return symbol, looks_like_identifier(symbol)
+
+
+def extract_locate_symbol(user_query: str):
+    """Pulls the symbol a Locate question is about, or None when there isn't a clear one."""
+    parsed = parse_locate_query(user_query)
+    return parsed[0] if parsed else None
+
 
 def _heuristic_intent(user_query: str):
+    """The intent when the wording makes it obvious, else None (ask the LLM)."""
     text = user_query.lower().strip()
     if not text:
         return Intent.EXPLAIN
 
-    if any(hint in text for hint in MODIFY_HINTS):
-        if "refactor" in text:
+    # Quoted symbols are names, not instructions ("where is `update_state` defined").
+    unquoted = _BACKTICK_SYMBOL.sub(" ", text)
+    has_modify_hint = bool(_MODIFY_HINT.search(unquoted))
+
+    if not has_modify_hint and any(re.search(p, unquoted) for p in LOCATE_PATTERNS):
+        return Intent.LOCATE
+
+    if has_modify_hint:
+        if _REFACTOR_HINT.search(unquoted):
             return Intent.REFACTOR
-        if "bug" in text or "fix" in text:
+        if _DEBUG_HINT.search(unquoted):
             return Intent.DEBUG
         return Intent.MODIFY
 
     # Most user queries are informational Q&A; shortcut to avoid an LLM call.
-    return Intent.EXPLAIN
+    if any(re.search(p, unquoted) for p in EXPLAIN_PATTERNS):
+        return Intent.EXPLAIN
+    return None
 
 
-def intent_node(state: AgentState) -> AgentState:
+def _heuristic_resolves(state: AgentState) -> bool:
     heuristic = _heuristic_intent(state["user_query"])
-    if heuristic in {Intent.EXPLAIN, Intent.MODIFY, Intent.REFACTOR, Intent.DEBUG}:
-        state["intent"] = heuristic
-        return state
+    if heuristic is None:
+        return False
+    state["intent"] = heuristic
+    return True
 
 
-
-def intent_node(state: AgentState) -> AgentState:
-    prompt = render_prompt(
+def _intent_prompt(state: AgentState) -> str:
+    return render_prompt(
         "AI_Agent/prompts/intent.txt",
         {"user_query": state["user_query"]},
     )
-    response = chat(prompt, max_tokens=20).strip()
-    from AI_Agent.schemas.intent import Intent
 
+
+def _set_intent(state: AgentState, response: str) -> AgentState:
     try:
-        state["intent"] = Intent(response)
+        state["intent"] = Intent(response.strip())
     except Exception:
         state["intent"] = Intent.EXPLAIN
     return state
+
+
+def intent_node(state: AgentState) -> AgentState:
+    if _heuristic_resolves(state):
+        return state
+    return _set_intent(state, chat(_intent_prompt(state), max_tokens=20))
+
+
+async def aintent_node(state: AgentState) -> AgentState:
+    if _heuristic_resolves(state):
+        return state
+    return _set_intent(state, await achat(_intent_prompt(state), max_tokens=20))
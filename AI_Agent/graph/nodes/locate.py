@@ -0,0 +1,53 @@
+import asyncio
+
+from AI_Agent.graph.nodes.intent import parse_locate_query
+from AI_Agent.graph.state import AgentState
+from AI_Agent.tools.rag import RAGClient
+
+rag = RAGClient()
+
+
+def _format_location(chunk) -> str:
+    span = ""
+    if chunk.start_line:
+        span = f":{chunk.start_line}"
+        if chunk.end_line and chunk.end_line != chunk.start_line:
+            span += f"-{chunk.end_line}"
+    label = f" ({chunk.code_type})" if chunk.code_type else ""
+    return f"- {chunk.file_path}{span}{label}"
+
+
+def locate_node(state: AgentState) -> AgentState:
+    """
+    Answers definition/location questions straight from the symbol indexes.
+
+    Sets `explanation` only when the symbol resolves; otherwise the state is
+    returned untouched so the orchestrator can continue with the full pipeline.
+    Plain words ("where is the config loaded") only resolve on an exact
+    identifier/class_name hit, never through the grep fallback.
+    """
+    parsed = parse_locate_query(state["user_query"])
+    if not parsed:
+        return state
+
+    symbol, confident = parsed
+    chunks = rag.locate_symbol(symbol=symbol, repo_url=state["repo_url"], exact_only=not confident)
+    if not chunks:
+        return state
+
+    locations = []
+    seen = set()
+    for chunk in chunks:
+        line = _format_location(chunk)
+        if line not in seen:
+            seen.add(line)
+            locations.append(line)
+
+    state["retrieved_chunks"] = chunks
+    state["explanation"] = f"`{symbol}` is defined in:\n" + "\n".join(locations)
+    return state
+
+
+async def alocate_node(state: AgentState) -> AgentState:
+    # Locate resolves against the symbol indexes; run the blocking node in a worker thread.
+    return await asyncio.to_thread(locate_node, state)
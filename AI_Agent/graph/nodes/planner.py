@@ -1,50 +1,77 @@
+import os
+
+from AI_Agent.graph.deadline import has_budget, skip_stage
 from AI_Agent.graph.state import AgentState
-from AI_Agent.infra.llm import chat, extract_json, render_prompt
+from AI_Agent.infra.llm import achat, chat, extract_json, render_prompt
 from AI_Agent.schemas.intent import Intent
 from AI_Agent.schemas.plan import Plan
 
 
-def planner_node(state: AgentState) -> AgentState:
-    # Fast-path for common informational queries: avoid an extra LLM call
-    # while preserving context quality (retrieval + expansion still enabled).
-    if state["intent"] in {Intent.EXPLAIN, Intent.LOCATE, Intent.ANALYZE}:
-        state["plan"] = Plan(
-            intent=state["intent"].value,
-            steps=["Retrieve relevant chunks", "Answer with grounded context"],
-            requires_expansion=True,
-            requires_full_file=False,
-            target_files=None,
-        )
-        return state
+# Budget an LLM planning call needs; with less left the default plan is used.
+PLANNER_MIN_BUDGET_MS = float(os.getenv("PLANNER_MIN_BUDGET_MS", "4000"))
 
-    """
-    Build an internal execution plan.
 
-    If the LLM returns invalid JSON, we attempt a single structured repair pass
-    before falling back to a safe default plan.
-    """
-    prompt = render_prompt(
+def _default_plan(state: AgentState) -> Plan:
+    return Plan(
+        intent=state["intent"].value,
+        steps=["Retrieve relevant chunks", "Answer with grounded context"],
+        requires_expansion=True,
+        requires_full_file=False,
+        target_files=None,
+    )
+
+
+def _planner_prompt(state: AgentState) -> str:
+    return render_prompt(
         "AI_Agent/prompts/planner.txt",
         {
             "intent": state["intent"].value,
             "user_query": state["user_query"],
         },
     )
-    response = chat(prompt)
 
+
+def _set_plan(state: AgentState, response: str) -> AgentState:
     try:
         plan_data = extract_json(response)
         state["plan"] = Plan(**plan_data)
     except Exception:
-        state["plan"] = Plan(
-            intent=state["intent"].value,
-            steps=["Retrieve relevant chunks", "Answer with grounded context"],
-            requires_expansion=True,
-            requires_full_file=False,
-            target_files=None,
-        )
+        state["plan"] = _default_plan(state)
 
     return state
+
+
+def _static_plan(state: AgentState) -> bool:
+    # Fast-path for common informational queries: avoid an extra LLM call
+    # while preserving context quality (retrieval + expansion still enabled).
+    if state["intent"] in {Intent.EXPLAIN, Intent.LOCATE, Intent.ANALYZE}:
+        state["plan"] = _default_plan(state)
+        return True
+    if not has_budget(state, PLANNER_MIN_BUDGET_MS):
+        state["plan"] = _default_plan(state)
+        skip_stage(state, "planner")
+        return True
+    return False
+
+
+def planner_node(state: AgentState) -> AgentState:
+    if _static_plan(state):
+        return state
+
+    """
+    Build an internal execution plan.
+
+    If the LLM returns invalid JSON, we attempt a single structured repair pass
+    before falling back to a safe default plan.
+    """
+    return _set_plan(state, chat(_planner_prompt(state)))
+
+
+async def aplanner_node(state: AgentState) -> AgentState:
+    if _static_plan(state):
+        return state
+    return _set_plan(state, await achat(_planner_prompt(state)))
+
     #     return state
     # except Exception:
     #     # One repair attempt: ask the model to fix the JSON only.
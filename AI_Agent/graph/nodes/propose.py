@@ -1,7 +1,7 @@
 import uuid
 
 from AI_Agent.graph.state import AgentState
-from AI_Agent.infra.llm import chat, render_prompt
+from AI_Agent.infra.llm import achat, chat, render_prompt
 from AI_Agent.memory.store import memory
 from AI_Agent.schemas.diff import DiffBundle, FileDiff
 from AI_Agent.tools.git_ops import GitClient
@@ -16,22 +16,23 @@ def _extract_patch(response: str) -> str:
     return response
 
 
-def propose_node(state: AgentState) -> AgentState:
+def _propose_prompt(state: AgentState) -> str:
     approved_chunks = state["retrieved_chunks"] + state["expanded_chunks"] + state["file_chunks"]
 
     context = "\n\n".join(
         f"[{c.file_path}:{c.start_line}-{c.end_line}]\n{c.content}" for c in approved_chunks
     )
 
-    prompt = render_prompt(
+    return render_prompt(
         "AI_Agent/prompts/propose.txt",
         {
             "context": context,
             "goal": state["user_query"],
         },
     )
-    response = chat(prompt, max_tokens=650)
 
+
+def _record_proposal(state: AgentState, response: str) -> AgentState:
     bundle = DiffBundle(
         bundle_id=str(uuid.uuid4()),
         goal=state["user_query"],
@@ -55,3 +56,11 @@ def propose_node(state: AgentState) -> AgentState:
     if state.get("session_id"):
         memory.add_turn(state["session_id"], state["user_query"], state["explanation"])
     return state
+
+
+def propose_node(state: AgentState) -> AgentState:
+    return _record_proposal(state, chat(_propose_prompt(state), max_tokens=650))
+
+
+async def apropose_node(state: AgentState) -> AgentState:
+    return _record_proposal(state, await achat(_propose_prompt(state), max_tokens=650))
@@ -1,12 +1,16 @@
 import os
 from collections import defaultdict
 
+from AI_Agent.graph.deadline import remaining_ms, skip_stage
 from AI_Agent.graph.state import AgentState
-from AI_Agent.infra.llm import chat, render_prompt
+from AI_Agent.infra.llm import achat, astream_chat, chat, render_prompt
 from AI_Agent.memory.store import memory
 
 MAX_CONTEXT_CHARS_PER_CHUNK = int(os.getenv("MAX_CONTEXT_CHARS_PER_CHUNK", "1200"))
 REASONING_MAX_TOKENS = int(os.getenv("REASONING_MAX_TOKENS", "180"))
+# Below this remaining budget the context is clipped and the answer shortened in proportion.
+REASONING_FULL_BUDGET_MS = float(os.getenv("REASONING_FULL_BUDGET_MS", "8000"))
+MIN_REASONING_TOKENS = 48
 
 
 def _clip(text: str, max_chars: int) -> str:
@@ -17,9 +21,17 @@ def _clip(text: str, max_chars: int) -> str:
     return text[:max_chars] + "\n... [truncated for latency]"
 
 
-def _build_context(chunks):
+def _build_context(chunks, max_chars: int | None = None):
+    if max_chars is None:
+        max_chars = MAX_CONTEXT_CHARS_PER_CHUNK
     grouped = defaultdict(list)
+    seen_ids = set()
     for c in chunks:
+        # Retrieval and expansion can return the same chunk; emit each region once.
+        key = getattr(c, "chunk_id", None) or id(c)
+        if key in seen_ids:
+            continue
+        seen_ids.add(key)
         grouped[c.file_path].append(c)
 
     sections = []
@@ -32,8 +44,7 @@ def _build_context(chunks):
             relations.append(f"{label}@{span}")
 
         body = "\n\n".join(
-            f"[{c.file_path}:{c.start_line}-{c.end_line} | {c.code_type}]\n{_clip(c.content, MAX_CONTEXT_CHARS_PER_CHUNK)}"
-            f"[{c.file_path}:{c.start_line}-{c.end_line} | {c.code_type}]\n{c.content}"
+            f"[{c.file_path}:{c.start_line}-{c.end_line} | {c.code_type}]\n{_clip(c.content, max_chars)}"
             for c in file_chunks
         )
         sections.append(
@@ -59,14 +70,28 @@ def _format_chat_history(history: list[dict]) -> str:
     return "\n".join(formatted)
 
 
-def reasoning_node(state: AgentState) -> AgentState:
+def _reasoning_budget(state: AgentState):
+    """(max chars per chunk, max answer tokens); both shrink when the deadline is close."""
+    # Confident, narrow questions get a shorter answer regardless of the deadline.
+    hint = (state.get("confidence") or {}).get("max_tokens")
+    left = remaining_ms(state)
+    if left is None or left >= REASONING_FULL_BUDGET_MS:
+        return MAX_CONTEXT_CHARS_PER_CHUNK, hint
+
+    skip_stage(state, "reasoning:full_context")
+    scale = max(left / REASONING_FULL_BUDGET_MS, 0.25)
+    max_tokens = max(int(REASONING_MAX_TOKENS * scale), MIN_REASONING_TOKENS)
+    return int(MAX_CONTEXT_CHARS_PER_CHUNK * scale), min(max_tokens, hint or max_tokens)
+
+
+def _reasoning_prompt(state: AgentState, max_chars: int | None = None) -> str:
     approved_chunks = (
         state["retrieved_chunks"]
         + state["expanded_chunks"]
         + state["file_chunks"]
     )
 
-    context = _build_context(approved_chunks)
+    context = _build_context(approved_chunks, max_chars)
 
     # 🔹 Format conversation history
     chat_history_str = "\n".join(
@@ -75,7 +100,7 @@ def reasoning_node(state: AgentState) -> AgentState:
 )
 
 
-    prompt = render_prompt(
+    return render_prompt(
         "AI_Agent/prompts/reasoning.txt",
         {
             "context": context,
@@ -84,7 +109,28 @@ def reasoning_node(state: AgentState) -> AgentState:
         },
     )
 
-    response = chat(prompt)
-    state["explanation"] = response
 
+def _chat_kwargs(max_tokens):
+    return {"max_tokens": max_tokens} if max_tokens else {}
+
+
+def reasoning_node(state: AgentState) -> AgentState:
+    max_chars, max_tokens = _reasoning_budget(state)
+    state["explanation"] = chat(_reasoning_prompt(state, max_chars), **_chat_kwargs(max_tokens))
+    return state
+
+
+async def areasoning_node(state: AgentState) -> AgentState:
+    max_chars, max_tokens = _reasoning_budget(state)
+    state["explanation"] = await achat(_reasoning_prompt(state, max_chars), **_chat_kwargs(max_tokens))
     return state
+
+
+async def astream_reasoning_node(state: AgentState):
+    """Streams the answer as text deltas; `explanation` holds the full text once exhausted."""
+    max_chars, max_tokens = _reasoning_budget(state)
+    parts = []
+    async for delta in astream_chat(_reasoning_prompt(state, max_chars), **_chat_kwargs(max_tokens)):
+        parts.append(delta)
+        yield delta
+    state["explanation"] = "".join(parts)
@@ -1,22 +1,57 @@
+from typing import Optional
+
+from AI_Agent.graph.deadline import request_timeout
 from AI_Agent.graph.state import AgentState
 from AI_Agent.memory.store import summarize_history
+from AI_Agent.schemas.intent import Intent
 from AI_Agent.tools.rag import RAGClient
 
 rag = RAGClient()
 
+CODE_CHANGE_INTENTS = {Intent.MODIFY, Intent.REFACTOR, Intent.DEBUG}
 
-def retrieval_node(state: AgentState) -> AgentState:
+
+def _retrieval_query(state: AgentState) -> str:
     # Context expansion starts at retrieval time by enriching the query with
     # a compact memory summary from previous turns in the same session.
     history = summarize_history(state.get("session_id"))
-    query = state["user_query"] if not history else f"{history}\n\nCurrent query: {state['user_query']}"
+    return state["user_query"] if not history else f"{history}\n\nCurrent query: {state['user_query']}"
+
+
+def retrieval_scope(state: AgentState) -> Optional[list[str]]:
+    """Files a code-change plan targets; retrieval is narrowed to them once the plan is known."""
+    plan = state.get("plan")
+    if plan and plan.target_files and state.get("intent") in CODE_CHANGE_INTENTS:
+        return list(plan.target_files)
+    return None
+
+
+def _retrieval_requests(state: AgentState) -> list[dict]:
+    """Searches to try in order until one returns chunks."""
+    request = {"query": _retrieval_query(state), "top_k": 5, "repo_url": state["repo_url"]}
+    scope = retrieval_scope(state)
+    if not scope:
+        return [request]
+    # Planned target files that are not in the index: search the whole repo.
+    return [{**request, "path_prefix": scope}, request]
 
+
+def retrieval_node(state: AgentState) -> AgentState:
     # Retrieve top-k semantic chunks from the shared backend RAG service.
-    chunks = rag.retrieve_chunks(
-        query=query,
-        top_k=5,
-        repo_url=state["repo_url"],
-    )
+    for request in _retrieval_requests(state):
+        chunks = rag.retrieve_chunks(**request, timeout=request_timeout(state))
+        if chunks:
+            break
+
+    state["retrieved_chunks"] = chunks
+    return state
+
+
+async def aretrieval_node(state: AgentState) -> AgentState:
+    for request in _retrieval_requests(state):
+        chunks = await rag.aretrieve_chunks(**request, timeout=request_timeout(state))
+        if chunks:
+            break
 
     state["retrieved_chunks"] = chunks
     return state
@@ -1,4 +1,4 @@
-from typing import List, Optional, TypedDict
+from typing import List, NotRequired, Optional, TypedDict
 
 from AI_Agent.schemas.chunk import Chunk
 from AI_Agent.schemas.intent import Intent
@@ -22,3 +22,13 @@ class AgentState(TypedDict):
 
     proposed_diff_id: Optional[str]
     approved: bool
+
+    # Per-stage start offsets and durations from the orchestrator.
+    timings: NotRequired[dict]
+
+    # Absolute time.monotonic() deadline, and the stages skipped or degraded to meet it.
+    deadline: NotRequired[Optional[float]]
+    skipped_stages: NotRequired[List[str]]
+
+    # Score-based expansion/context/answer-length decision made after retrieval.
+    confidence: NotRequired[dict]
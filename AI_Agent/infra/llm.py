@@ -1,24 +1,43 @@
+import asyncio
 import json
 import os
 import re
 import logging
 import re
 import time
+import weakref
 from pathlib import Path
 
 import ollama
 
+from backend.infra import llm_router
+from backend.infra.llm import GROQ
+from backend.infra.llm_router import Provider
+
 MODEL = os.getenv("LLM_MODEL", "llama3.2:3b")
 USE_GROQ = os.getenv("USE_GROQ", "false").lower() == "true"
-GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+# Local generation can be slow, but a hung Ollama must still fail over eventually.
+OLLAMA_TIMEOUT_S = float(os.getenv("OLLAMA_TIMEOUT_S", "120"))
 
-_GROQ_CLIENTS = None
-_GROQ_START_INDEX = 0
 MODEL = "llama3.2:3b"
+# Async clients (per event loop: their connection pools are bound to it).
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_OLLAMA_CLIENT = None
 
 logger = logging.getLogger("ai_agent.llm")
 
 
+def _loop_clients() -> dict:
+    return _ASYNC_CLIENTS.setdefault(asyncio.get_running_loop(), {})
+
+
+def _async_ollama():
+    clients = _loop_clients()
+    if "ollama" not in clients:
+        clients["ollama"] = ollama.AsyncClient(timeout=OLLAMA_TIMEOUT_S)
+    return clients["ollama"]
+
+
 def render_prompt(template_path: str, values: dict[str, str]) -> str:
     template = Path(template_path).read_text(encoding="utf-8")
     prompt = template
@@ -27,81 +46,65 @@ def render_prompt(template_path: str, values: dict[str, str]) -> str:
     return prompt
 
 
-def _load_groq_clients():
-    global _GROQ_CLIENTS
-
-    if _GROQ_CLIENTS is not None:
-        return _GROQ_CLIENTS
+def _ollama_client():
+    global _OLLAMA_CLIENT
+    if _OLLAMA_CLIENT is None:
+        _OLLAMA_CLIENT = ollama.Client(timeout=OLLAMA_TIMEOUT_S)
+    return _OLLAMA_CLIENT
 
-    keys = [
-        os.getenv("GROQ_API_KEY"),
-        os.getenv("GROQ_API_KEY_1"),
-        os.getenv("GROQ_API_KEY_2"),
-        os.getenv("GROQ_API_KEY_PRIMARY"),
-        os.getenv("GROQ_API_KEY_SECONDARY"),
-    ]
 
-    seen = set()
-    deduped = []
-    for key in keys:
-        if key and key not in seen:
-            deduped.append(key)
-            seen.add(key)
+def _ollama_chat(prompt: str, max_tokens: int) -> str:
+    response = _ollama_client().chat(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        options={"temperature": 0, "num_predict": max_tokens},
+    )
+    return response["message"]["content"]
 
-    if not deduped:
-        raise RuntimeError("No Groq API key configured. Set GROQ_API_KEY (or _1/_2).")
 
-    from groq import Groq
+async def _aollama_chat(prompt: str, max_tokens: int) -> str:
+    response = await _async_ollama().chat(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        options={"temperature": 0, "num_predict": max_tokens},
+    )
+    return response["message"]["content"]
 
-    _GROQ_CLIENTS = [Groq(api_key=key) for key in deduped]
-    return _GROQ_CLIENTS
 
+async def _ollama_stream(prompt: str, max_tokens: int):
+    stream = await _async_ollama().chat(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        options={"temperature": 0, "num_predict": max_tokens},
+        stream=True,
+    )
+    async for chunk in stream:
+        delta = chunk["message"]["content"]
+        if delta:
+            yield delta
 
-def _is_rate_limited_error(exc: Exception) -> bool:
-    status_code = getattr(exc, "status_code", None)
-    if status_code == 429:
-        return True
 
-    msg = str(exc).lower()
-    return "rate" in msg and "limit" in msg or "too many requests" in msg or "rpm" in msg
+# Groq comes from the backend; the agent's local model differs (temperature 0).
+OLLAMA = Provider("ollama", _ollama_chat, _aollama_chat, _ollama_stream, model=MODEL, temperature=0)
 
 
-def _chat_with_groq_failover(prompt: str, max_tokens: int) -> str:
-    global _GROQ_START_INDEX
+def _providers() -> list:
+    # Groq first when enabled; the local model takes over while Groq's breaker is open.
+    return [GROQ, OLLAMA] if USE_GROQ else [OLLAMA]
 
-    clients = _load_groq_clients()
-    errors = []
 
-    for attempt in range(len(clients)):
-        idx = (_GROQ_START_INDEX + attempt) % len(clients)
-        client = clients[idx]
-        try:
-            response = client.chat.completions.create(
-                model=GROQ_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-            )
-            _GROQ_START_INDEX = (idx + 1) % len(clients)
-            return response.choices[0].message.content
-        except Exception as exc:
-            errors.append(exc)
-            if _is_rate_limited_error(exc):
-                continue
-            raise
+def chat(prompt: str, max_tokens: int = 300) -> str:
+    return llm_router.complete(_providers(), prompt, max_tokens)
 
-    raise RuntimeError(f"All Groq keys exhausted/failed: {[str(e) for e in errors]}")
 
+async def achat(prompt: str, max_tokens: int = 300) -> str:
+    return await llm_router.acomplete(_providers(), prompt, max_tokens)
 
-def chat(prompt: str, max_tokens: int = 300) -> str:
-    if USE_GROQ:
-        return _chat_with_groq_failover(prompt=prompt, max_tokens=max_tokens)
 
-    response = ollama.chat(
-        model=MODEL,
-        messages=[{"role": "user", "content": prompt}],
-        options={"temperature": 0, "num_predict": max_tokens},
-    )
-    return response["message"]["content"]
+async def astream_chat(prompt: str, max_tokens: int = 300):
+    """Yields the completion as text deltas. Key and provider fallback only happen before the first token."""
+    async for delta in llm_router.astream(_providers(), prompt, max_tokens):
+        yield delta
 
 
 def extract_json(text: str) -> dict:
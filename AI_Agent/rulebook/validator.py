@@ -31,6 +31,14 @@ DEFAULT_RULES = [
         "scope": "same_file",
         "max_chunks": 2,
     },
+    {
+        "name": "blind_adjacent_lines",
+        "allowed_intents": ["Explain", "Analyze", "Modify", "Refactor", "Debug"],
+        "source_code_types": ["text:chunk"],
+        "allowed_requested_code_types": [],
+        "scope": "adjacent",
+        "max_chunks": 3,
+    },
 ]
 
 
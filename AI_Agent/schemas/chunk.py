@@ -14,3 +14,5 @@ class Chunk(BaseModel):
     end_line: Optional[int]
 
     symbols: Optional[List[str]]  # function/class names if available
+
+    score: Optional[float] = None  # query similarity, for search hits only
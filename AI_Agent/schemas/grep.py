@@ -0,0 +1,11 @@
+# schemas/grep.py
+from typing import Optional
+from pydantic import BaseModel
+
+
+class GrepMatch(BaseModel):
+    chunk_id: Optional[str]
+    file_path: str
+
+    line: int       # 1-based line of the match
+    text: str       # full matching line
@@ -1,24 +1,64 @@
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 
 from AI_Agent.schemas.chunk import Chunk
 
 
+def _merge_spans(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
 class FileSystemClient:
-    def get_file_chunks(self, file_path: str) -> List[Chunk]:
-        path = Path(file_path)
+    def get_file_chunks(
+        self,
+        file_path: str,
+        spans: Optional[List[Tuple[int, int]]] = None,
+        root: Optional[Path] = None,
+    ) -> List[Chunk]:
+        """
+        Loads a file as chunks. With `spans` (1-based inclusive line ranges),
+        only those regions are returned instead of the whole file.
+        """
+        path = Path(root) / file_path if root else Path(file_path)
         if not path.exists() or not path.is_file():
             return []
 
         content = path.read_text(encoding="utf-8", errors="ignore")
-        return [
-            Chunk(
-                chunk_id=f"local:{file_path}",
-                file_path=file_path,
-                content=content,
-                code_type=None,
-                start_line=1,
-                end_line=len(content.splitlines()),
-                symbols=None,
+        if not spans:
+            return [
+                Chunk(
+                    chunk_id=f"local:{file_path}",
+                    file_path=file_path,
+                    content=content,
+                    code_type=None,
+                    start_line=1,
+                    end_line=len(content.splitlines()),
+                    symbols=None,
+                )
+            ]
+
+        lines = content.splitlines()
+        chunks = []
+        for start, end in _merge_spans(spans):
+            start = max(start, 1)
+            end = min(end, len(lines))
+            if start > end:
+                continue
+            chunks.append(
+                Chunk(
+                    chunk_id=f"local:{file_path}:{start}-{end}",
+                    file_path=file_path,
+                    content="\n".join(lines[start - 1:end]),
+                    code_type=None,
+                    start_line=start,
+                    end_line=end,
+                    symbols=None,
+                )
             )
-        ]
+        return chunks
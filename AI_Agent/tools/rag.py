@@ -1,8 +1,11 @@
+import asyncio
 import os
 
+import httpx
 import requests
 
 from AI_Agent.schemas.chunk import Chunk
+from AI_Agent.schemas.grep import GrepMatch
 
 
 class RAGClient:
@@ -12,23 +15,86 @@ class RAGClient:
     def _can_use_internal(self) -> bool:
         return self.USE_INTERNAL_RAG and self.BASE_URL in {"http://localhost:8000", "http://127.0.0.1:8000"}
 
-    def retrieve_chunks(self, query: str, top_k: int, repo_url: str):
+    @staticmethod
+    def _scope(path_prefix=None, path_glob=None, language=None, code_type=None) -> dict:
+        # Only scope fields that were set are forwarded.
+        scope = {
+            "path_prefix": path_prefix,
+            "path_glob": path_glob,
+            "language": language,
+            "code_type": code_type,
+        }
+        return {key: value for key, value in scope.items() if value}
+
+    def retrieve_chunks(
+        self,
+        query: str,
+        top_k: int,
+        repo_url: str,
+        path_prefix=None,
+        path_glob=None,
+        language=None,
+        code_type=None,
+        timeout: float = 60,
+    ):
+        scope = self._scope(path_prefix, path_glob, language, code_type)
+
         if self._can_use_internal():
             from backend.tasks.query.rag.agent_rag import retrieve_chunks_for_agent
 
-            chunks = retrieve_chunks_for_agent(query=query, top_k=top_k, repo_url=repo_url)
+            chunks = retrieve_chunks_for_agent(query=query, top_k=top_k, repo_url=repo_url, **scope)
             return [Chunk(**c) for c in chunks]
 
-
-    def retrieve_chunks(self, query: str, top_k: int, repo_url: str):
         response = requests.post(
             f"{self.BASE_URL}/rag/retrieve",
-            json={"repo_url": repo_url, "query": query, "top_k": top_k},
-            timeout=60,
+            json={"repo_url": repo_url, "query": query, "top_k": top_k, **scope},
+            timeout=timeout,
         )
         response.raise_for_status()
         return [Chunk(**c) for c in response.json()["chunks"]]
 
+    async def aretrieve_chunks(
+        self,
+        query: str,
+        top_k: int,
+        repo_url: str,
+        path_prefix=None,
+        path_glob=None,
+        language=None,
+        code_type=None,
+        timeout: float = 60,
+    ):
+        scope = self._scope(path_prefix, path_glob, language, code_type)
+
+        if self._can_use_internal():
+            from backend.tasks.query.rag.agent_rag import aretrieve_chunks_for_agent
+
+            chunks = await asyncio.wait_for(
+                aretrieve_chunks_for_agent(query=query, top_k=top_k, repo_url=repo_url, **scope),
+                timeout,
+            )
+            return [Chunk(**c) for c in chunks]
+
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.post(
+                f"{self.BASE_URL}/rag/retrieve",
+                json={"repo_url": repo_url, "query": query, "top_k": top_k, **scope},
+            )
+        response.raise_for_status()
+        return [Chunk(**c) for c in response.json()["chunks"]]
+
+    # Expansion, locate and grep are metadata scrolls and local index scans;
+    # their async forms run the blocking client in a worker thread.
+
+    async def aexpand_context(self, **kwargs):
+        return await asyncio.to_thread(self.expand_context, **kwargs)
+
+    async def alocate_symbol(self, symbol: str, repo_url: str, exact_only: bool = False, timeout: float = 60):
+        return await asyncio.to_thread(self.locate_symbol, symbol, repo_url, exact_only, timeout)
+
+    async def agrep(self, pattern: str, repo_url: str, **kwargs):
+        return await asyncio.to_thread(self.grep, pattern, repo_url, **kwargs)
+
     def expand_context(
         self,
         repo_url: str,
@@ -36,6 +102,7 @@ class RAGClient:
         requested_code_types: list[str],
         scope: str,
         max_chunks: int,
+        timeout: float = 60,
     ):
         if self._can_use_internal():
             from backend.tasks.query.rag.agent_rag import expand_context_for_agent
@@ -58,7 +125,57 @@ class RAGClient:
                 "scope": scope,
                 "max_chunks": max_chunks,
             },
-            timeout=60,
+            timeout=timeout,
         )
         response.raise_for_status()
         return [Chunk(**c) for c in response.json()["chunks"]]
+
+    def locate_symbol(self, symbol: str, repo_url: str, exact_only: bool = False, timeout: float = 60):
+        if self._can_use_internal():
+            from backend.tasks.query.rag.agent_rag import locate_symbol_for_agent
+
+            chunks = locate_symbol_for_agent(symbol=symbol, repo_url=repo_url, exact_only=exact_only)
+            return [Chunk(**c) for c in chunks]
+
+        response = requests.post(
+            f"{self.BASE_URL}/rag/locate",
+            json={"repo_url": repo_url, "symbol": symbol, "exact_only": exact_only},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return [Chunk(**c) for c in response.json()["chunks"]]
+
+    def grep(
+        self,
+        pattern: str,
+        repo_url: str,
+        regex: bool = False,
+        case_sensitive: bool = True,
+        max_results: int = 50,
+        timeout: float = 60,
+    ):
+        if self._can_use_internal():
+            from backend.tasks.query.rag.grep import grep_for_agent
+
+            matches = grep_for_agent(
+                pattern=pattern,
+                repo_url=repo_url,
+                regex=regex,
+                case_sensitive=case_sensitive,
+                max_results=max_results,
+            )
+            return [GrepMatch(**m) for m in matches]
+
+        response = requests.post(
+            f"{self.BASE_URL}/rag/grep",
+            json={
+                "repo_url": repo_url,
+                "pattern": pattern,
+                "regex": regex,
+                "case_sensitive": case_sensitive,
+                "max_results": max_results,
+            },
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return [GrepMatch(**m) for m in response.json()["matches"]]
@@ -1,10 +1,19 @@
 import os
+from pathlib import Path
 
 EMBEDDING_MODEL = "nomic-embed-text"
+# Matryoshka truncation: keep the first N dims of each embedding and renormalize.
+# Unset/0 keeps the model's full width. Changing it requires a re-ingest.
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "0")) or None
 LLM_MODEL = "llama3.2:3b"
 CHUNK_SIZE = 800
 CHUNK_OVERLAP = 200
 USE_GROQ = os.getenv("USE_GROQ", "false").lower() == "true"
-GROQ_MODEL = "llama-3.1-8b-instant"
-
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+# Local generation can be slow, but a hung Ollama must still fail over eventually.
+OLLAMA_TIMEOUT_S = float(os.getenv("OLLAMA_TIMEOUT_S", "120"))
 
+# Local on-disk artifacts built at ingest time (search indexes, content stores).
+INDEX_DATA_DIR = Path(
+    os.getenv("INDEX_DATA_DIR", str(Path(__file__).resolve().parents[1] / ".index_data"))
+)
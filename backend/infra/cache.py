@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+
+_MISSING = object()
+_REGISTRY: Dict[str, Any] = {}
+
+
+def register_cache(name: str, cache: Any) -> Any:
+    """Registers a cache so its counters show up in `cache_stats()`."""
+    _REGISTRY[name] = cache
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _REGISTRY.items()}
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU with optional TTL and byte budget.
+
+    Entries are evicted least-recently-used first once either `max_entries`
+    or `max_bytes` (measured with `sizeof`) is exceeded.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda _value: 0)
+
+        self._data: "OrderedDict[Any, tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: Any) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            stored_at, _, value = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                self._drop(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if self.max_entries <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+                return
+
+            self._data[key] = (time.monotonic(), size, value)
+            self._bytes += size
+
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+class SQLiteCache:
+    """
+    Optional on-disk cache tier shared between worker processes.
+
+    Values are stored as JSON, keys as text. Expired rows are ignored on
+    read and lazily deleted.
+    """
+
+    def __init__(self, path: str | Path, table: str, ttl_seconds: Optional[float] = None):
+        self.path = str(path)
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            row = self._conn().execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return default
+
+        value, stored_at = row
+        if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+            self.pop(key)
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time()),
+                )
+        except sqlite3.Error:
+            # The disk tier is best-effort; the in-memory tier still serves.
+            pass
+
+    def pop(self, key: str) -> None:
+        try:
+            with self._conn() as conn:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+class TieredCache:
+    """In-memory LRU in front of an optional SQLite tier; disk hits are promoted."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        if self.disk is not None:
+            value = self.disk.get(key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+
+        return default
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
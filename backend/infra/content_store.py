@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+try:
+    import zstandard
+except ImportError:  # Optional: fall back to zlib when zstandard is not installed.
+    zstandard = None
+
+from backend.infra.storage import repo_data_dir, served_data_dir
+
+
+CONTENT_FILE = "content.bin"
+INDEX_FILE = "content_index.json"
+CONTENT_STORE_ENABLED = os.getenv("CONTENT_STORE_ENABLED", "true").lower() == "true"
+ZSTD_LEVEL = int(os.getenv("CONTENT_STORE_ZSTD_LEVEL", "3"))
+
+_LOADED: Dict[str, tuple[float, "ContentStore"]] = {}
+_LOAD_LOCK = threading.Lock()
+
+
+def _codec_name() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _compress(data: bytes) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Content store was written with zstd; install `zstandard` to read it.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class ContentStoreWriter:
+    """
+    Append-only writer for chunk bodies, keyed by Qdrant point id.
+
+    Bodies are compressed one by one into a single blob file; the offset
+    index is written on `close()` and both files are swapped in atomically.
+    """
+
+    def __init__(self, repo_url: Optional[str], version: Optional[str] = None):
+        self.directory = repo_data_dir(repo_url, create=True, version=version)
+        self.codec = _codec_name()
+        self._offsets: Dict[str, list[int]] = {}
+        self._blob = open(self.directory / (CONTENT_FILE + ".tmp"), "wb")
+        self._position = 0
+        self.raw_bytes = 0
+
+    def put(self, point_id: str, content: str) -> None:
+        raw = (content or "").encode("utf-8")
+        data = _compress(raw)
+        self._blob.write(data)
+        self._offsets[str(point_id)] = [self._position, len(data)]
+        self._position += len(data)
+        self.raw_bytes += len(raw)
+
+    def close(self) -> None:
+        self._blob.close()
+        tmp_index = self.directory / (INDEX_FILE + ".tmp")
+        tmp_index.write_text(json.dumps({"codec": self.codec, "offsets": self._offsets}), encoding="utf-8")
+        (self.directory / (CONTENT_FILE + ".tmp")).replace(self.directory / CONTENT_FILE)
+        tmp_index.replace(self.directory / INDEX_FILE)
+
+        with _LOAD_LOCK:
+            replaced = _LOADED.pop(str(self.directory), None)
+        if replaced:
+            replaced[1].close()
+
+    def discard(self) -> None:
+        """Drops a partial write (failed ingest); the served files are left untouched."""
+        self._blob.close()
+        (self.directory / (CONTENT_FILE + ".tmp")).unlink(missing_ok=True)
+
+    @property
+    def stored_bytes(self) -> int:
+        return self._position
+
+
+class ContentStore:
+    """Read side: memory-maps the blob file and decompresses bodies on demand."""
+
+    def __init__(self, directory: Path):
+        meta = json.loads((directory / INDEX_FILE).read_text(encoding="utf-8"))
+        self.codec = meta["codec"]
+        self.offsets: Dict[str, list[int]] = meta["offsets"]
+
+        blob_path = directory / CONTENT_FILE
+        self._file = open(blob_path, "rb")
+        self._mmap = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if blob_path.stat().st_size
+            else b""
+        )
+
+    def get(self, point_id: str) -> Optional[str]:
+        entry = self.offsets.get(str(point_id))
+        if entry is None:
+            return None
+        start, length = entry
+        return _decompress(self.codec, self._mmap[start:start + length]).decode("utf-8")
+
+    def get_many(self, point_ids: Iterable[str]) -> Dict[str, str]:
+        bodies = {}
+        for pid in point_ids:
+            body = self.get(pid)
+            if body is not None:
+                bodies[str(pid)] = body
+        return bodies
+
+    def close(self) -> None:
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+
+def load_content_store(repo_url: Optional[str], version: Optional[str] = None) -> Optional[ContentStore]:
+    """
+    Opens (and memoizes per index mtime) the content store for a repo, as
+    written for collection `version` (the `index_version` point payload).
+    """
+    directory = served_data_dir(repo_url, version, INDEX_FILE)
+    index_path = directory / INDEX_FILE
+    if not index_path.exists():
+        return None
+
+    mtime = index_path.stat().st_mtime
+    key = str(directory)
+    with _LOAD_LOCK:
+        cached = _LOADED.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        store = ContentStore(directory)
+        _LOADED[key] = (mtime, store)
+        if cached:
+            # A re-ingest rewrote the store; release the old file handle and mapping.
+            cached[1].close()
+        return store
+
+
+def release_content_stores(directory: Path) -> None:
+    """Closes loaded stores under `directory` (a collection version being dropped)."""
+    prefix = str(directory)
+    with _LOAD_LOCK:
+        keys = [key for key in _LOADED if key == prefix or key.startswith(prefix + os.sep)]
+        released = [_LOADED.pop(key)[1] for key in keys]
+    for store in released:
+        store.close()
+
+
+def fetch_content(repo_url: Optional[str], point_id: str, version: Optional[str] = None) -> str:
+    store = load_content_store(repo_url, version)
+    if store is None:
+        return ""
+    return store.get(point_id) or ""
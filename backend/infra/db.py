@@ -1,36 +1,221 @@
+import asyncio
 import os
+import re
+import threading
+import time
+import weakref
+from typing import Protocol
+
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, PayloadSchemaType, VectorParams
-from qdrant_client.models import VectorParams, Distance
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CreateAlias,
+    CreateAliasOperation,
+    Datatype,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+
+from backend.config import INDEX_DATA_DIR
+from backend.infra.storage import drop_version_data, list_version_data
 
 load_dotenv()
 
 _client = None
+_remote_client = None
+# Async clients hold connection pools bound to the event loop that opened them.
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+class VectorStore(Protocol):
+    """
+    The slice of the QdrantClient API the indexer relies on.
 
+    `QdrantClient` satisfies it natively; `NumpyVectorStore` implements it
+    in-process for small or offline deployments.
+    """
 
-def get_qdrant_client():
-    global _client
+    def collection_exists(self, collection_name: str) -> bool: ...
+    def get_collections(self): ...
+    def get_collection(self, collection_name: str): ...
+    def create_collection(self, collection_name: str, vectors_config, **kwargs): ...
+    def update_collection(self, collection_name: str, **kwargs): ...
+    def delete_collection(self, collection_name: str, **kwargs): ...
+    def create_payload_index(self, collection_name: str, field_name: str, **kwargs): ...
+    def get_aliases(self): ...
+    def update_collection_aliases(self, change_aliases_operations, **kwargs): ...
+    def upsert(self, collection_name: str, points, **kwargs): ...
+    def query_points(self, collection_name: str, query, limit: int = 10, **kwargs): ...
+    def query_points_groups(self, collection_name: str, group_by: str, query, limit: int = 10, **kwargs): ...
+    def scroll(self, collection_name: str, **kwargs): ...
+    def retrieve(self, collection_name: str, ids, **kwargs): ...
+    def count(self, collection_name: str, **kwargs): ...
+
+
+def get_qdrant_client() -> VectorStore:
+    global _client, _remote_client
 
     if _client is None:
-        host = os.getenv("QDRANT_HOST", "localhost")
-        port = int(os.getenv("QDRANT_PORT", 6333))
-        _client = QdrantClient(host=host, port=port)
+        # VECTOR_BACKEND=numpy runs without a Qdrant server (exact search, persisted locally).
+        if os.getenv("VECTOR_BACKEND", "qdrant").lower() == "numpy":
+            from backend.infra.numpy_store import NumpyVectorStore
+
+            _client = NumpyVectorStore(os.getenv("NUMPY_STORE_PATH") or INDEX_DATA_DIR / "vectors")
+        else:
+            host = os.getenv("QDRANT_HOST", "localhost")
+            port = int(os.getenv("QDRANT_PORT", 6333))
+            _client = QdrantClient(host=host, port=port)
+            _remote_client = _client
 
     return _client
 
 
+class ThreadedAsyncStore:
+    """Async facade over a blocking VectorStore: every call runs in a worker thread."""
+
+    def __init__(self, store: VectorStore):
+        self.store = store
+
+    def __getattr__(self, name):
+        method = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+def get_async_qdrant_client():
+    """
+    Awaitable counterpart of `get_qdrant_client` for the request path.
+
+    A Qdrant server gets a native `AsyncQdrantClient` per event loop; in-process
+    backends (NumPy store, local Qdrant) are wrapped so they never block the loop.
+    """
+    client = get_qdrant_client()
+    if client is not _remote_client:
+        return ThreadedAsyncStore(client)
+
+    loop = asyncio.get_running_loop()
+    async_client = _async_clients.get(loop)
+    if async_client is None:
+        host = os.getenv("QDRANT_HOST", "localhost")
+        port = int(os.getenv("QDRANT_PORT", 6333))
+        async_client = AsyncQdrantClient(host=host, port=port)
+        _async_clients[loop] = async_client
+    return async_client
+
+
 def get_collection_name():
     return os.getenv("QDRANT_COLLECTION_NAME", "code_embeddings")
 
 
+def files_collection_name(collection_name=None):
+    """Companion collection holding one file-level vector per indexed file."""
+    return f"{collection_name or get_collection_name()}_files"
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def _env_float(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() == "true"
+
+
+def _quantization_config():
+    # QDRANT_QUANTIZATION: "none" (default), "scalar" (int8, ~4x smaller) or "binary" (~32x smaller).
+    # Quantized vectors stay in RAM while originals can live on disk for rescoring.
+    mode = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+    always_ram = _env_bool("QDRANT_QUANTIZATION_ALWAYS_RAM", True)
+
+    if mode == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=_env_float("QDRANT_QUANTIZATION_QUANTILE") or 0.99,
+                always_ram=always_ram,
+            )
+        )
+    if mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+    return None
+
+
+def _hnsw_config():
+    m = _env_int("QDRANT_HNSW_M")
+    ef_construct = _env_int("QDRANT_HNSW_EF_CONSTRUCT")
+    if m is None and ef_construct is None:
+        return None
+    return HnswConfigDiff(m=m, ef_construct=ef_construct)
+
+
+def _vectors_config(vector_size: int) -> VectorParams:
+    datatype = os.getenv("QDRANT_VECTOR_DATATYPE", "float32").lower()
+    return VectorParams(
+        size=vector_size,
+        distance=Distance.COSINE,
+        on_disk=_env_bool("QDRANT_VECTORS_ON_DISK", False),
+        datatype=Datatype.FLOAT16 if datatype == "float16" else None,
+    )
+
+
+def get_search_params(hnsw_ef=None, oversampling=None):
+    """
+    Search-time knobs matching the collection's storage options.
+
+    Explicit arguments win over QDRANT_SEARCH_EF / QDRANT_SEARCH_OVERSAMPLING.
+    Returns None when nothing is configured so Qdrant keeps its defaults.
+    """
+    hnsw_ef = hnsw_ef if hnsw_ef is not None else _env_int("QDRANT_SEARCH_EF")
+    oversampling = oversampling if oversampling is not None else _env_float("QDRANT_SEARCH_OVERSAMPLING")
+
+    quantization = None
+    if os.getenv("QDRANT_QUANTIZATION", "none").lower() != "none" or oversampling is not None:
+        quantization = QuantizationSearchParams(
+            rescore=_env_bool("QDRANT_SEARCH_RESCORE", True),
+            oversampling=oversampling,
+        )
+
+    if hnsw_ef is None and quantization is None:
+        return None
+    return SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+
 def _ensure_payload_indexes(client: QdrantClient, collection_name: str):
-    # Filter-heavy query paths (/rag/retrieve and /rag/expand) rely on these fields.
+    # Filter-heavy query paths (/rag/retrieve, /rag/expand and /rag/locate) rely on these fields.
     # Keeping payload indexes in place avoids expensive full scans.
     indexed_fields = {
         "repo_url": PayloadSchemaType.KEYWORD,
         "file_path": PayloadSchemaType.KEYWORD,
         "chunk_type": PayloadSchemaType.KEYWORD,
+        # Scoped retrieval: language and directory-prefix filters.
+        "language": PayloadSchemaType.KEYWORD,
+        "path_prefixes": PayloadSchemaType.KEYWORD,
+        # Symbol lookups for the Locate fast path.
+        "identifier": PayloadSchemaType.KEYWORD,
+        "class_name": PayloadSchemaType.KEYWORD,
+        # Line spans back range queries for adjacent-chunk expansion.
+        "start_line": PayloadSchemaType.INTEGER,
+        "end_line": PayloadSchemaType.INTEGER,
     }
 
     for field_name, schema in indexed_fields.items():
@@ -47,26 +232,219 @@ def _ensure_payload_indexes(client: QdrantClient, collection_name: str):
             pass
 
 
-def create_collection(vector_size: int):
+def create_collection(vector_size: int, collection_name=None):
     client = get_qdrant_client()
-    collection_name = get_collection_name()
-
-    collections = [c.name for c in client.get_collections().collections]
+    collection_name = collection_name or get_collection_name()
 
-    if collection_name not in collections:
+    # collection_exists also resolves aliases, so the served alias is never shadowed.
+    if not client.collection_exists(collection_name):
         client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+            vectors_config=_vectors_config(vector_size),
+            hnsw_config=_hnsw_config(),
+            quantization_config=_quantization_config(),
         )
 
     _ensure_payload_indexes(client, collection_name)
 
 
-def clear_collection():
+# Segment size (KB) restored after a bulk load when the collection had none set.
+DEFAULT_MAX_SEGMENT_SIZE = 200_000
+
+
+class IndexingTimeout(RuntimeError):
+    """A collection did not finish indexing (turn green) in time."""
+
+
+def begin_bulk_load(collection_name=None):
+    """
+    Switches a collection into a bulk-load profile: HNSW indexing is deferred
+    (indexing_threshold=0) and segments may grow larger, so upserts only append.
+
+    Returns the optimizer settings to hand back to `end_bulk_load`, or None
+    when bulk loading is disabled (QDRANT_BULK_LOAD=false).
+    """
+    if not _env_bool("QDRANT_BULK_LOAD", True):
+        return None
+
+    client = get_qdrant_client()
+    collection_name = collection_name or get_collection_name()
+    current = client.get_collection(collection_name).config.optimizer_config
+
+    client.update_collection(
+        collection_name=collection_name,
+        optimizers_config=OptimizersConfigDiff(
+            indexing_threshold=0,
+            max_segment_size=_env_int("QDRANT_BULK_MAX_SEGMENT_SIZE") or 1_000_000,
+        ),
+    )
+    return OptimizersConfigDiff(
+        # Qdrant's documented default when none was set explicitly.
+        indexing_threshold=current.indexing_threshold if current.indexing_threshold is not None else 10_000,
+        # An unset max_segment_size cannot be cleared through a diff, so restore an explicit one.
+        max_segment_size=current.max_segment_size or _env_int("QDRANT_MAX_SEGMENT_SIZE") or DEFAULT_MAX_SEGMENT_SIZE,
+    )
+
+
+def end_bulk_load(previous, collection_name=None, timeout=None, wait=True):
+    """
+    Restores the optimizer settings from `begin_bulk_load` and, with `wait`,
+    blocks until indexing has finished (see `wait_for_green`).
+    """
+    if previous is None:
+        return
+
+    client = get_qdrant_client()
+    collection_name = collection_name or get_collection_name()
+    client.update_collection(collection_name=collection_name, optimizers_config=previous)
+    if wait:
+        wait_for_green(collection_name, timeout=timeout)
+
+
+def wait_for_green(collection_name=None, timeout=None, poll_interval=0.5):
+    """Polls until the collection is green; raises IndexingTimeout once `timeout` passes."""
+    client = get_qdrant_client()
+    collection_name = collection_name or get_collection_name()
+    timeout = timeout if timeout is not None else (_env_float("QDRANT_INDEXING_TIMEOUT") or 600)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        status = getattr(client.get_collection(collection_name).status, "value", None)
+        if status == "green":
+            return status
+        if time.monotonic() >= deadline:
+            raise IndexingTimeout(f"collection {collection_name} still {status} after {timeout:.0f}s")
+        if status == "grey":
+            # Grey means optimizations are pending but not triggered; an empty diff triggers them.
+            client.update_collection(collection_name=collection_name, optimizers_config=OptimizersConfigDiff())
+        time.sleep(poll_interval)
+
+
+# -------------------------
+# Blue/Green Versions
+# -------------------------
+
+# `get_collection_name()` is a Qdrant alias. Ingest builds into a fresh
+# `<alias>_v<timestamp>` collection and switches the alias atomically, so
+# queries keep hitting the previous version until the new one is complete.
+
+def _version_number(collection_name, alias):
+    match = re.fullmatch(rf"{re.escape(alias)}_v(\d+)", collection_name)
+    return int(match.group(1)) if match else None
+
+
+def list_collection_versions(alias=None):
+    alias = alias or get_collection_name()
+    names = [c.name for c in get_qdrant_client().get_collections().collections]
+    versions = [n for n in names if _version_number(n, alias) is not None]
+    return sorted(versions, key=lambda n: _version_number(n, alias))
+
+
+def next_collection_version(alias=None):
+    alias = alias or get_collection_name()
+    version = time.time_ns() // 1_000_000
+    for existing in list_collection_versions(alias):
+        version = max(version, _version_number(existing, alias) + 1)
+    return f"{alias}_v{version}"
+
+
+def resolve_alias(alias=None):
+    alias = alias or get_collection_name()
+    for description in get_qdrant_client().get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+def _alias_operations(collection_name, alias):
     client = get_qdrant_client()
-    collection_name = get_collection_name()
+    operations = []
+    if resolve_alias(alias) is not None:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    elif alias in [c.name for c in client.get_collections().collections]:
+        # One-time migration: a pre-alias deployment has a plain collection under the alias name.
+        client.delete_collection(collection_name=alias)
+    operations.append(
+        CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias))
+    )
+    return operations
 
+
+def switch_alias(collection_name, alias=None):
+    """
+    Points `alias` at `collection_name` in a single alias transaction; the
+    file-level companion alias moves in the same transaction when present.
+
+    Returns the collection the alias pointed at before, if any.
+    """
+    client = get_qdrant_client()
+    alias = alias or get_collection_name()
+    previous = resolve_alias(alias)
+
+    operations = _alias_operations(collection_name, alias)
+    if client.collection_exists(files_collection_name(collection_name)):
+        operations += _alias_operations(files_collection_name(collection_name), files_collection_name(alias))
+
+    client.update_collection_aliases(change_aliases_operations=operations)
+    return previous
+
+
+def drop_collection_version(collection_name):
+    """Deletes a version together with its file-level companion and local side stores."""
+    client = get_qdrant_client()
     client.delete_collection(collection_name=collection_name)
+    if client.collection_exists(files_collection_name(collection_name)):
+        client.delete_collection(collection_name=files_collection_name(collection_name))
+    drop_version_data(collection_name)
+
+
+def drop_stale_versions(current, previous, alias=None):
+    """Drops versions older than `previous`: leftovers from failed ingests or lost GC timers."""
+    alias = alias or get_collection_name()
+    cutoff = _version_number(previous, alias) if previous else None
+    if cutoff is None:
+        return
+
+    for name in list_collection_versions(alias):
+        if name != current and _version_number(name, alias) < cutoff:
+            drop_collection_version(name)
+
+    # Side stores whose collection is already gone (e.g. a restart lost the GC timer).
+    for name in list_version_data():
+        number = _version_number(name, alias)
+        if number is not None and name != current and number < cutoff:
+            drop_version_data(name)
+
+
+def drop_collection_later(collection_name, delay=None, alias=None):
+    """Deletes a retired version after a grace period so in-flight queries can finish."""
+    if delay is None:
+        delay = _env_float("QDRANT_ALIAS_GC_SECONDS")
+        delay = 300 if delay is None else delay
+    alias = alias or get_collection_name()
+
+    def _drop():
+        try:
+            if resolve_alias(alias) != collection_name:
+                drop_collection_version(collection_name)
+        except Exception:
+            # Best-effort; the next ingest drops stale versions anyway.
+            pass
+
+    timer = threading.Timer(delay, _drop)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def clear_collection():
+    client = get_qdrant_client()
+    alias = get_collection_name()
+
+    for name in list_collection_versions(alias):
+        drop_collection_version(name)
+    if alias in [c.name for c in client.get_collections().collections]:
+        client.delete_collection(collection_name=alias)
 
 
 class _QdrantCollectionAdapter:
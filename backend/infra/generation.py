@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent bumps from several workers are not serialized.
+    fcntl = None
+
+from backend.infra import storage
+
+
+# Per-repo index generation numbers. Caches tag entries with the generation
+# they were computed under and drop them once it moves on.
+#
+# The numbers live in a small JSON file under INDEX_DATA_DIR so every worker
+# process sees a bump made by the one that ran the ingest; each process
+# re-reads it when the file changes, at most every GENERATION_CHECK_INTERVAL_S.
+GENERATION_FILE = "index_generations.json"
+GENERATION_CHECK_INTERVAL_S = float(os.getenv("GENERATION_CHECK_INTERVAL_S", "1.0"))
+
+logger = logging.getLogger("backend.generation")
+
+_lock = threading.Lock()
+_state = {"base": 0, "repos": {}, "active_version": None}
+_signature = None
+_checked_at = 0.0
+
+
+def _path():
+    return storage.INDEX_DATA_DIR / GENERATION_FILE
+
+
+def _file_signature(path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (str(path), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _refresh(force: bool = False) -> None:
+    """Re-reads the shared file if another process changed it. Caller holds `_lock`."""
+    global _state, _signature, _checked_at
+
+    now = time.monotonic()
+    if not force and now - _checked_at < GENERATION_CHECK_INTERVAL_S:
+        return
+    _checked_at = now
+
+    path = _path()
+    signature = _file_signature(path)
+    if signature is None or signature == _signature:
+        # No file yet (or an unwritable data dir): keep the in-process numbers.
+        return
+
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    _state = {
+        "base": int(data.get("base", 0)),
+        "repos": dict(data.get("repos", {})),
+        "active_version": data.get("active_version"),
+    }
+    _signature = signature
+
+
+def _write() -> None:
+    global _signature
+
+    path = _path()
+    tmp = path.with_name(f"{GENERATION_FILE}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(_state), encoding="utf-8")
+    tmp.replace(path)
+    _signature = _file_signature(path)
+
+
+def index_generation(repo_url: Optional[str]) -> int:
+    with _lock:
+        _refresh()
+        return _state["base"] + _state["repos"].get(repo_url or "", 0)
+
+
+def active_index_version() -> Optional[str]:
+    """The collection version the alias was last switched to, i.e. whose side stores are served."""
+    with _lock:
+        _refresh()
+        return _state["active_version"]
+
+
+def bump_index_generation(repo_url: Optional[str] = None) -> int:
+    """
+    Advances the generation for one repo, or for every repo when `repo_url`
+    is None (e.g. after the whole collection was dropped).
+    """
+    return _update(lambda: _advance(repo_url))
+
+
+def publish_index_version(version: str) -> int:
+    """
+    Records `version` as the served collection right after the alias switch,
+    and advances every repo's generation in the same write.
+    """
+
+    def publish():
+        _state["active_version"] = version
+        return _advance(None)
+
+    return _update(publish)
+
+
+def _update(change):
+    with _lock:
+        result = None
+        try:
+            path = _path()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path.with_name(GENERATION_FILE + ".lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Re-read under the file lock so concurrent bumps from other workers are kept.
+                _refresh(force=True)
+                result = change()
+                _write()
+        except OSError as exc:
+            logger.warning("generation_persist_failed error=%s; the change is visible to this process only", exc)
+            if result is None:
+                result = change()
+        return result
+
+
+def _advance(repo_url: Optional[str]) -> int:
+    if repo_url is None:
+        _state["base"] += 1
+        return _state["base"]
+
+    key = repo_url or ""
+    _state["repos"][key] = _state["repos"].get(key, 0) + 1
+    return _state["base"] + _state["repos"][key]
@@ -0,0 +1,450 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import re
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+
+# Starting limits per key until the first response reports the real ones.
+GROQ_DEFAULT_RPM = int(os.getenv("GROQ_DEFAULT_RPM", "30"))
+GROQ_DEFAULT_TPM = int(os.getenv("GROQ_DEFAULT_TPM", "6000"))
+# How long a call may queue for a key with spare capacity before it fails.
+GROQ_QUEUE_TIMEOUT_S = float(os.getenv("GROQ_QUEUE_TIMEOUT_S", "10"))
+GROQ_MAX_ATTEMPTS = int(os.getenv("GROQ_MAX_ATTEMPTS", "3"))
+GROQ_TIMEOUT_S = float(os.getenv("GROQ_TIMEOUT_S", "30"))
+# Cool-down for a key after a 429 that carries no retry-after header.
+DEFAULT_RETRY_AFTER_S = 1.0
+
+logger = logging.getLogger("backend.groq_pool")
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class GroqPoolExhausted(RuntimeError):
+    """No key had capacity within the queue timeout, or every attempt was rate limited."""
+
+
+def groq_keys() -> List[str]:
+    keys = [
+        os.getenv("GROQ_API_KEY"),
+        os.getenv("GROQ_API_KEY_1"),
+        os.getenv("GROQ_API_KEY_2"),
+        os.getenv("GROQ_API_KEY_PRIMARY"),
+        os.getenv("GROQ_API_KEY_SECONDARY"),
+    ]
+    seen = set()
+    deduped = []
+    for key in keys:
+        if key and key not in seen:
+            deduped.append(key)
+            seen.add(key)
+
+    if not deduped:
+        raise RuntimeError("No Groq API key configured. Set GROQ_API_KEY (or _1/_2).")
+    return deduped
+
+
+def parse_duration(value: Any) -> Optional[float]:
+    """Seconds in a Groq reset header ("7.66s", "2m59.56s", "120ms") or a plain retry-after number."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    parts = _DURATION.findall(str(value))
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+def _header_int(headers: Mapping[str, Any], name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    # ~4 characters per token; Groq counts the completion budget against the TPM limit up front.
+    return len(prompt) // 4 + max_tokens
+
+
+def is_rate_limited_error(exc: Exception) -> bool:
+    status_code = getattr(exc, "status_code", None)
+    if status_code == 429:
+        return True
+
+    msg = str(exc).lower()
+    return "rate" in msg and "limit" in msg or "too many requests" in msg or "rpm" in msg
+
+
+def _error_headers(exc: Exception) -> Mapping[str, Any]:
+    response = getattr(exc, "response", None)
+    return getattr(response, "headers", None) or {}
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket.
+
+    Starts from a configured per-minute limit; `sync` then replaces level,
+    capacity and refill rate with what the provider reports in its
+    rate-limit headers (remaining now, full again after the reset delay).
+    """
+
+    def __init__(self, capacity: float, per_seconds: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.level
+
+    def wait_for(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.level
+        if deficit <= 0:
+            return 0.0
+        return deficit / self.rate if self.rate > 0 else math.inf
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def sync(self, limit: Optional[int], remaining: Optional[float], reset_s: Optional[float], now: float) -> None:
+        if limit:
+            self.capacity = float(limit)
+        if remaining is None:
+            return
+        self.level = min(float(remaining), self.capacity)
+        self.updated = now
+        if reset_s and self.capacity > remaining:
+            self.rate = (self.capacity - remaining) / reset_s
+
+
+class KeySlot:
+    """Scheduling state of one API key: request and token buckets plus load counters."""
+
+    def __init__(self, index: int, api_key: str):
+        self.index = index
+        self.api_key = api_key
+        self.requests = TokenBucket(GROQ_DEFAULT_RPM)
+        self.tokens = TokenBucket(GROQ_DEFAULT_TPM)
+        self.in_flight = 0
+        self.reserved_tokens = 0
+        self.blocked_until = 0.0
+        self.calls = 0
+        self.rate_limited = 0
+
+    def wait_for(self, cost: int, now: float) -> float:
+        return max(
+            self.blocked_until - now,
+            self.requests.wait_for(1, now),
+            self.tokens.wait_for(cost, now),
+            0.0,
+        )
+
+
+def _groq_client(api_key: str):
+    from groq import Groq
+
+    # Retries are the pool's job: the SDK's own backoff would hide 429s from the buckets.
+    return Groq(api_key=api_key, max_retries=0, timeout=GROQ_TIMEOUT_S)
+
+
+def _async_groq_client(api_key: str):
+    from groq import AsyncGroq
+
+    return AsyncGroq(api_key=api_key, max_retries=0, timeout=GROQ_TIMEOUT_S)
+
+
+class GroqPool:
+    """
+    Shared, rate-limit-aware scheduler over all configured Groq keys.
+
+    Every call reserves one request and its estimated tokens on the
+    least-loaded key that has capacity; when none has, it waits (up to
+    `queue_timeout_s`) for the earliest key to refill instead of failing
+    over blindly. Response headers resync the key's buckets and a 429
+    cools the key down for its retry-after delay.
+
+    Bucket state sits behind one `threading.Lock` that is never held across
+    I/O, so the pool is safe to share between threads and event loops.
+    """
+
+    def __init__(
+        self,
+        api_keys: List[str],
+        client_factory: Callable[[str], Any] = _groq_client,
+        async_client_factory: Callable[[str], Any] = _async_groq_client,
+        queue_timeout_s: float = GROQ_QUEUE_TIMEOUT_S,
+        max_attempts: int = GROQ_MAX_ATTEMPTS,
+    ):
+        self.slots = [KeySlot(i, key) for i, key in enumerate(api_keys)]
+        self.client_factory = client_factory
+        self.async_client_factory = async_client_factory
+        self.queue_timeout_s = queue_timeout_s
+        self.max_attempts = max(max_attempts, 1)
+
+        self._lock = threading.Lock()
+        self._clients: Dict[int, Any] = {}
+        # Async clients per event loop: their connection pools are bound to it.
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self.queued = 0
+        self.queue_wait_s = 0.0
+        self.rejected = 0
+
+    # ---------------- Clients ----------------
+
+    def _client(self, slot: KeySlot):
+        with self._lock:
+            if slot.index not in self._clients:
+                self._clients[slot.index] = self.client_factory(slot.api_key)
+            return self._clients[slot.index]
+
+    def _async_client(self, slot: KeySlot):
+        with self._lock:
+            clients = self._async_clients.setdefault(asyncio.get_running_loop(), {})
+            if slot.index not in clients:
+                clients[slot.index] = self.async_client_factory(slot.api_key)
+            return clients[slot.index]
+
+    # ---------------- Scheduling ----------------
+
+    def _try_reserve(self, cost: int) -> tuple[Optional[KeySlot], float]:
+        """Reserves capacity on the least-loaded ready key, or returns how long until one is ready."""
+        with self._lock:
+            now = time.monotonic()
+            best = None
+            best_load = None
+            wait = math.inf
+            for slot in self.slots:
+                slot_wait = slot.wait_for(cost, now)
+                if slot_wait > 0:
+                    wait = min(wait, slot_wait)
+                    continue
+                load = (slot.in_flight, -slot.tokens.available(now))
+                if best is None or load < best_load:
+                    best, best_load = slot, load
+
+            if best is not None:
+                best.requests.take(1, now)
+                best.tokens.take(cost, now)
+                best.in_flight += 1
+                best.reserved_tokens += cost
+            return best, wait
+
+    def _queue_wait(self, queued_since: float, wait: float) -> float:
+        left = queued_since + self.queue_timeout_s - time.monotonic()
+        if left <= 0 or wait > left:
+            with self._lock:
+                self.rejected += 1
+            raise GroqPoolExhausted(
+                f"No Groq key has capacity within {self.queue_timeout_s:.1f}s (next in {wait:.1f}s)"
+            )
+        return wait
+
+    def _note_queued(self, queued_since: float) -> None:
+        with self._lock:
+            self.queued += 1
+            self.queue_wait_s += time.monotonic() - queued_since
+
+    def acquire(self, cost: int) -> KeySlot:
+        queued_since = time.monotonic()
+        while True:
+            slot, wait = self._try_reserve(cost)
+            if slot is not None:
+                if time.monotonic() > queued_since + 0.001:
+                    self._note_queued(queued_since)
+                return slot
+            time.sleep(self._queue_wait(queued_since, wait))
+
+    async def aacquire(self, cost: int) -> KeySlot:
+        queued_since = time.monotonic()
+        while True:
+            slot, wait = self._try_reserve(cost)
+            if slot is not None:
+                if time.monotonic() > queued_since + 0.001:
+                    self._note_queued(queued_since)
+                return slot
+            await asyncio.sleep(self._queue_wait(queued_since, wait))
+
+    def observe(self, slot: KeySlot, headers: Mapping[str, Any], rate_limited: bool = False) -> None:
+        """Resyncs a key's buckets from response headers; a 429 also cools the key down."""
+        with self._lock:
+            now = time.monotonic()
+            # Calls still in flight on this key are not in the server's counts yet.
+            remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+            slot.requests.sync(
+                _header_int(headers, "x-ratelimit-limit-requests"),
+                None if remaining_requests is None else remaining_requests - slot.in_flight,
+                parse_duration(headers.get("x-ratelimit-reset-requests")),
+                now,
+            )
+            remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+            slot.tokens.sync(
+                _header_int(headers, "x-ratelimit-limit-tokens"),
+                None if remaining_tokens is None else remaining_tokens - slot.reserved_tokens,
+                parse_duration(headers.get("x-ratelimit-reset-tokens")),
+                now,
+            )
+            if rate_limited:
+                slot.rate_limited += 1
+                retry_after = parse_duration(headers.get("retry-after")) or DEFAULT_RETRY_AFTER_S
+                slot.blocked_until = max(slot.blocked_until, now + retry_after)
+            else:
+                slot.calls += 1
+
+    def release(self, slot: KeySlot, cost: int) -> None:
+        with self._lock:
+            slot.in_flight -= 1
+            slot.reserved_tokens -= cost
+
+    def _settle(self, slot: KeySlot, cost: int, headers: Mapping[str, Any], rate_limited: bool = False) -> None:
+        self.release(slot, cost)
+        self.observe(slot, headers, rate_limited)
+
+    def _handle_error(self, slot: KeySlot, cost: int, exc: Exception, errors: list) -> None:
+        """Settles a failed call; re-raises unless it was a 429 worth retrying on another key."""
+        limited = is_rate_limited_error(exc)
+        self._settle(slot, cost, _error_headers(exc), rate_limited=limited)
+        if not limited:
+            raise exc
+        errors.append(exc)
+        logger.info("groq key=%d rate_limited retry_after=%s", slot.index, _error_headers(exc).get("retry-after"))
+
+    # ---------------- Calls ----------------
+
+    @staticmethod
+    def _request(model: str, prompt: str, max_tokens: int, **extra) -> dict:
+        return {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            **extra,
+        }
+
+    def complete(self, model: str, prompt: str, max_tokens: int) -> str:
+        cost = estimate_tokens(prompt, max_tokens)
+        errors: list = []
+        for _ in range(self.max_attempts):
+            slot = self.acquire(cost)
+            try:
+                raw = self._client(slot).chat.completions.with_raw_response.create(
+                    **self._request(model, prompt, max_tokens)
+                )
+            except Exception as exc:
+                self._handle_error(slot, cost, exc, errors)
+                continue
+            self._settle(slot, cost, raw.headers)
+            return raw.parse().choices[0].message.content
+
+        raise GroqPoolExhausted(f"All Groq keys exhausted/failed: {[str(e) for e in errors]}")
+
+    async def acomplete(self, model: str, prompt: str, max_tokens: int) -> str:
+        cost = estimate_tokens(prompt, max_tokens)
+        errors: list = []
+        for _ in range(self.max_attempts):
+            slot = await self.aacquire(cost)
+            try:
+                raw = await self._async_client(slot).chat.completions.with_raw_response.create(
+                    **self._request(model, prompt, max_tokens)
+                )
+            except asyncio.CancelledError:
+                # e.g. the losing side of a hedged request.
+                self.release(slot, cost)
+                raise
+            except Exception as exc:
+                self._handle_error(slot, cost, exc, errors)
+                continue
+            self._settle(slot, cost, raw.headers)
+            response = await raw.parse()
+            return response.choices[0].message.content
+
+        raise GroqPoolExhausted(f"All Groq keys exhausted/failed: {[str(e) for e in errors]}")
+
+    async def astream(self, model: str, prompt: str, max_tokens: int):
+        """Yields text deltas. Retries on another key only happen before the first token."""
+        cost = estimate_tokens(prompt, max_tokens)
+        errors: list = []
+        for _ in range(self.max_attempts):
+            slot = await self.aacquire(cost)
+            try:
+                raw = await self._async_client(slot).chat.completions.with_raw_response.create(
+                    **self._request(model, prompt, max_tokens, stream=True)
+                )
+            except asyncio.CancelledError:
+                # e.g. the losing side of a hedged request.
+                self.release(slot, cost)
+                raise
+            except Exception as exc:
+                self._handle_error(slot, cost, exc, errors)
+                continue
+
+            self.observe(slot, raw.headers)
+            try:
+                async for chunk in await raw.parse():
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            finally:
+                # The key stays loaded until the stream is drained.
+                self.release(slot, cost)
+            return
+
+        raise GroqPoolExhausted(f"All Groq keys exhausted/failed: {[str(e) for e in errors]}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "keys": [
+                    {
+                        "key": slot.index,
+                        "calls": slot.calls,
+                        "rate_limited": slot.rate_limited,
+                        "in_flight": slot.in_flight,
+                        "requests_available": round(slot.requests.available(now), 1),
+                        "tokens_available": round(slot.tokens.available(now), 1),
+                        "blocked_for_s": round(max(slot.blocked_until - now, 0.0), 2),
+                    }
+                    for slot in self.slots
+                ],
+                "queued": self.queued,
+                "queue_wait_s": round(self.queue_wait_s, 3),
+                "rejected": self.rejected,
+            }
+
+
+_POOL: Optional[GroqPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_groq_pool() -> GroqPool:
+    """The process-wide pool; the backend and the agent share its keys, so they share its limits."""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = GroqPool(groq_keys())
+    return _POOL
+
+
+def groq_pool_stats() -> Optional[Dict[str, Any]]:
+    return _POOL.stats() if _POOL is not None else None
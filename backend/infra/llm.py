@@ -1,14 +1,42 @@
+import asyncio
+import math
 import os
+import weakref
 
 import ollama
 from dotenv import load_dotenv
 
-from backend.config import EMBEDDING_MODEL, GROQ_MODEL, LLM_MODEL, USE_GROQ
+from backend.config import EMBEDDING_DIM, EMBEDDING_MODEL, GROQ_MODEL, LLM_MODEL, OLLAMA_TIMEOUT_S, USE_GROQ
+from backend.infra import llm_router
+from backend.infra.groq_pool import get_groq_pool
+from backend.infra.llm_router import Provider
 
 load_dotenv()
 
-_GROQ_CLIENTS = None
-_GROQ_START_INDEX = 0
+_OLLAMA_CLIENT = None
+# Async clients (per event loop: their connection pools are bound to it).
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _loop_clients() -> dict:
+    return _ASYNC_CLIENTS.setdefault(asyncio.get_running_loop(), {})
+
+
+def _async_ollama():
+    clients = _loop_clients()
+    if "ollama" not in clients:
+        clients["ollama"] = ollama.AsyncClient(timeout=OLLAMA_TIMEOUT_S)
+    return clients["ollama"]
+
+
+def truncate_embedding(embedding: list, dim: int | None) -> list:
+    """Matryoshka reduction: keeps the leading `dim` components, rescaled to unit length."""
+    if not dim or not embedding or len(embedding) <= dim:
+        return embedding
+
+    head = embedding[:dim]
+    norm = math.sqrt(sum(x * x for x in head))
+    return [x / norm for x in head] if norm else head
 
 
 def embed_text(text: str) -> list:
@@ -16,80 +44,84 @@ def embed_text(text: str) -> list:
         model=EMBEDDING_MODEL,
         prompt=text,
     )
-    return response["embedding"]
+    # Ingest and query both come through here, so stored and query vectors always agree.
+    return truncate_embedding(response["embedding"], EMBEDDING_DIM)
 
 
-def _load_groq_clients():
-    global _GROQ_CLIENTS
-
-    if _GROQ_CLIENTS is not None:
-        return _GROQ_CLIENTS
+async def aembed_text(text: str) -> list:
+    response = await _async_ollama().embeddings(
+        model=EMBEDDING_MODEL,
+        prompt=text,
+    )
+    return truncate_embedding(response["embedding"], EMBEDDING_DIM)
 
-    keys = [
-        os.getenv("GROQ_API_KEY"),
-        os.getenv("GROQ_API_KEY_1"),
-        os.getenv("GROQ_API_KEY_2"),
-        os.getenv("GROQ_API_KEY_PRIMARY"),
-        os.getenv("GROQ_API_KEY_SECONDARY"),
-    ]
-    seen = set()
-    deduped = []
-    for key in keys:
-        if key and key not in seen:
-            deduped.append(key)
-            seen.add(key)
 
-    if not deduped:
-        raise RuntimeError("No Groq API key configured. Set GROQ_API_KEY (or _1/_2).")
+def _ollama_client():
+    global _OLLAMA_CLIENT
+    if _OLLAMA_CLIENT is None:
+        _OLLAMA_CLIENT = ollama.Client(timeout=OLLAMA_TIMEOUT_S)
+    return _OLLAMA_CLIENT
 
-    from groq import Groq
 
-    _GROQ_CLIENTS = [Groq(api_key=key) for key in deduped]
-    return _GROQ_CLIENTS
+def _ollama_chat(prompt: str, max_tokens: int) -> str:
+    response = _ollama_client().chat(
+        model=LLM_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        options={"num_predict": max_tokens},
+    )
+    return response["message"]["content"]
 
 
-def _is_rate_limited_error(exc: Exception) -> bool:
-    status_code = getattr(exc, "status_code", None)
-    if status_code == 429:
-        return True
+async def _aollama_chat(prompt: str, max_tokens: int) -> str:
+    response = await _async_ollama().chat(
+        model=LLM_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        options={"num_predict": max_tokens},
+    )
+    return response["message"]["content"]
 
-    msg = str(exc).lower()
-    return "rate" in msg and "limit" in msg or "too many requests" in msg or "rpm" in msg
 
+async def _ollama_stream(prompt: str, max_tokens: int):
+    stream = await _async_ollama().chat(
+        model=LLM_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        options={"num_predict": max_tokens},
+        stream=True,
+    )
+    async for chunk in stream:
+        delta = chunk["message"]["content"]
+        if delta:
+            yield delta
 
-def _chat_with_groq_failover(prompt: str, max_tokens: int) -> str:
-    global _GROQ_START_INDEX
 
-    clients = _load_groq_clients()
-    errors = []
+# The one Groq provider: the agent imports it too, so both share its pool and hedging rules.
+GROQ = Provider(
+    "groq",
+    lambda prompt, max_tokens: get_groq_pool().complete(GROQ_MODEL, prompt, max_tokens),
+    lambda prompt, max_tokens: get_groq_pool().acomplete(GROQ_MODEL, prompt, max_tokens),
+    lambda prompt, max_tokens: get_groq_pool().astream(GROQ_MODEL, prompt, max_tokens),
+    # A hedged copy goes to the pool's least-loaded key, i.e. not the one still working;
+    # with a single key it would just queue behind itself, so it goes to Ollama instead.
+    hedge_self=lambda: len(get_groq_pool().slots) > 1,
+    model=GROQ_MODEL,
+)
+OLLAMA = Provider("ollama", _ollama_chat, _aollama_chat, _ollama_stream, model=LLM_MODEL)
 
-    for attempt in range(len(clients)):
-        idx = (_GROQ_START_INDEX + attempt) % len(clients)
-        client = clients[idx]
-        try:
-            response = client.chat.completions.create(
-                model=GROQ_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-            )
-            _GROQ_START_INDEX = (idx + 1) % len(clients)
-            return response.choices[0].message.content
-        except Exception as exc:
-            errors.append(exc)
-            if _is_rate_limited_error(exc):
-                continue
-            raise
 
-    raise RuntimeError(f"All Groq keys exhausted/failed: {[str(e) for e in errors]}")
+def _providers() -> list:
+    # Groq first when enabled; the local model takes over while Groq's breaker is open.
+    return [GROQ, OLLAMA] if USE_GROQ else [OLLAMA]
 
 
 def chat(prompt: str, max_tokens: int = 200) -> str:
-    if USE_GROQ:
-        return _chat_with_groq_failover(prompt=prompt, max_tokens=max_tokens)
+    return llm_router.complete(_providers(), prompt, max_tokens)
 
-    response = ollama.chat(
-        model=LLM_MODEL,
-        messages=[{"role": "user", "content": prompt}],
-        options={"num_predict": max_tokens},
-    )
-    return response["message"]["content"]
+
+async def achat(prompt: str, max_tokens: int = 200) -> str:
+    return await llm_router.acomplete(_providers(), prompt, max_tokens)
+
+
+async def astream_chat(prompt: str, max_tokens: int = 200):
+    """Yields the completion as text deltas. Key and provider fallback only happen before the first token."""
+    async for delta in llm_router.astream(_providers(), prompt, max_tokens):
+        yield delta
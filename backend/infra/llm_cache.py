@@ -0,0 +1,55 @@
+import hashlib
+import os
+from typing import Optional
+
+from backend.infra.cache import LRUCache, SQLiteCache, TieredCache, register_cache
+
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+# Optional SQLite file shared by all workers; unset keeps the cache in-process only.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+
+
+_response_cache = register_cache(
+    "llm_responses",
+    TieredCache(
+        memory=LRUCache(
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            ttl_seconds=LLM_CACHE_TTL_S,
+            max_bytes=LLM_CACHE_MAX_BYTES,
+            sizeof=len,
+        ),
+        disk=(
+            SQLiteCache(LLM_CACHE_PATH, table="llm_responses", ttl_seconds=LLM_CACHE_TTL_S)
+            if LLM_CACHE_PATH
+            else None
+        ),
+    ),
+)
+
+
+def response_key(provider: str, model: str, max_tokens: int, temperature: Optional[float], prompt: str) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    # None means the provider's own default temperature, which is part of the identity too.
+    temp = "default" if temperature is None else f"{temperature:g}"
+    return f"{provider}:{model}:{max_tokens}:{temp}:{digest}"
+
+
+def get_response(provider, prompt: str, max_tokens: int) -> Optional[str]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    return _response_cache.get(
+        response_key(provider.name, provider.model, max_tokens, provider.temperature, prompt)
+    )
+
+
+def set_response(provider, prompt: str, max_tokens: int, response: str) -> None:
+    if not LLM_CACHE_ENABLED or not response:
+        return
+    _response_cache.set(
+        response_key(provider.name, provider.model, max_tokens, provider.temperature, prompt),
+        response,
+    )
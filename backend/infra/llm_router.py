@@ -0,0 +1,525 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+from backend.infra import llm_cache
+
+
+# A provider is taken out of rotation after this many failures in a row...
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+# ...or when at least this share of its recent calls failed.
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "50"))
+# How long an open breaker rejects calls before letting a single probe through.
+BREAKER_OPEN_S = float(os.getenv("BREAKER_OPEN_S", "30"))
+
+# Opt-in hedging (async paths): when the primary has not answered (or sent
+# its first token) within its LLM_HEDGE_PERCENTILE latency, the same prompt
+# goes to a backup and the first to finish wins.
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Delay used until the primary has enough latency samples, and the floor after that.
+LLM_HEDGE_DEFAULT_DELAY_MS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "2000"))
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "250"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+logger = logging.getLogger("backend.llm_router")
+
+
+class LLMUnavailable(RuntimeError):
+    """Every provider failed or is behind an open circuit breaker."""
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker over a rolling window of call outcomes.
+
+    Closed: calls pass, outcomes and latencies are recorded. Trips open on
+    `failure_threshold` consecutive failures or when the window's error
+    rate reaches `error_rate`. Open: calls are rejected without touching
+    the provider. After `open_s` one probe call is let through (half-open);
+    its outcome closes the breaker or re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        error_rate: float = BREAKER_ERROR_RATE,
+        min_calls: int = BREAKER_MIN_CALLS,
+        window: int = BREAKER_WINDOW,
+        open_s: float = BREAKER_OPEN_S,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.open_s = open_s
+
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque(maxlen=window)
+        self._latencies: deque = deque(maxlen=window)
+        self._first_token: deque = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self._probing = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_s:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency_s: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self._outcomes.append(True)
+            self._latencies.append(latency_s)
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                logger.info("provider=%s breaker=closed after probe", self.name)
+                self.state = CLOSED
+                self._probing = False
+                self._outcomes.clear()
+
+    def record_failure(self, latency_s: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self._outcomes.append(False)
+            self._latencies.append(latency_s)
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self._should_trip():
+                self._trip()
+
+    def record_first_token(self, latency_s: float) -> None:
+        with self._lock:
+            self._first_token.append(latency_s)
+
+    def latency_samples(self, kind: str = "complete") -> List[float]:
+        with self._lock:
+            return list(self._first_token if kind == "first_token" else self._latencies)
+
+    def record_abandoned(self) -> None:
+        """The caller gave up (cancelled, closed the stream): no verdict, but free the probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def _should_trip(self) -> bool:
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        if len(self._outcomes) < self.min_calls:
+            return False
+        return self._outcomes.count(False) / len(self._outcomes) >= self.error_rate
+
+    def _trip(self) -> None:
+        # A failed half-open probe re-opens the breaker; only closed -> open counts as a trip.
+        if self.state == CLOSED:
+            self.trips += 1
+            logger.warning(
+                "provider=%s breaker=open consecutive_failures=%d", self.name, self.consecutive_failures
+            )
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            recent = len(self._outcomes)
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "trips": self.trips,
+                "error_rate": round(self._outcomes.count(False) / recent, 3) if recent else 0.0,
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+            }
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """One breaker per provider, shared by every module that calls it."""
+    with _BREAKERS_LOCK:
+        if name not in _BREAKERS:
+            _BREAKERS[name] = CircuitBreaker(name)
+        return _BREAKERS[name]
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    with _BREAKERS_LOCK:
+        breakers = dict(_BREAKERS)
+    return {name: breaker.stats() for name, breaker in breakers.items()}
+
+
+@dataclass
+class Provider:
+    """A chat backend: blocking, async and streaming completions of (prompt, max_tokens)."""
+
+    name: str
+    complete: Callable[[str, int], str]
+    acomplete: Callable[[str, int], Any]
+    astream: Callable[[str, int], AsyncIterator[str]]
+    # Whether a hedged copy may go to this same provider (e.g. another key of a pool);
+    # a callable is asked per request, since a pool may only have one key.
+    hedge_self: Union[bool, Callable[[], bool]] = False
+    # Identify cached responses; None temperature means the provider default.
+    model: str = ""
+    temperature: Optional[float] = None
+
+
+def _unavailable(errors: List[str]) -> LLMUnavailable:
+    return LLMUnavailable(f"No LLM provider available: {errors}")
+
+
+def _cached(providers: List[Provider], prompt: str, max_tokens: int) -> Optional[str]:
+    """An earlier answer to this exact prompt from any of the providers, preferring the primary."""
+    for provider in providers:
+        response = llm_cache.get_response(provider, prompt, max_tokens)
+        if response is not None:
+            return response
+    return None
+
+
+def complete(providers: List[Provider], prompt: str, max_tokens: int) -> str:
+    """Calls the first provider whose breaker allows it, falling back down the list on failure."""
+    cached = _cached(providers, prompt, max_tokens)
+    if cached is not None:
+        return cached
+
+    errors = []
+    for provider in providers:
+        breaker = get_breaker(provider.name)
+        if not breaker.allow():
+            errors.append(f"{provider.name}: circuit open")
+            continue
+        started = time.monotonic()
+        try:
+            result = provider.complete(prompt, max_tokens)
+        except Exception as exc:
+            breaker.record_failure(time.monotonic() - started)
+            logger.warning("provider=%s chat failed, falling back: %s", provider.name, exc)
+            errors.append(f"{provider.name}: {exc}")
+            continue
+        breaker.record_success(time.monotonic() - started)
+        llm_cache.set_response(provider, prompt, max_tokens, result)
+        return result
+    raise _unavailable(errors)
+
+
+class _CircuitOpen(Exception):
+    pass
+
+
+async def _acall(provider: Provider, prompt: str, max_tokens: int) -> str:
+    breaker = get_breaker(provider.name)
+    if not breaker.allow():
+        raise _CircuitOpen("circuit open")
+    started = time.monotonic()
+    try:
+        result = await provider.acomplete(prompt, max_tokens)
+    except asyncio.CancelledError:
+        breaker.record_abandoned()
+        raise
+    except Exception as exc:
+        breaker.record_failure(time.monotonic() - started)
+        logger.warning("provider=%s chat failed, falling back: %s", provider.name, exc)
+        raise
+    breaker.record_success(time.monotonic() - started)
+    llm_cache.set_response(provider, prompt, max_tokens, result)
+    return result
+
+
+async def _astream_call(provider: Provider, prompt: str, max_tokens: int):
+    breaker = get_breaker(provider.name)
+    if not breaker.allow():
+        raise _CircuitOpen("circuit open")
+    started = time.monotonic()
+    streamed = False
+    parts = []
+    try:
+        async for delta in provider.astream(prompt, max_tokens):
+            if not streamed:
+                streamed = True
+                breaker.record_first_token(time.monotonic() - started)
+            parts.append(delta)
+            yield delta
+    except (asyncio.CancelledError, GeneratorExit):
+        breaker.record_abandoned()
+        raise
+    except Exception as exc:
+        breaker.record_failure(time.monotonic() - started)
+        if not streamed:
+            logger.warning("provider=%s stream failed, falling back: %s", provider.name, exc)
+        raise
+    breaker.record_success(time.monotonic() - started)
+    # Only complete streams are cached.
+    llm_cache.set_response(provider, prompt, max_tokens, "".join(parts))
+
+
+async def acomplete(providers: List[Provider], prompt: str, max_tokens: int) -> str:
+    cached = _cached(providers, prompt, max_tokens)
+    if cached is not None:
+        return cached
+
+    errors = []
+    remaining = list(providers)
+
+    pair = _hedge_pair(remaining) if LLM_HEDGE else None
+    if pair is not None:
+        try:
+            return await _hedged_complete(*pair, prompt, max_tokens)
+        except _HedgeFailed as exc:
+            errors.append(f"hedged {pair[0].name}/{pair[1].name}: {exc}")
+            # A primary that failed before the hedge delay never reached the backup; try it next.
+            remaining = [p for p in remaining if p not in exc.called]
+
+    for provider in remaining:
+        try:
+            return await _acall(provider, prompt, max_tokens)
+        except Exception as exc:
+            errors.append(f"{provider.name}: {exc}")
+    raise _unavailable(errors)
+
+
+async def astream(providers: List[Provider], prompt: str, max_tokens: int):
+    """Yields text deltas. Falls back only before the first token; later errors propagate."""
+    cached = _cached(providers, prompt, max_tokens)
+    if cached is not None:
+        yield cached
+        return
+
+    errors = []
+    remaining = list(providers)
+
+    pair = _hedge_pair(remaining) if LLM_HEDGE else None
+    if pair is not None:
+        try:
+            stream = await _hedged_stream(*pair, prompt, max_tokens)
+        except _HedgeFailed as exc:
+            errors.append(f"hedged {pair[0].name}/{pair[1].name}: {exc}")
+            # A primary that failed before the hedge delay never reached the backup; try it next.
+            remaining = [p for p in remaining if p not in exc.called]
+        else:
+            async for delta in stream:
+                yield delta
+            return
+
+    for provider in remaining:
+        streamed = False
+        try:
+            async for delta in _astream_call(provider, prompt, max_tokens):
+                streamed = True
+                yield delta
+        except Exception as exc:
+            if streamed:
+                raise
+            errors.append(f"{provider.name}: {exc}")
+            continue
+        return
+    raise _unavailable(errors)
+
+
+# -------------------------
+# Hedged requests
+# -------------------------
+
+class _HedgeFailed(Exception):
+    """A hedged call failed; `called` holds the providers that were actually sent the request."""
+
+    def __init__(self, error: Exception, called: Tuple[Provider, ...]):
+        super().__init__(str(error))
+        self.called = called
+
+
+_hedge_lock = threading.Lock()
+_hedge_counters: Dict[str, float] = {"requests": 0, "fired": 0, "backup_wins": 0, "saved_ms": 0.0}
+
+
+def _hedge_pair(providers: List[Provider]) -> Optional[Tuple[Provider, Provider]]:
+    """(primary, backup) when hedging applies: a healthy primary and somewhere else to send the copy."""
+    if not providers or get_breaker(providers[0].name).state != CLOSED:
+        return None
+    primary = providers[0]
+    # A key pool hedges onto another of its own keys; other providers onto the next one in line.
+    hedge_self = primary.hedge_self() if callable(primary.hedge_self) else primary.hedge_self
+    if hedge_self:
+        return primary, primary
+    if len(providers) > 1:
+        return primary, providers[1]
+    return None
+
+
+def hedge_delay_s(provider: Provider, kind: str = "complete") -> float:
+    """Hedge after the primary's `LLM_HEDGE_PERCENTILE` latency (first-token latency for streams)."""
+    samples = get_breaker(provider.name).latency_samples(kind)
+    if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+        delay_ms = LLM_HEDGE_DEFAULT_DELAY_MS
+    else:
+        samples.sort()
+        delay_ms = samples[min(int(len(samples) * LLM_HEDGE_PERCENTILE), len(samples) - 1)] * 1000
+    return max(delay_ms, LLM_HEDGE_MIN_DELAY_MS) / 1000
+
+
+def _expected_tail_s(provider: Provider, kind: str, delay_s: float) -> float:
+    """Mean latency of the primary's past calls that ran past the hedge delay."""
+    slow = [s for s in get_breaker(provider.name).latency_samples(kind) if s > delay_s]
+    return sum(slow) / len(slow) if slow else delay_s
+
+
+def _record_hedge(fired: bool, backup_won: bool = False, saved_s: float = 0.0) -> None:
+    with _hedge_lock:
+        _hedge_counters["requests"] += 1
+        if fired:
+            _hedge_counters["fired"] += 1
+        if backup_won:
+            _hedge_counters["backup_wins"] += 1
+            _hedge_counters["saved_ms"] += saved_s * 1000
+
+
+def hedge_stats() -> Dict[str, Any]:
+    with _hedge_lock:
+        counters = dict(_hedge_counters)
+    fired = counters["fired"]
+    return {
+        "enabled": LLM_HEDGE,
+        "requests": int(counters["requests"]),
+        "fired": int(fired),
+        "fire_rate": round(fired / counters["requests"], 3) if counters["requests"] else 0.0,
+        "backup_wins": int(counters["backup_wins"]),
+        # Estimated from the primary's past latency beyond the hedge delay.
+        "saved_ms_total": round(counters["saved_ms"], 1),
+        "saved_ms_avg": round(counters["saved_ms"] / counters["backup_wins"], 1) if counters["backup_wins"] else 0.0,
+    }
+
+
+async def _cancel(*tasks: asyncio.Future) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _race(primary_task: asyncio.Future, start_backup: Callable[[], asyncio.Future], delay_s: float):
+    """
+    Waits `delay_s` for the primary, then starts the backup. Returns
+    `(winner, backup_won, fired)`: the first task to succeed (the other is
+    cancelled), whether that was the backup, and whether the backup was
+    started at all. If nothing succeeded the winner is the failed primary.
+    """
+    backup_task = None
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=delay_s)
+        if done:
+            return primary_task, False, False
+
+        backup_task = start_backup()
+        pending = {primary_task, backup_task}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((t for t in done if not t.cancelled() and t.exception() is None), None)
+            if winner is not None:
+                await _cancel(*pending)
+                return winner, winner is backup_task, True
+    except asyncio.CancelledError:
+        await _cancel(*(t for t in (primary_task, backup_task) if t is not None))
+        raise
+
+    return primary_task, False, True
+
+
+async def _hedged_complete(primary: Provider, backup: Provider, prompt: str, max_tokens: int) -> str:
+    delay_s = hedge_delay_s(primary)
+    started = time.monotonic()
+    primary_task = asyncio.ensure_future(_acall(primary, prompt, max_tokens))
+    winner, backup_won, fired = await _race(
+        primary_task, lambda: asyncio.ensure_future(_acall(backup, prompt, max_tokens)), delay_s
+    )
+
+    saved_s = max(_expected_tail_s(primary, "complete", delay_s) - (time.monotonic() - started), 0.0)
+    _record_hedge(fired, backup_won, saved_s if backup_won else 0.0)
+    if fired:
+        logger.info("hedge fired primary=%s backup=%s backup_won=%s", primary.name, backup.name, backup_won)
+    try:
+        return winner.result()
+    except Exception as exc:
+        raise _HedgeFailed(exc, (primary, backup) if fired else (primary,)) from exc
+
+
+async def _hedged_stream(primary: Provider, backup: Provider, prompt: str, max_tokens: int):
+    """Races the two streams to their first token and returns the winner's stream (first token included)."""
+    delay_s = hedge_delay_s(primary, "first_token")
+    started = time.monotonic()
+    streams = {"primary": _astream_call(primary, prompt, max_tokens)}
+
+    def start_backup():
+        streams["backup"] = _astream_call(backup, prompt, max_tokens)
+        return asyncio.ensure_future(_first_delta(streams["backup"]))
+
+    primary_task = asyncio.ensure_future(_first_delta(streams["primary"]))
+    try:
+        winner, backup_won, fired = await _race(primary_task, start_backup, delay_s)
+    except BaseException:
+        for stream in streams.values():
+            await stream.aclose()
+        raise
+
+    loser = "primary" if backup_won else "backup"
+    if loser in streams:
+        await streams[loser].aclose()
+
+    saved_s = max(_expected_tail_s(primary, "first_token", delay_s) - (time.monotonic() - started), 0.0)
+    _record_hedge(fired, backup_won, saved_s if backup_won else 0.0)
+    if fired:
+        logger.info("hedge fired primary=%s backup=%s backup_won=%s stream=true", primary.name, backup.name, backup_won)
+    try:
+        first = winner.result()
+    except Exception as exc:
+        raise _HedgeFailed(exc, (primary, backup) if fired else (primary,)) from exc
+    return _prepend(first, streams["backup" if backup_won else "primary"])
+
+
+_END = object()
+
+
+async def _first_delta(stream):
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return _END
+
+
+async def _prepend(first, stream):
+    if first is _END:
+        return
+    yield first
+    async for delta in stream:
+        yield delta
@@ -0,0 +1,499 @@
+from __future__ import annotations
+
+import json
+import shutil
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from qdrant_client.models import (
+    AliasDescription,
+    CollectionDescription,
+    CollectionsAliasesResponse,
+    CollectionsResponse,
+    CollectionStatus,
+    CountResult,
+    Distance,
+    FieldCondition,
+    Filter,
+    HasIdCondition,
+    MatchAny,
+    MatchExcept,
+    MatchValue,
+    Record,
+    ScoredPoint,
+)
+from qdrant_client.http.models import GroupsResult, PointGroup, QueryResponse
+
+
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f16"
+PAYLOAD_FILE = "payload.jsonl"
+ALIASES_FILE = "aliases.json"
+
+# Cache-sized blocks: the float16 -> float32 upcast dominates scoring time.
+_SCORE_BLOCK_ROWS = 2048
+
+
+# -------------------------
+# Columnar Payload Table
+# -------------------------
+
+class _Column:
+    """
+    One payload field across all rows.
+
+    Scalar values are dictionary-encoded into an int32 code array so keyword
+    matches are a vectorized comparison; numeric values are mirrored into a
+    float array (NaN when missing) for range conditions. List values (e.g.
+    `uses`) match when any element matches, like Qdrant.
+    """
+
+    def __init__(self, values: List[Any]):
+        self.vocab: Dict[Any, int] = {}
+        self.codes = np.full(len(values), -1, dtype=np.int32)
+        self.numbers = np.full(len(values), np.nan, dtype=np.float64)
+        self.multi: Dict[int, list] = {}
+
+        for row, value in enumerate(values):
+            if isinstance(value, list):
+                self.multi[row] = value
+                continue
+            if value is None or isinstance(value, dict):
+                continue
+            self.codes[row] = self.vocab.setdefault(value, len(self.vocab))
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.numbers[row] = value
+
+    def match(self, targets: Iterable[Any]) -> np.ndarray:
+        targets = list(targets)
+        codes = [self.vocab[t] for t in targets if t in self.vocab]
+        mask = np.isin(self.codes, codes) if codes else np.zeros(len(self.codes), dtype=bool)
+        for row, items in self.multi.items():
+            if any(item in targets for item in items):
+                mask[row] = True
+        return mask
+
+    def present(self) -> np.ndarray:
+        mask = self.codes >= 0
+        for row in self.multi:
+            mask[row] = True
+        return mask
+
+    def range(self, condition) -> np.ndarray:
+        mask = ~np.isnan(self.numbers)
+        with np.errstate(invalid="ignore"):
+            if condition.gt is not None:
+                mask &= self.numbers > condition.gt
+            if condition.gte is not None:
+                mask &= self.numbers >= condition.gte
+            if condition.lt is not None:
+                mask &= self.numbers < condition.lt
+            if condition.lte is not None:
+                mask &= self.numbers <= condition.lte
+        return mask
+
+
+def _as_list(conditions) -> list:
+    if conditions is None:
+        return []
+    return conditions if isinstance(conditions, list) else [conditions]
+
+
+# -------------------------
+# Collection
+# -------------------------
+
+class _Collection:
+    """Vectors in a growable float16 memmap plus an append-only payload log."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        meta = json.loads((directory / META_FILE).read_text(encoding="utf-8"))
+        self.size = meta["size"]
+        self.distance = meta["distance"]
+        self.capacity = meta["capacity"]
+
+        self.ids: List[Any] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.rows: Dict[str, int] = {}
+        payload_path = directory / PAYLOAD_FILE
+        if payload_path.exists():
+            # One json.loads over the whole log is several times faster than per-line parsing.
+            lines = payload_path.read_text(encoding="utf-8").splitlines()
+            for entry in json.loads("[" + ",".join(line for line in lines if line) + "]"):
+                self._set_row(entry["row"], entry["id"], entry["payload"])
+
+        self.vectors = self._open_vectors()
+        self._columns: Dict[str, _Column] = {}
+
+    @classmethod
+    def create(cls, directory: Path, size: int, distance: str) -> "_Collection":
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / META_FILE).write_text(
+            json.dumps({"size": size, "distance": distance, "capacity": 0}), encoding="utf-8"
+        )
+        (directory / VECTORS_FILE).touch()
+        return cls(directory)
+
+    def _open_vectors(self):
+        if self.capacity == 0:
+            return np.zeros((0, self.size), dtype=np.float16)
+        return np.memmap(self.directory / VECTORS_FILE, dtype=np.float16, mode="r+", shape=(self.capacity, self.size))
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self.capacity:
+            return
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+        self.capacity = max(needed, self.capacity * 2, 1024)
+        with open(self.directory / VECTORS_FILE, "r+b") as handle:
+            handle.truncate(self.capacity * self.size * 2)
+        (self.directory / META_FILE).write_text(
+            json.dumps({"size": self.size, "distance": self.distance, "capacity": self.capacity}),
+            encoding="utf-8",
+        )
+        self.vectors = self._open_vectors()
+
+    def _set_row(self, row: int, point_id: Any, payload: Dict[str, Any]) -> None:
+        if row == len(self.ids):
+            self.ids.append(point_id)
+            self.payloads.append(payload)
+        else:
+            self.ids[row] = point_id
+            self.payloads[row] = payload
+        self.rows[str(point_id)] = row
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------------- Writes ----------------
+
+    def upsert(self, points) -> None:
+        if not points:
+            return
+
+        entries = []
+        for point in points:
+            row = self.rows.get(str(point.id), len(self.ids))
+            self._set_row(row, point.id, dict(point.payload or {}))
+            entries.append((row, point))
+
+        self._grow(len(self.ids))
+        for row, point in entries:
+            vector = np.asarray(point.vector, dtype=np.float32)
+            if self.distance == Distance.COSINE.value:
+                norm = np.linalg.norm(vector)
+                vector = vector / norm if norm else vector
+            self.vectors[row] = vector
+        self.vectors.flush()
+
+        with (self.directory / PAYLOAD_FILE).open("a", encoding="utf-8") as handle:
+            for row, point in entries:
+                handle.write(json.dumps({"row": row, "id": point.id, "payload": self.payloads[row]}) + "\n")
+        self._columns = {}
+
+    # ---------------- Filters ----------------
+
+    def _column(self, key: str) -> _Column:
+        column = self._columns.get(key)
+        if column is None:
+            column = _Column([payload.get(key) for payload in self.payloads])
+            self._columns[key] = column
+        return column
+
+    def _condition(self, condition) -> np.ndarray:
+        if isinstance(condition, Filter):
+            return self.mask(condition)
+        if isinstance(condition, HasIdCondition):
+            wanted = {str(pid) for pid in condition.has_id}
+            return np.array([str(pid) in wanted for pid in self.ids], dtype=bool)
+        if isinstance(condition, FieldCondition):
+            column = self._column(condition.key)
+            if isinstance(condition.match, MatchValue):
+                return column.match([condition.match.value])
+            if isinstance(condition.match, MatchAny):
+                return column.match(condition.match.any)
+            if isinstance(condition.match, MatchExcept):
+                return column.present() & ~column.match(condition.match.except_)
+            if condition.range is not None:
+                return column.range(condition.range)
+        raise NotImplementedError(f"Unsupported filter condition for the numpy backend: {condition!r}")
+
+    def mask(self, query_filter: Optional[Filter]) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+        if query_filter is None:
+            return mask
+
+        for condition in _as_list(query_filter.must):
+            mask &= self._condition(condition)
+        should = _as_list(query_filter.should)
+        if should:
+            any_mask = np.zeros(len(self), dtype=bool)
+            for condition in should:
+                any_mask |= self._condition(condition)
+            mask &= any_mask
+        for condition in _as_list(query_filter.must_not):
+            mask &= ~self._condition(condition)
+        return mask
+
+    # ---------------- Reads ----------------
+
+    def scores(self, query: List[float]) -> np.ndarray:
+        q = np.asarray(query, dtype=np.float32)
+        if self.distance == Distance.COSINE.value:
+            norm = np.linalg.norm(q)
+            q = q / norm if norm else q
+
+        out = np.empty(len(self), dtype=np.float32)
+        # Score in blocks so the float32 upcast never materializes the whole matrix.
+        for start in range(0, len(self), _SCORE_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + _SCORE_BLOCK_ROWS][: len(self) - start], dtype=np.float32)
+            out[start:start + len(block)] = block @ q
+        return out
+
+    def record(self, row: int, with_payload: bool = True, with_vectors: bool = False) -> Record:
+        return Record(
+            id=self.ids[row],
+            payload=self.payloads[row] if with_payload else None,
+            vector=np.asarray(self.vectors[row], dtype=np.float32).tolist() if with_vectors else None,
+        )
+
+
+# -------------------------
+# Client
+# -------------------------
+
+class NumpyVectorStore:
+    """
+    In-process exact-search backend implementing the subset of the
+    QdrantClient API this codebase uses, so it can stand in for
+    `get_qdrant_client()` (VECTOR_BACKEND=numpy).
+
+    Each collection lives in its own directory under `path`; vectors are
+    memory-mapped, so opening a store only reads the payload log.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._collections: Dict[str, _Collection] = {}
+        self._lock = threading.RLock()
+
+        aliases_path = self.path / ALIASES_FILE
+        self._aliases: Dict[str, str] = (
+            json.loads(aliases_path.read_text(encoding="utf-8")) if aliases_path.exists() else {}
+        )
+
+    # ---------------- Collections ----------------
+
+    def _resolve(self, collection_name: str) -> str:
+        return self._aliases.get(collection_name, collection_name)
+
+    def _get(self, collection_name: str) -> _Collection:
+        name = self._resolve(collection_name)
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                directory = self.path / name
+                if not (directory / META_FILE).exists():
+                    raise ValueError(f"Collection {collection_name} not found")
+                collection = _Collection(directory)
+                self._collections[name] = collection
+            return collection
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return (self.path / self._resolve(collection_name) / META_FILE).exists()
+
+    def get_collections(self) -> CollectionsResponse:
+        names = sorted(p.name for p in self.path.iterdir() if (p / META_FILE).exists())
+        return CollectionsResponse(collections=[CollectionDescription(name=n) for n in names])
+
+    def create_collection(self, collection_name: str, vectors_config, **_kwargs) -> bool:
+        distance = getattr(vectors_config.distance, "value", vectors_config.distance)
+        if distance not in (Distance.COSINE.value, Distance.DOT.value):
+            raise NotImplementedError(f"numpy backend supports Cosine and Dot distance, not {distance}")
+        with self._lock:
+            self._collections[collection_name] = _Collection.create(
+                self.path / collection_name, vectors_config.size, distance
+            )
+        return True
+
+    def get_collection(self, collection_name: str):
+        collection = self._get(collection_name)
+        return SimpleNamespace(
+            status=CollectionStatus.GREEN,
+            points_count=len(collection),
+            config=SimpleNamespace(
+                optimizer_config=SimpleNamespace(indexing_threshold=None, max_segment_size=None)
+            ),
+        )
+
+    def delete_collection(self, collection_name: str, **_kwargs) -> bool:
+        name = self._resolve(collection_name)
+        with self._lock:
+            self._collections.pop(name, None)
+            shutil.rmtree(self.path / name, ignore_errors=True)
+            # Like Qdrant, deleting a collection removes the aliases pointing at it.
+            self._aliases = {a: c for a, c in self._aliases.items() if c != name}
+            self._save_aliases()
+        return True
+
+    def update_collection(self, collection_name: str, **_kwargs) -> bool:
+        # Exact search has no index or optimizer to configure.
+        return True
+
+    def create_payload_index(self, collection_name: str, field_name: str, **_kwargs) -> None:
+        # Every field is a column; filters are always vectorized scans.
+        return None
+
+    # ---------------- Aliases ----------------
+
+    def _save_aliases(self) -> None:
+        (self.path / ALIASES_FILE).write_text(json.dumps(self._aliases), encoding="utf-8")
+
+    def get_aliases(self) -> CollectionsAliasesResponse:
+        return CollectionsAliasesResponse(
+            aliases=[AliasDescription(alias_name=a, collection_name=c) for a, c in self._aliases.items()]
+        )
+
+    def update_collection_aliases(self, change_aliases_operations, **_kwargs) -> bool:
+        with self._lock:
+            aliases = dict(self._aliases)
+            for operation in change_aliases_operations:
+                if getattr(operation, "delete_alias", None) is not None:
+                    aliases.pop(operation.delete_alias.alias_name, None)
+                elif getattr(operation, "create_alias", None) is not None:
+                    create = operation.create_alias
+                    aliases[create.alias_name] = create.collection_name
+            self._aliases = aliases
+            self._save_aliases()
+        return True
+
+    # ---------------- Points ----------------
+
+    def upsert(self, collection_name: str, points, **_kwargs) -> None:
+        collection = self._get(collection_name)
+        with self._lock:
+            collection.upsert(points)
+
+    def query_points(
+        self,
+        collection_name: str,
+        query,
+        limit: int = 10,
+        query_filter: Optional[Filter] = None,
+        with_payload: bool = True,
+        with_vectors: bool = False,
+        score_threshold: Optional[float] = None,
+        **_kwargs,
+    ) -> QueryResponse:
+        collection = self._get(collection_name)
+        with self._lock:
+            if not len(collection):
+                return QueryResponse(points=[])
+
+            scores = collection.scores(query)
+            scores[~collection.mask(query_filter)] = -np.inf
+            if score_threshold is not None:
+                scores[scores < score_threshold] = -np.inf
+
+            k = min(limit, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return QueryResponse(points=self._scored(collection, top, scores, with_payload, with_vectors))
+
+    @staticmethod
+    def _scored(collection: _Collection, rows, scores: np.ndarray, with_payload: bool, with_vectors: bool) -> List[ScoredPoint]:
+        points = []
+        for row in rows:
+            if not np.isfinite(scores[row]):
+                break
+            record = collection.record(int(row), with_payload=with_payload, with_vectors=with_vectors)
+            points.append(
+                ScoredPoint(id=record.id, version=0, score=float(scores[row]), payload=record.payload, vector=record.vector)
+            )
+        return points
+
+    def query_points_groups(
+        self,
+        collection_name: str,
+        group_by: str,
+        query,
+        limit: int = 10,
+        group_size: int = 3,
+        query_filter: Optional[Filter] = None,
+        with_payload: bool = True,
+        with_vectors: bool = False,
+        **_kwargs,
+    ) -> GroupsResult:
+        collection = self._get(collection_name)
+        with self._lock:
+            if not len(collection):
+                return GroupsResult(groups=[])
+
+            scores = collection.scores(query)
+            scores[~collection.mask(query_filter)] = -np.inf
+
+            groups: Dict[Any, List[int]] = {}
+            for row in np.argsort(-scores, kind="stable"):
+                if not np.isfinite(scores[row]):
+                    break
+                key = collection.payloads[row].get(group_by)
+                if key is None or isinstance(key, (list, dict)):
+                    continue
+                if key not in groups:
+                    if len(groups) >= limit:
+                        continue
+                    groups[key] = []
+                if len(groups[key]) < group_size:
+                    groups[key].append(int(row))
+                if len(groups) >= limit and all(len(g) >= group_size for g in groups.values()):
+                    break
+
+            return GroupsResult(
+                groups=[
+                    PointGroup(id=key, hits=self._scored(collection, rows, scores, with_payload, with_vectors))
+                    for key, rows in groups.items()
+                ]
+            )
+
+    def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[Filter] = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload: bool = True,
+        with_vectors: bool = False,
+        **_kwargs,
+    ):
+        collection = self._get(collection_name)
+        with self._lock:
+            rows = np.flatnonzero(collection.mask(scroll_filter))
+            # Offsets are row positions; callers treat them as opaque.
+            rows = rows[rows >= (offset or 0)]
+            page = rows[:limit]
+            next_offset = int(rows[limit]) if len(rows) > limit else None
+            records = [collection.record(int(r), with_payload, with_vectors) for r in page]
+            return records, next_offset
+
+    def retrieve(
+        self,
+        collection_name: str,
+        ids,
+        with_payload: bool = True,
+        with_vectors: bool = False,
+        **_kwargs,
+    ) -> List[Record]:
+        collection = self._get(collection_name)
+        with self._lock:
+            rows = [collection.rows.get(str(pid)) for pid in ids]
+            return [collection.record(r, with_payload, with_vectors) for r in rows if r is not None]
+
+    def count(self, collection_name: str, count_filter: Optional[Filter] = None, **_kwargs) -> CountResult:
+        collection = self._get(collection_name)
+        with self._lock:
+            return CountResult(count=int(collection.mask(count_filter).sum()))
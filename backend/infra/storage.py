@@ -0,0 +1,59 @@
+import hashlib
+import shutil
+from pathlib import Path
+from typing import List, Optional
+
+from backend.config import INDEX_DATA_DIR
+
+
+VERSIONS_DIR = "versions"
+
+
+def version_data_dir(version: str) -> Path:
+    """Side-store directory of one blue/green collection version."""
+    return INDEX_DATA_DIR / VERSIONS_DIR / version
+
+
+def repo_data_dir(repo_url: Optional[str], create: bool = False, version: Optional[str] = None) -> Path:
+    """
+    Directory holding the local per-repo index artifacts.
+
+    Repo URLs are hashed so arbitrary URLs map to safe directory names.
+    With a `version` (the collection a build writes into) the artifacts live
+    next to that version and are dropped together with it.
+    """
+    key = hashlib.sha1((repo_url or "").encode("utf-8")).hexdigest()[:16]
+    path = (version_data_dir(version) if version else INDEX_DATA_DIR) / key
+    if create:
+        path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def served_data_dir(repo_url: Optional[str], version: Optional[str], marker: str) -> Path:
+    """
+    Where a reader finds `marker` for a repo: the version's directory, or the
+    unversioned one for indexes built before versioned side stores.
+    """
+    if version:
+        path = repo_data_dir(repo_url, version=version)
+        if (path / marker).exists():
+            return path
+    return repo_data_dir(repo_url)
+
+
+def list_version_data() -> List[str]:
+    root = INDEX_DATA_DIR / VERSIONS_DIR
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if p.is_dir())
+
+
+def drop_version_data(version: str) -> None:
+    """Releases any loaded side stores of a version and deletes its directory."""
+    from backend.infra.content_store import release_content_stores
+    from backend.infra.trigram_index import release_trigram_indexes
+
+    directory = version_data_dir(version)
+    release_content_stores(directory)
+    release_trigram_indexes(directory)
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from backend.infra.storage import repo_data_dir, served_data_dir
+
+
+META_FILE = "trigram_meta.json"
+POSTINGS_FILE = "trigram_postings.bin"
+
+_LOADED: Dict[str, tuple[float, "TrigramIndex"]] = {}
+_LOAD_LOCK = threading.Lock()
+
+
+def _trigrams(text: str) -> Set[str]:
+    # Trigrams are case-folded so a single index serves case-insensitive queries;
+    # exact case is enforced later during candidate verification.
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# -------------------------
+# Query Planning
+# -------------------------
+
+# A query node is either None (matches every doc), ("and", [nodes]),
+# ("or", [nodes]) or a literal string whose trigrams must all be present.
+
+def _and(nodes: List[Any]) -> Any:
+    nodes = [n for n in nodes if n is not None]
+    if not nodes:
+        return None
+    if len(nodes) == 1:
+        return nodes[0]
+    return ("and", nodes)
+
+
+def _literal(run: List[str]) -> Any:
+    text = "".join(run)
+    return text if len(text) >= 3 else None
+
+
+def _regex_node(parsed: Iterable[Any]) -> Any:
+    nodes: List[Any] = []
+    run: List[str] = []
+
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+
+        nodes.append(_literal(run))
+        run = []
+
+        if op is sre_parse.SUBPATTERN:
+            nodes.append(_regex_node(av[-1]))
+        elif op is sre_parse.BRANCH:
+            branches = [_regex_node(alt) for alt in av[1]]
+            # One unconstrained alternative makes the whole alternation unconstrained.
+            nodes.append(None if any(b is None for b in branches) else ("or", branches))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            min_repeat, _max_repeat, sub = av
+            if min_repeat >= 1:
+                nodes.append(_regex_node(sub))
+
+    nodes.append(_literal(run))
+    return _and(nodes)
+
+
+def plan_query(pattern: str, regex: bool = False) -> Any:
+    if not regex:
+        return pattern if len(pattern) >= 3 else None
+
+    try:
+        return _regex_node(sre_parse.parse(pattern))
+    except Exception:
+        # Unparseable patterns degrade to a verified full scan.
+        return None
+
+
+def _file_line(doc: Dict[str, Any], line_no: int) -> int:
+    """Maps a 0-based line inside a chunk's content to its 1-based file line."""
+    runs = doc.get("line_map")
+    if not runs:
+        return (doc.get("start_line") or 1) + line_no
+
+    # Stitched chunks (imports, class headers, top-level code) skip file lines between runs.
+    pos = bisect_right([run[0] for run in runs], line_no) - 1
+    content_line, file_line = runs[max(pos, 0)]
+    return file_line + line_no - content_line
+
+
+# -------------------------
+# Index
+# -------------------------
+
+class TrigramIndex:
+    """
+    Inverted trigram index over chunk content.
+
+    Posting lists are sorted doc-id arrays stored back to back in a single
+    binary file; `keys` maps each trigram to its (start, end) slice.
+    """
+
+    def __init__(self, docs: List[Dict[str, Any]], keys: Dict[str, tuple[int, int]], postings: array):
+        self.docs = docs
+        self.keys = keys
+        self.postings = postings
+
+    @classmethod
+    def build(cls, docs: List[Dict[str, Any]]) -> "TrigramIndex":
+        inverted: Dict[str, List[int]] = {}
+        for doc_id, doc in enumerate(docs):
+            for gram in _trigrams(doc.get("content") or ""):
+                inverted.setdefault(gram, []).append(doc_id)
+
+        keys: Dict[str, tuple[int, int]] = {}
+        postings = array("I")
+        for gram in sorted(inverted):
+            start = len(postings)
+            postings.extend(inverted[gram])
+            keys[gram] = (start, len(postings))
+
+        return cls(docs, keys, postings)
+
+    # ---------------- Persistence ----------------
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "docs": self.docs,
+            "keys": {gram: list(span) for gram, span in self.keys.items()},
+        }
+        tmp_meta = directory / (META_FILE + ".tmp")
+        tmp_postings = directory / (POSTINGS_FILE + ".tmp")
+        tmp_meta.write_text(json.dumps(meta), encoding="utf-8")
+        tmp_postings.write_bytes(self.postings.tobytes())
+        tmp_postings.replace(directory / POSTINGS_FILE)
+        tmp_meta.replace(directory / META_FILE)
+
+    @classmethod
+    def load(cls, directory: Path) -> "TrigramIndex":
+        meta = json.loads((directory / META_FILE).read_text(encoding="utf-8"))
+        postings = array("I")
+        postings.frombytes((directory / POSTINGS_FILE).read_bytes())
+        keys = {gram: (span[0], span[1]) for gram, span in meta["keys"].items()}
+        return cls(meta["docs"], keys, postings)
+
+    # ---------------- Search ----------------
+
+    def _posting(self, gram: str) -> array:
+        span = self.keys.get(gram)
+        if span is None:
+            return array("I")
+        return self.postings[span[0]:span[1]]
+
+    def _literal_candidates(self, literal: str, within: Optional[Set[int]]) -> Set[int]:
+        lists = sorted((self._posting(g) for g in _trigrams(literal)), key=len)
+        if not lists or not lists[0]:
+            return set()
+
+        seed = lists[0] if within is None else [d for d in lists[0] if d in within]
+        result = set()
+        for doc_id in seed:
+            for other in lists[1:]:
+                pos = bisect_left(other, doc_id)
+                if pos == len(other) or other[pos] != doc_id:
+                    break
+            else:
+                result.add(doc_id)
+        return result
+
+    def _candidates(self, node: Any, within: Optional[Set[int]] = None) -> Optional[Set[int]]:
+        """Returns the candidate doc ids for a query node, or None for 'all docs'."""
+        if node is None:
+            return within
+
+        if isinstance(node, str):
+            return self._literal_candidates(node, within)
+
+        op, children = node
+        if op == "and":
+            current = within
+            for child in children:
+                current = self._candidates(child, current)
+                if current is not None and not current:
+                    break
+            return current
+
+        union: Set[int] = set()
+        for child in children:
+            matched = self._candidates(child, within)
+            if matched is None:
+                return within
+            union |= matched
+        return union
+
+    def search(
+        self,
+        pattern: str,
+        regex: bool = False,
+        case_sensitive: bool = True,
+        max_results: int = 50,
+    ) -> List[Dict[str, Any]]:
+        flags = 0 if case_sensitive else re.IGNORECASE
+        compiled = re.compile(pattern if regex else re.escape(pattern), flags)
+
+        candidates = self._candidates(plan_query(pattern, regex=regex))
+        doc_ids = range(len(self.docs)) if candidates is None else sorted(candidates)
+
+        matches: List[Dict[str, Any]] = []
+        seen: Set[tuple[str, int]] = set()
+        for doc_id in doc_ids:
+            doc = self.docs[doc_id]
+            content = doc.get("content") or ""
+
+            line_no = 0
+            line_pos = 0
+            last_line = -1
+            for match in compiled.finditer(content):
+                line_no += content.count("\n", line_pos, match.start())
+                line_pos = match.start()
+                if line_no == last_line:
+                    continue
+                last_line = line_no
+
+                line_start = content.rfind("\n", 0, match.start()) + 1
+                line_end = content.find("\n", match.start())
+                if line_end < 0:
+                    line_end = len(content)
+
+                # Overlapping chunks (e.g. blind chunks) report the same file line once.
+                file_line = (doc.get("file_path", ""), _file_line(doc, line_no))
+                if doc.get("start_line") is not None:
+                    if file_line in seen:
+                        continue
+                    seen.add(file_line)
+
+                matches.append(
+                    {
+                        "chunk_id": doc.get("chunk_id"),
+                        "file_path": file_line[0],
+                        "line": file_line[1],
+                        "text": content[line_start:line_end],
+                    }
+                )
+                if len(matches) >= max_results:
+                    return matches
+
+        return matches
+
+
+class TrigramIndexBuilder:
+    """Accumulates chunk docs during ingest and writes the index once at the end."""
+
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+
+    def add(self, chunk: Dict[str, Any]) -> None:
+        doc = {
+            "chunk_id": chunk.get("id"),
+            "file_path": chunk.get("file_path", ""),
+            "content": chunk.get("content", ""),
+            "start_line": chunk.get("start_line"),
+        }
+        if chunk.get("line_map"):
+            doc["line_map"] = chunk["line_map"]
+        self.docs.append(doc)
+
+    def save(self, repo_url: Optional[str], version: Optional[str] = None) -> None:
+        directory = repo_data_dir(repo_url, create=True, version=version)
+        TrigramIndex.build(self.docs).save(directory)
+        with _LOAD_LOCK:
+            _LOADED.pop(str(directory), None)
+
+
+def load_trigram_index(repo_url: Optional[str], version: Optional[str] = None) -> Optional[TrigramIndex]:
+    """Loads (and memoizes per file mtime) the trigram index built for collection `version`."""
+    directory = served_data_dir(repo_url, version, META_FILE)
+    meta_path = directory / META_FILE
+    if not meta_path.exists():
+        return None
+
+    mtime = meta_path.stat().st_mtime
+    key = str(directory)
+    with _LOAD_LOCK:
+        cached = _LOADED.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        index = TrigramIndex.load(directory)
+        _LOADED[key] = (mtime, index)
+        return index
+
+
+def release_trigram_indexes(directory: Path) -> None:
+    prefix = str(directory)
+    with _LOAD_LOCK:
+        for key in [key for key in _LOADED if key == prefix or key.startswith(prefix + os.sep)]:
+            del _LOADED[key]
@@ -1,18 +1,33 @@
 
-from typing import List, Optional
+import asyncio
+import json
+import logging
+import re
+from typing import List, Optional, Union
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from backend.tasks.ingest.ingest import ingest
-from backend.tasks.query.query import query_repo
-from backend.infra.db import get_qdrant_client, get_collection_name
-from backend.tasks.query.rag.agent_rag import retrieve_chunks_for_agent, expand_context_for_agent
-from AI_Agent.app import run_agent
+from backend.tasks.query.query import aquery_repo, astream_query_repo
+from backend.infra.cache import cache_stats
+from backend.infra.db import get_async_qdrant_client, get_collection_name
+from backend.infra.groq_pool import groq_pool_stats
+from backend.infra.llm_router import breaker_stats, hedge_stats
+from backend.tasks.query.rag.agent_rag import (
+    aretrieve_chunks_for_agent,
+    expand_context_for_agent,
+    locate_symbol_for_agent,
+)
+from backend.tasks.query.rag.grep import grep_for_agent
+from AI_Agent.app import arun_agent, astream_agent
+from AI_Agent.graph.confidence import pipeline_stats
 
 
 app = FastAPI(title="Repo Doc Bot")
+logger = logging.getLogger("backend.api")
 
 
 # ---------------- CORS (For React) ----------------
@@ -32,18 +47,30 @@ class IngestRequest(BaseModel):
     repo_url: str
 
 
-class QueryRequest(BaseModel):
+class ScopeFields(BaseModel):
+    # Optional retrieval scope: directory or file prefix(es), an fnmatch-style
+    # path glob, language(s) and agent code type(s) such as "py:function".
+    path_prefix: Optional[Union[str, List[str]]] = None
+    path_glob: Optional[str] = None
+    language: Optional[Union[str, List[str]]] = None
+    code_type: Optional[Union[str, List[str]]] = None
+
+
+class QueryRequest(ScopeFields):
     question: str
+    repo_url: Optional[str] = None
 
 
 class QueryResponse(BaseModel):
     answer: str
 
 
-class RagRetrieveRequest(BaseModel):
+class RagRetrieveRequest(ScopeFields):
     repo_url: Optional[str] = None
     query: str
     top_k: int = 5
+    # "mmr" or "group" for diversity-aware retrieval; None uses RETRIEVAL_DIVERSITY.
+    diversity: Optional[str] = None
 
 
 class RagExpandRequest(BaseModel):
@@ -54,32 +81,53 @@ class RagExpandRequest(BaseModel):
     max_chunks: int = 3
 
 
+class RagGrepRequest(BaseModel):
+    repo_url: str
+    pattern: str
+    regex: bool = False
+    case_sensitive: bool = True
+    max_results: int = 50
+
+
+class RagLocateRequest(BaseModel):
+    repo_url: Optional[str] = None
+    symbol: str
+    # Skip the grep fallback; only identifier/class_name index hits count.
+    exact_only: bool = False
+
+
 class AgentQueryRequest(BaseModel):
     repo_url: str
     question: str
     session_id: Optional[str] = None
+    # Latency budget for the run; defaults to AGENT_DEADLINE_MS.
+    deadline_ms: Optional[int] = None
 
 
 class AgentQueryResponse(BaseModel):
     answer: str
     session_id: str
+    # Stages skipped or shortened to meet the deadline.
+    skipped_stages: List[str] = []
 
 # ---------------- ROUTES ----------------
+# Routes are async: model and vector-search calls are awaited on the event loop,
+# blocking work (ingest, expansion scrolls, grep) is pushed to worker threads.
 
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Backend is running"}
 
 
 @app.get("/has_index")
-def has_index():
+async def has_index():
 
-    client = get_qdrant_client()
+    client = get_async_qdrant_client()
     collection_name = get_collection_name()
 
     try:
-        info = client.get_collection(collection_name)
+        info = await client.get_collection(collection_name)
         count = info.points_count
         return {"has_index": count > 0}
 
@@ -87,35 +135,63 @@ def has_index():
         return {"has_index": False}
 
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return cache_stats()
+
+
+@app.get("/agent/stats")
+async def get_agent_stats():
+    return pipeline_stats()
+
+
+@app.get("/llm/stats")
+async def get_llm_stats():
+    return {"breakers": breaker_stats(), "hedging": hedge_stats(), "groq_pool": groq_pool_stats()}
+
+
 @app.post("/ingest")
-def ingest_repo(request: IngestRequest):
+async def ingest_repo(request: IngestRequest):
 
-    ingest(request.repo_url)
+    await asyncio.to_thread(ingest, request.repo_url)
 
     return {"status": "success"}
 
 
 @app.post("/query", response_model=QueryResponse)
-def query_repository(request: QueryRequest):
+async def query_repository(request: QueryRequest):
 
-    answer = query_repo(request.question)
+    answer = await aquery_repo(
+        request.question,
+        repo_url=request.repo_url,
+        path_prefix=request.path_prefix,
+        path_glob=request.path_glob,
+        language=request.language,
+        code_type=request.code_type,
+    )
 
     return {"answer": answer}
 
 
 @app.post("/rag/retrieve")
-def rag_retrieve(request: RagRetrieveRequest):
-    chunks = retrieve_chunks_for_agent(
+async def rag_retrieve(request: RagRetrieveRequest):
+    chunks = await aretrieve_chunks_for_agent(
         query=request.query,
         top_k=request.top_k,
         repo_url=request.repo_url,
+        diversity=request.diversity,
+        path_prefix=request.path_prefix,
+        path_glob=request.path_glob,
+        language=request.language,
+        code_type=request.code_type,
     )
     return {"chunks": chunks}
 
 
 @app.post("/rag/expand")
-def rag_expand(request: RagExpandRequest):
-    chunks = expand_context_for_agent(
+async def rag_expand(request: RagExpandRequest):
+    chunks = await asyncio.to_thread(
+        expand_context_for_agent,
         repo_url=request.repo_url,
         source_chunk_ids=request.source_chunk_ids,
         requested_code_types=request.requested_code_types,
@@ -125,15 +201,92 @@ def rag_expand(request: RagExpandRequest):
     return {"chunks": chunks}
 
 
+@app.post("/rag/grep")
+async def rag_grep(request: RagGrepRequest):
+    try:
+        matches = await asyncio.to_thread(
+            grep_for_agent,
+            pattern=request.pattern,
+            repo_url=request.repo_url,
+            regex=request.regex,
+            case_sensitive=request.case_sensitive,
+            max_results=request.max_results,
+        )
+    except re.error as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid regex: {exc}")
+    return {"matches": matches}
+
+
+@app.post("/rag/locate")
+async def rag_locate(request: RagLocateRequest):
+    chunks = await asyncio.to_thread(
+        locate_symbol_for_agent, symbol=request.symbol, repo_url=request.repo_url, exact_only=request.exact_only
+    )
+    return {"chunks": chunks}
+
+
 @app.post("/agent/query", response_model=AgentQueryResponse)
-def agent_query(request: AgentQueryRequest):
-    state = run_agent(
+async def agent_query(request: AgentQueryRequest):
+    state = await arun_agent(
         user_query=request.question,
         repo_url=request.repo_url,
         session_id=request.session_id,
+        deadline_ms=request.deadline_ms,
     )
 
     return {
         "answer": state.get("explanation") or "",
         "session_id": state.get("session_id") or (request.session_id or ""),
+        "skipped_stages": state.get("skipped_stages") or [],
     }
+
+
+# ---------------- STREAMING ----------------
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _event_stream(events):
+    try:
+        async for event, data in events:
+            yield _sse(event, data)
+    except Exception as exc:
+        # Headers are already sent, so failures are reported in-band.
+        logger.exception("stream failed: %s", exc)
+        yield _sse("error", {"detail": str(exc)})
+
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        _event_stream(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/query/stream")
+async def query_repository_stream(request: QueryRequest):
+    return _sse_response(
+        astream_query_repo(
+            request.question,
+            repo_url=request.repo_url,
+            path_prefix=request.path_prefix,
+            path_glob=request.path_glob,
+            language=request.language,
+            code_type=request.code_type,
+        )
+    )
+
+
+@app.post("/agent/query/stream")
+async def agent_query_stream(request: AgentQueryRequest):
+    return _sse_response(
+        astream_agent(
+            user_query=request.question,
+            repo_url=request.repo_url,
+            session_id=request.session_id,
+            deadline_ms=request.deadline_ms,
+        )
+    )
@@ -1,20 +1,23 @@
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 
-def blind_chunk(text: str, chunk_size: int = 800, overlap: int = 200) -> List[str]:
-    chunks = []
+def blind_chunk_offsets(length: int, chunk_size: int = 800, overlap: int = 200) -> List[Tuple[int, int]]:
+    offsets = []
     start = 0
-    length = len(text)
 
     while start < length:
         end = start + chunk_size
-        chunks.append(text[start:end])
+        offsets.append((start, min(end, length)))
         start = end - overlap
         if start < 0:
             start = 0
 
-    return chunks
+    return offsets
+
+
+def blind_chunk(text: str, chunk_size: int = 800, overlap: int = 200) -> List[str]:
+    return [text[start:end] for start, end in blind_chunk_offsets(len(text), chunk_size, overlap)]
 
 
 def extract_chunks(file_path: Path) -> List[Dict]:
@@ -24,15 +27,26 @@ def extract_chunks(file_path: Path) -> List[Dict]:
     except Exception:
         return []
 
-    raw_chunks = blind_chunk(content)
-
     structured = []
+    char_pos = 0
+    byte_pos = 0
+    line = 1
+
+    for start, end in blind_chunk_offsets(len(content)):
+        # Offsets only move forward, so lines and bytes are counted incrementally.
+        byte_pos += len(content[char_pos:start].encode("utf-8"))
+        line += content.count("\n", char_pos, start)
+        char_pos = start
 
-    for chunk in raw_chunks:
+        chunk = content[start:end]
         structured.append({
             "language": "blind",
             "chunk_type": "blind_chunk",
-            "content": chunk
+            "content": chunk,
+            "start_line": line,
+            "end_line": line + chunk.count("\n"),
+            "start_byte": byte_pos,
+            "end_byte": byte_pos + len(chunk.encode("utf-8")),
         })
 
     return structured
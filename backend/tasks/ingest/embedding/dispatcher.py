@@ -1,13 +1,27 @@
 import importlib
+import logging
+import os
 import pkgutil
+import time
 from pathlib import Path
 from typing import Dict, List, Set
 
+from backend.infra.content_store import CONTENT_STORE_ENABLED, ContentStoreWriter
+from backend.infra.db import begin_bulk_load, create_collection, end_bulk_load
 from backend.infra.llm import embed_text
+from backend.infra.trigram_index import TrigramIndexBuilder
+from backend.tasks.ingest.vector_store.file_vectors import FileVectorBuilder
 from backend.tasks.ingest.vector_store.qdrant_store import insert_chunks
 from backend.tasks.ingest.embedding.blind_chunker import extract_chunks as fallback_extract
 
 
+logger = logging.getLogger("backend.ingest")
+
+INSERT_BATCH_SIZE = int(os.getenv("INGEST_INSERT_BATCH_SIZE", "64"))
+# File-level vectors back the first stage of two-stage retrieval.
+FILE_VECTORS_ENABLED = os.getenv("FILE_VECTORS_ENABLED", "true").lower() == "true"
+
+
 # -------------------------
 # Dynamic Language Loader
 # -------------------------
@@ -55,14 +69,108 @@ def resolve_uses(language_chunks: List[Dict]):
             ]
 
 
+# -------------------------
+# Batched Writer
+# -------------------------
+
+class _ChunkWriter:
+    """
+    Buffers embedded chunks into batched upserts.
+
+    The first flush creates the collection (its vector size comes from the
+    first embedding) and switches it into the bulk-load profile; `close()`
+    restores the normal optimizer settings once everything is written,
+    then writes the per-file pooled vectors. A failed ingest calls `abort()`
+    instead, which writes nothing further.
+    """
+
+    def __init__(self, trigram_builder: TrigramIndexBuilder, content_store, collection_name=None, file_vectors=None):
+        self.trigram_builder = trigram_builder
+        self.content_store = content_store
+        self.collection_name = collection_name
+        self.file_vectors = file_vectors
+        self.pending: List[Dict] = []
+        self.bulk_state = None
+        self.started = False
+
+    def add(self, chunk: Dict):
+        self.pending.append(chunk)
+        if len(self.pending) >= INSERT_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        if not self.started:
+            create_collection(len(self.pending[0]["embedding"]), collection_name=self.collection_name)
+            self.bulk_state = begin_bulk_load(self.collection_name)
+            self.started = True
+
+        insert_chunks(self.pending, content_store=self.content_store, collection_name=self.collection_name)
+        for chunk in self.pending:
+            self.trigram_builder.add(chunk)
+            if self.file_vectors is not None:
+                self.file_vectors.add(chunk)
+        self.pending = []
+
+    def close(self):
+        try:
+            self.flush()
+        except BaseException:
+            self.abort()
+            raise
+        end_bulk_load(self.bulk_state, self.collection_name)
+
+        if self.file_vectors is not None:
+            self.file_vectors.save(self.collection_name)
+
+    def abort(self):
+        """Failure path: restores the optimizer settings without waiting for an index nobody will serve."""
+        end_bulk_load(self.bulk_state, self.collection_name, wait=False)
+
+
 # -------------------------
 # Main Dispatcher Entry
 # -------------------------
 
-def process_repository(repo_path: Path, repo_url: str | None = None):
+def process_repository(repo_path: Path, repo_url: str | None = None, collection_name: str | None = None):
 
+    started = time.perf_counter()
     language_modules = load_language_modules()
     processed_files: Set[Path] = set()
+    trigram_builder = TrigramIndexBuilder()
+    content_store = ContentStoreWriter(repo_url, version=collection_name) if CONTENT_STORE_ENABLED else None
+    file_vectors = FileVectorBuilder(repo_url) if FILE_VECTORS_ENABLED else None
+    writer = _ChunkWriter(trigram_builder, content_store, collection_name, file_vectors)
+
+    try:
+        _process_files(repo_path, repo_url, language_modules, processed_files, writer)
+    except BaseException:
+        # The version is dropped by the caller; don't pool or write anything more for it.
+        writer.abort()
+        if content_store is not None:
+            content_store.discard()
+        raise
+    writer.close()
+
+    # -------------------------
+    # Exact-Match Search Index
+    # -------------------------
+
+    trigram_builder.save(repo_url, version=collection_name)
+    if content_store is not None:
+        content_store.close()
+
+    logger.info(
+        "step=ingest status=done repo=%s bulk_load=%s elapsed_ms=%.1f",
+        repo_url,
+        writer.bulk_state is not None,
+        (time.perf_counter() - started) * 1000,
+    )
+
+
+def _process_files(repo_path: Path, repo_url, language_modules, processed_files: Set[Path], writer: _ChunkWriter):
 
     # -------------------------
     # Per-Language Processing
@@ -128,7 +236,7 @@ def process_repository(repo_path: Path, repo_url: str | None = None):
                 continue  # skip invalid embeddings
 
             chunk["embedding"] = embedding
-            insert_chunks([chunk])
+            writer.add(chunk)
 
 
         # Flush memory
@@ -179,4 +287,4 @@ def process_repository(repo_path: Path, repo_url: str | None = None):
                 continue  # skip invalid embeddings
 
             chunk["embedding"] = embedding
-            insert_chunks([chunk])
+            writer.add(chunk)
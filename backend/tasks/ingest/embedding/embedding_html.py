@@ -26,6 +26,47 @@ def take_tag(tag: Tag) -> str:
     return str(tag)
 
 
+def line_starts(source: str) -> List[int]:
+    starts = [0]
+    for line in source.splitlines(keepends=True):
+        starts.append(starts[-1] + len(line))
+    return starts
+
+
+def tag_span(tag: Tag, source: str, starts: List[int]) -> Dict:
+    """
+    Span fields for a parsed tag.
+
+    html.parser records where a tag opens; the end is derived from the
+    serialized tag, which can differ slightly from the original markup.
+    """
+    if tag.sourceline is None:
+        return {}
+
+    start_char = starts[tag.sourceline - 1] + (tag.sourcepos or 0)
+    start_byte = len(source[:start_char].encode("utf-8"))
+    rendered = str(tag)
+
+    return {
+        "start_line": tag.sourceline,
+        "end_line": tag.sourceline + rendered.count("\n"),
+        "start_byte": start_byte,
+        "end_byte": start_byte + len(rendered.encode("utf-8")),
+    }
+
+
+def merge_spans(spans: List[Dict]) -> Dict:
+    spans = [sp for sp in spans if sp]
+    if not spans:
+        return {}
+    return {
+        "start_line": min(sp["start_line"] for sp in spans),
+        "end_line": max(sp["end_line"] for sp in spans),
+        "start_byte": min(sp["start_byte"] for sp in spans),
+        "end_byte": max(sp["end_byte"] for sp in spans),
+    }
+
+
 def mark_used(tag: Tag, used_nodes: Set[int]):
     used_nodes.add(id(tag))
     for descendant in tag.descendants:
@@ -45,6 +86,7 @@ def extract_chunks(file_path: Path) -> List[Dict]:
         return []
 
     soup = BeautifulSoup(source, "html.parser")
+    starts = line_starts(source)
     used_nodes: Set[int] = set()
     chunks: List[Dict] = []
 
@@ -55,7 +97,8 @@ def extract_chunks(file_path: Path) -> List[Dict]:
         chunks.append({
             "language": LANGUAGE,
             "chunk_type": "html_main_section",
-            "content": take_tag(main_tag)
+            "content": take_tag(main_tag),
+            **tag_span(main_tag, source, starts)
         })
         return chunks
 
@@ -79,7 +122,8 @@ def extract_chunks(file_path: Path) -> List[Dict]:
             chunks.append({
                 "language": LANGUAGE,
                 "chunk_type": chunk_type_map.get(tag.name, "html_component_block"),
-                "content": take_tag(tag)
+                "content": take_tag(tag),
+                **tag_span(tag, source, starts)
             })
 
     # 3️⃣ Script blocks
@@ -97,7 +141,8 @@ def extract_chunks(file_path: Path) -> List[Dict]:
             "language": LANGUAGE,
             "chunk_type": "html_script_block",
             "content": take_tag(tag),
-            "external_scripts": external_scripts
+            "external_scripts": external_scripts,
+            **tag_span(tag, source, starts)
         })
 
     # 4️⃣ Style blocks
@@ -110,11 +155,13 @@ def extract_chunks(file_path: Path) -> List[Dict]:
         chunks.append({
             "language": LANGUAGE,
             "chunk_type": "html_style_block",
-            "content": take_tag(tag)
+            "content": take_tag(tag),
+            **tag_span(tag, source, starts)
         })
 
     # 5️⃣ Remaining top-level markup
     remaining = []
+    remaining_spans = []
 
     body_iter = soup.body.descendants if soup.body else soup.descendants
 
@@ -128,13 +175,15 @@ def extract_chunks(file_path: Path) -> List[Dict]:
             text = str(element).strip()
             if text:
                 remaining.append(text)
+                remaining_spans.append(tag_span(element, source, starts))
                 used_nodes.add(id(element))
 
     if remaining:
         chunks.append({
             "language": LANGUAGE,
             "chunk_type": "html_top_level_markup",
-            "content": "\n".join(remaining)
+            "content": "\n".join(remaining),
+            **merge_spans(remaining_spans)
         })
 
     return chunks
@@ -26,6 +26,17 @@ def get_node_text(source_bytes: bytes, node):
     return source_bytes[node.start_byte:node.end_byte].decode("utf-8", errors="ignore")
 
 
+def node_span(first, last=None):
+    """Span fields covering nodes first..last (tree-sitter rows are 0-based)."""
+    last = last or first
+    return {
+        "start_line": first.start_point[0] + 1,
+        "end_line": last.end_point[0] + 1,
+        "start_byte": first.start_byte,
+        "end_byte": last.end_byte,
+    }
+
+
 def extract_identifier_from_function(node, source_bytes):
     for child in node.children:
         if child.type == "identifier":
@@ -92,7 +103,8 @@ def extract_chunks(file_path: Path) -> List[Dict]:
         chunks.append({
             "language": LANGUAGE,
             "chunk_type": "javascript_import",
-            "content": content
+            "content": content,
+            **node_span(import_nodes[0], import_nodes[-1])
         })
         claimed_ranges.append((start, end))
 
@@ -133,7 +145,8 @@ def extract_chunks(file_path: Path) -> List[Dict]:
                                 "content": get_node_text(source_bytes, element),
                                 "identifier": method_name,
                                 "class_name": class_name,
-                                "uses": extract_uses(element, source_bytes)
+                                "uses": extract_uses(element, source_bytes),
+                                **node_span(element)
                             })
 
                             claim(element)
@@ -151,7 +164,8 @@ def extract_chunks(file_path: Path) -> List[Dict]:
                 "content": header_content,
                 "identifier": class_name,
                 "member_functions": member_functions,
-                "uses": list(header_uses)
+                "uses": list(header_uses),
+                **node_span(node)
             })
 
             claim(node)
@@ -168,16 +182,25 @@ def extract_chunks(file_path: Path) -> List[Dict]:
                 "chunk_type": "javascript_function",
                 "content": get_node_text(source_bytes, node),
                 "identifier": identifier,
-                "uses": extract_uses(node, source_bytes)
+                "uses": extract_uses(node, source_bytes),
+                **node_span(node)
             })
 
             claim(node)
 
     # 4️⃣ Remaining Top-Level Code
     remaining = []
+    remaining_nodes = []
+    # [content_line, file_line] where each stitched node starts.
+    remaining_map = []
+    content_line = 0
     for node in root.children:
         if not is_claimed(node):
-            remaining.append(get_node_text(source_bytes, node))
+            text = get_node_text(source_bytes, node)
+            remaining.append(text)
+            remaining_nodes.append(node)
+            remaining_map.append([content_line, node.start_point[0] + 1])
+            content_line += text.count("\n") + 1
             claim(node)
 
     if remaining:
@@ -185,7 +208,9 @@ def extract_chunks(file_path: Path) -> List[Dict]:
             "language": LANGUAGE,
             "chunk_type": "javascript_top_level_code",
             "content": "\n".join(remaining),
-            "uses": []
+            "uses": [],
+            "line_map": remaining_map,
+            **node_span(remaining_nodes[0], remaining_nodes[-1])
         })
 
     return chunks
@@ -22,6 +22,38 @@ def extract_content(lines: List[str], start: int, end: int) -> str:
     return "\n".join(lines[start:end])
 
 
+def line_byte_offsets(source: str) -> List[int]:
+    """Byte offset of the start of every line, plus the total byte length."""
+    offsets = [0]
+    for line in source.splitlines(keepends=True):
+        offsets.append(offsets[-1] + len(line.encode("utf-8")))
+    return offsets
+
+
+def span(start: int, end: int, offsets: List[int]) -> Dict:
+    """Span fields for 0-based line range [start, end)."""
+    end = min(end, len(offsets) - 1)
+    return {
+        "start_line": start + 1,
+        "end_line": end,
+        "start_byte": offsets[start],
+        "end_byte": offsets[end],
+    }
+
+
+def line_map(indices: List[int]) -> List[List[int]]:
+    """
+    `[content_line, file_line]` pairs marking where each contiguous run of a
+    stitched chunk starts (content lines 0-based, file lines 1-based), so
+    matches inside it can be mapped back to real file lines.
+    """
+    runs = []
+    for pos, index in enumerate(indices):
+        if not runs or index != indices[pos - 1] + 1:
+            runs.append([pos, index + 1])
+    return runs
+
+
 def extract_uses(node: ast.AST) -> List[str]:
     uses = set()
 
@@ -45,7 +77,8 @@ def extract_uses(node: ast.AST) -> List[str]:
 def extract_docstring(
     tree: ast.Module,
     lines: List[str],
-    used_lines: set
+    used_lines: set,
+    offsets: List[int]
 ) -> Optional[Dict]:
 
     if not tree.body:
@@ -66,7 +99,8 @@ def extract_docstring(
         return {
             "language": LANGUAGE,
             "chunk_type": "python_docstring",
-            "content": extract_content(lines, start, end)
+            "content": extract_content(lines, start, end),
+            **span(start, end, offsets)
         }
 
     return None
@@ -79,7 +113,8 @@ def extract_docstring(
 def extract_classes(
     tree: ast.Module,
     lines: List[str],
-    used_lines: set
+    used_lines: set,
+    offsets: List[int]
 ) -> List[Dict]:
 
     chunks = []
@@ -94,10 +129,10 @@ def extract_classes(
 
             # --- Member Functions First ---
             for method in method_nodes:
-                if node.decorator_list:
-                    start = min(d.lineno for d in node.decorator_list) - 1
+                if method.decorator_list:
+                    start = min(d.lineno for d in method.decorator_list) - 1
                 else:
-                    start = node.lineno - 1
+                    start = method.lineno - 1
 
                 end = method.end_lineno
 
@@ -109,18 +144,24 @@ def extract_classes(
                     "content": extract_content(lines, start, end),
                     "identifier": method.name,
                     "class_name": node.name,
-                    "uses": extract_uses(method)
+                    "uses": extract_uses(method),
+                    **span(start, end, offsets)
                 })
 
             # --- Class Header (Remaining Class-Level Code) ---
-            class_start = node.lineno - 1
+            if node.decorator_list:
+                class_start = min(d.lineno for d in node.decorator_list) - 1
+            else:
+                class_start = node.lineno - 1
             class_end = node.end_lineno
 
             header_lines = []
+            header_indices = []
 
             for i in range(class_start, class_end):
                 if i not in used_lines:
                     header_lines.append(lines[i])
+                    header_indices.append(i)
                     used_lines.add(i)
 
             # Compute header-level uses ONLY (exclude method bodies)
@@ -136,7 +177,10 @@ def extract_classes(
                 "content": "\n".join(header_lines),
                 "identifier": node.name,
                 "member_functions": [m.name for m in method_nodes],
-                "uses": list(header_uses)
+                "uses": list(header_uses),
+                # Header lines are scattered around the methods; the span covers the whole class.
+                "line_map": line_map(header_indices),
+                **span(class_start, class_end, offsets)
             })
 
     return chunks
@@ -149,7 +193,8 @@ def extract_classes(
 def extract_functions(
     tree: ast.Module,
     lines: List[str],
-    used_lines: set
+    used_lines: set,
+    offsets: List[int]
 ) -> List[Dict]:
 
     chunks = []
@@ -171,7 +216,8 @@ def extract_functions(
                 "chunk_type": "python_function",
                 "content": extract_content(lines, start, end),
                 "identifier": node.name,
-                "uses": extract_uses(node)
+                "uses": extract_uses(node),
+                **span(start, end, offsets)
             })
 
     return chunks
@@ -184,10 +230,12 @@ def extract_functions(
 def extract_imports(
     tree: ast.Module,
     lines: List[str],
-    used_lines: set
+    used_lines: set,
+    offsets: List[int]
 ) -> Optional[Dict]:
 
     import_lines = []
+    import_indices = []
 
     for node in tree.body:
         if isinstance(node, (ast.Import, ast.ImportFrom)):
@@ -197,6 +245,7 @@ def extract_imports(
             for i in range(start, end):
                 if i not in used_lines:
                     import_lines.append(lines[i])
+                    import_indices.append(i)
                     used_lines.add(i)
 
     if not import_lines:
@@ -205,7 +254,9 @@ def extract_imports(
     return {
         "language": LANGUAGE,
         "chunk_type": "python_import",
-        "content": "\n".join(import_lines)
+        "content": "\n".join(import_lines),
+        "line_map": line_map(import_indices),
+        **span(import_indices[0], import_indices[-1] + 1, offsets)
     }
 
 
@@ -215,14 +266,17 @@ def extract_imports(
 
 def extract_top_level_code(
     lines: List[str],
-    used_lines: set
+    used_lines: set,
+    offsets: List[int]
 ) -> Optional[Dict]:
 
     remaining = []
+    remaining_indices = []
 
     for i, line in enumerate(lines):
         if i not in used_lines and line.strip():
             remaining.append(line)
+            remaining_indices.append(i)
             used_lines.add(i)
 
     if not remaining:
@@ -232,7 +286,9 @@ def extract_top_level_code(
         "language": LANGUAGE,
         "chunk_type": "python_top_level_code",
         "content": "\n".join(remaining),
-        "uses": []
+        "uses": [],
+        "line_map": line_map(remaining_indices),
+        **span(remaining_indices[0], remaining_indices[-1] + 1, offsets)
     }
 
 
@@ -253,27 +309,28 @@ def extract_chunks(file_path: Path) -> List[Dict]:
         return []
 
     lines = source.splitlines()
+    offsets = line_byte_offsets(source)
     used_lines = set()
     chunks = []
 
     # 1️⃣ Docstring
-    doc = extract_docstring(tree, lines, used_lines)
+    doc = extract_docstring(tree, lines, used_lines, offsets)
     if doc:
         chunks.append(doc)
 
     # 2️⃣ Classes (member functions -> header)
-    chunks.extend(extract_classes(tree, lines, used_lines))
+    chunks.extend(extract_classes(tree, lines, used_lines, offsets))
 
     # 3️⃣ Top-Level Functions
-    chunks.extend(extract_functions(tree, lines, used_lines))
+    chunks.extend(extract_functions(tree, lines, used_lines, offsets))
 
     # 4️⃣ Imports
-    imports = extract_imports(tree, lines, used_lines)
+    imports = extract_imports(tree, lines, used_lines, offsets)
     if imports:
         chunks.append(imports)
 
     # 5️⃣ Remaining Top-Level Code
-    top_level = extract_top_level_code(lines, used_lines)
+    top_level = extract_top_level_code(lines, used_lines, offsets)
     if top_level:
         chunks.append(top_level)
 
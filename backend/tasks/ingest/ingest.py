@@ -3,30 +3,55 @@ from pathlib import Path
 
 from backend.tasks.ingest.repo_clone.clone_repo import clone_repo
 from backend.tasks.ingest.embedding.dispatcher import process_repository
-from backend.infra.db import clear_collection
+from backend.infra.db import (
+    drop_collection_later,
+    drop_collection_version,
+    drop_stale_versions,
+    get_qdrant_client,
+    next_collection_version,
+    switch_alias,
+)
+from backend.infra.generation import publish_index_version
+from backend.infra.storage import drop_version_data
 from AI_Agent.repo_registry import register_repo
 
 
 def ingest(repo_url: str) -> None:
 
-    clear_collection()
+    # Build into a fresh versioned collection; queries keep using the
+    # currently aliased version until the switch below.
+    target = next_collection_version()
 
     repo_path: Path | None = None
 
     try:
         repo_path = clone_repo(repo_url)
 
-        process_repository(repo_path, repo_url=repo_url)
+        # Index the repository into the new version.
+        process_repository(repo_path, repo_url=repo_url, collection_name=target)
 
-    finally:
+    except Exception:
+        if get_qdrant_client().collection_exists(target):
+            drop_collection_version(target)
+        else:
+            drop_version_data(target)
         if repo_path and repo_path.exists():
             shutil.rmtree(repo_path, ignore_errors=True)
-    repo_path = clone_repo(repo_url)
+        raise
 
-    # Index the repository into Qdrant.
-    process_repository(repo_path, repo_url=repo_url)
+    if get_qdrant_client().collection_exists(target):
+        previous = switch_alias(target)
+        drop_stale_versions(target, previous)
+        if previous is not None:
+            drop_collection_later(previous)
+
+        # Grep and content reads follow the served version; the alias now serves a
+        # different collection, so every repo's cached results are stale too.
+        publish_index_version(target)
+    else:
+        # Nothing was indexed, so there is no version to serve these side stores.
+        drop_version_data(target)
 
     # Register the cloned repository path so the AI agent can later
     # apply and push changes against the correct working tree.
     register_repo(repo_url, repo_path)
-
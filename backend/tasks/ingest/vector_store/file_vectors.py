@@ -0,0 +1,97 @@
+import os
+import re
+import uuid
+from typing import Dict, Optional
+
+import numpy as np
+from qdrant_client.models import PointStruct
+
+from backend.infra.db import create_collection, files_collection_name, get_qdrant_client
+from backend.infra.llm import embed_text
+from backend.tasks.ingest.vector_store.qdrant_store import path_prefixes
+
+
+# Share of the file vector taken by the embedded path tokens; 0 skips the extra embedding call.
+FILE_PATH_WEIGHT = float(os.getenv("FILE_PATH_WEIGHT", "0.3"))
+FILE_VECTOR_BATCH_SIZE = 256
+
+_PATH_SPLIT = re.compile(r"[/\\._\-\s]+")
+_CAMEL_SPLIT = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def path_tokens(file_path: str) -> str:
+    """'backend/tasks/query/rag/agentRag.py' -> 'backend tasks query rag agent rag py'."""
+    parts = [p for p in _PATH_SPLIT.split(file_path) if p]
+    return " ".join(_CAMEL_SPLIT.sub(" ", p).lower() for p in parts)
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class FileVectorBuilder:
+    """
+    Mean-pools chunk embeddings per file during ingest and writes one
+    file-level point per file into the companion `<collection>_files`
+    collection, used as the first stage of two-stage retrieval.
+    """
+
+    def __init__(self, repo_url: Optional[str]):
+        self.repo_url = repo_url
+        self.sums: Dict[str, np.ndarray] = {}
+        self.counts: Dict[str, int] = {}
+        self.languages: Dict[str, Optional[str]] = {}
+
+    def add(self, chunk: Dict) -> None:
+        file_path = chunk.get("file_path")
+        embedding = chunk.get("embedding")
+        if not file_path or not embedding:
+            return
+
+        vector = _unit(np.asarray(embedding, dtype=np.float32))
+        if file_path in self.sums:
+            self.sums[file_path] += vector
+            self.counts[file_path] += 1
+        else:
+            self.sums[file_path] = vector
+            self.counts[file_path] = 1
+            self.languages[file_path] = chunk.get("language")
+
+    def file_vector(self, file_path: str) -> np.ndarray:
+        pooled = _unit(self.sums[file_path] / self.counts[file_path])
+        if FILE_PATH_WEIGHT <= 0:
+            return pooled
+
+        path_embedding = embed_text(path_tokens(file_path))
+        if not path_embedding or len(path_embedding) != len(pooled):
+            return pooled
+        path_vector = _unit(np.asarray(path_embedding, dtype=np.float32))
+        return _unit((1 - FILE_PATH_WEIGHT) * pooled + FILE_PATH_WEIGHT * path_vector)
+
+    def save(self, collection_name: Optional[str] = None) -> None:
+        if not self.sums:
+            return
+
+        name = files_collection_name(collection_name)
+        create_collection(len(next(iter(self.sums.values()))), collection_name=name)
+
+        client = get_qdrant_client()
+        points = []
+        for file_path in self.sums:
+            payload = {
+                "file_path": file_path,
+                "path_prefixes": path_prefixes(file_path),
+                "language": self.languages[file_path],
+                "chunk_count": self.counts[file_path],
+            }
+            if self.repo_url:
+                payload["repo_url"] = self.repo_url
+            points.append(
+                PointStruct(id=str(uuid.uuid4()), vector=self.file_vector(file_path).tolist(), payload=payload)
+            )
+            if len(points) >= FILE_VECTOR_BATCH_SIZE:
+                client.upsert(collection_name=name, points=points)
+                points = []
+        if points:
+            client.upsert(collection_name=name, points=points)
@@ -1,50 +1,86 @@
 from qdrant_client.models import PointStruct
-from backend.infra.db import get_qdrant_client, get_collection_name, create_collection
+from backend.infra.db import get_qdrant_client, get_collection_name
 import uuid
 
 
-def insert_chunks(chunks):
+def path_prefixes(file_path):
+    """Directory prefixes of a relative path: 'a/b/c.py' -> ['a', 'a/b']."""
+    parts = (file_path or "").replace("\\", "/").split("/")[:-1]
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def build_payload(chunk):
+    """Filterable metadata stored on the Qdrant point (chunk bodies excluded)."""
+
+    payload = {
+        "language": chunk.get("language"),
+        "chunk_type": chunk.get("chunk_type"),
+        "file_path": chunk.get("file_path"),
+        # Keyword-indexed so "everything under backend/tasks" is a single match.
+        "path_prefixes": path_prefixes(chunk.get("file_path")),
+        "chunk_number": chunk.get("chunk_number"),
+    }
+
+    # Optional metadata
+    if "identifier" in chunk:
+        payload["identifier"] = chunk["identifier"]
+
+    if "uses" in chunk:
+        payload["uses"] = chunk["uses"]
+
+    if "class_name" in chunk:
+        payload["class_name"] = chunk["class_name"]
+
+    if "member_functions" in chunk:
+        payload["member_functions"] = chunk["member_functions"]
+
+    if "repo_url" in chunk:
+        payload["repo_url"] = chunk["repo_url"]
+
+    # Real source spans reported by the chunkers (1-based lines, byte offsets).
+    for key in ("start_line", "end_line", "start_byte", "end_byte"):
+        if key in chunk:
+            payload[key] = chunk[key]
+
+    return payload
+
+
+def insert_chunks(chunks, content_store=None, collection_name=None):
+    """
+    Upserts embedded chunks. With a `content_store` writer, chunk bodies go to
+    the local compressed store and the Qdrant payload keeps metadata only.
+    `collection_name` targets a specific version instead of the served alias.
+    The collection must already exist: the ingest writer creates it (and its
+    payload indexes) once before the first batch.
+    """
 
     if not chunks:
         return
 
     client = get_qdrant_client()
-    collection_name = get_collection_name()
-
-    vector_size = len(chunks[0]["embedding"])
-    create_collection(vector_size)
+    version = collection_name
+    collection_name = collection_name or get_collection_name()
 
     points = []
 
     for chunk in chunks:
 
-        payload = {
-            "content": chunk.get("content"),
-            "language": chunk.get("language"),
-            "chunk_type": chunk.get("chunk_type"),
-            "file_path": chunk.get("file_path"),
-            "chunk_number": chunk.get("chunk_number"),
-        }
-
-        # Optional metadata
-        if "identifier" in chunk:
-            payload["identifier"] = chunk["identifier"]
-
-        if "uses" in chunk:
-            payload["uses"] = chunk["uses"]
-
-        if "class_name" in chunk:
-            payload["class_name"] = chunk["class_name"]
+        # Callers read the id back to key local side indexes to the Qdrant point.
+        point_id = chunk.setdefault("id", str(uuid.uuid4()))
 
-        if "member_functions" in chunk:
-            payload["member_functions"] = chunk["member_functions"]
+        payload = build_payload(chunk)
+        if version:
+            # Readers open the side stores written for the collection that served the point.
+            payload["index_version"] = version
 
-        if "repo_url" in chunk:
-            payload["repo_url"] = chunk["repo_url"]
+        if content_store is not None:
+            content_store.put(point_id, chunk.get("content"))
+        else:
+            payload["content"] = chunk.get("content")
 
         points.append(
             PointStruct(
-                id=str(uuid.uuid4()),
+                id=point_id,
                 vector=chunk["embedding"],
                 payload=payload
             )
@@ -1,7 +1,7 @@
-from backend.infra.llm import chat
+from backend.infra.llm import achat, astream_chat, chat
 
 
-def generate_answer(query: str, retrieved_chunks: list) -> str:
+def _answer_prompt(query: str, retrieved_chunks: list) -> str:
     context = "\n\n".join(
         f"File: {chunk['file_path']}\n{chunk['text']}"
         for chunk in retrieved_chunks
@@ -23,4 +23,17 @@ def generate_answer(query: str, retrieved_chunks: list) -> str:
         "If the context is insufficient, say what is missing instead of guessing."
     )
 
-    return chat(prompt)
+    return prompt
+
+
+def generate_answer(query: str, retrieved_chunks: list) -> str:
+    return chat(_answer_prompt(query, retrieved_chunks))
+
+
+async def agenerate_answer(query: str, retrieved_chunks: list) -> str:
+    return await achat(_answer_prompt(query, retrieved_chunks))
+
+
+async def astream_answer(query: str, retrieved_chunks: list):
+    async for delta in astream_chat(_answer_prompt(query, retrieved_chunks)):
+        yield delta
@@ -0,0 +1,277 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+from backend.infra.cache import register_cache
+from backend.infra.generation import index_generation
+from backend.tasks.query.rag.embed_query import normalize_query
+
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+# Cosine similarity between query embeddings above which an earlier answer is reused.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_PER_REPO = int(os.getenv("SEMANTIC_CACHE_MAX_PER_REPO", "256"))
+SEMANTIC_CACHE_MAX_REPOS = int(os.getenv("SEMANTIC_CACHE_MAX_REPOS", "64"))
+SEMANTIC_CACHE_TTL_S = float(os.getenv("SEMANTIC_CACHE_TTL_S", "86400"))
+# Misses this close below the threshold are logged too, so it can be tuned from the audit log.
+SEMANTIC_CACHE_AUDIT_MARGIN = float(os.getenv("SEMANTIC_CACHE_AUDIT_MARGIN", "0.03"))
+SEMANTIC_CACHE_AUDIT_SAMPLES = int(os.getenv("SEMANTIC_CACHE_AUDIT_SAMPLES", "50"))
+
+logger = logging.getLogger("backend.semantic_cache")
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    vector: np.ndarray
+    answer: str
+    payload: Any = None
+    stored_at: float = field(default_factory=time.monotonic)
+    hits: int = 0
+
+
+@dataclass
+class SemanticHit:
+    answer: str
+    payload: Any
+    similarity: float
+    cached_question: str
+
+
+class _RepoAnswers:
+    """Answers for one (namespace, repo) pair, all computed under one index generation."""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: list = []
+
+    def matrix(self):
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            self._matrix = np.stack([self.entries[key].vector for key in self._keys])
+        return self._keys, self._matrix
+
+    def changed(self) -> None:
+        self._matrix = None
+
+
+def _unit(vector) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    if not array.size or norm == 0:
+        return None
+    return array / norm
+
+
+class SemanticAnswerCache:
+    """
+    Earlier answers per repo, looked up by cosine similarity of the question
+    embedding rather than by exact text.
+
+    Entries are tagged with the repo's index generation and the whole repo
+    bucket is dropped once it moves on (re-ingest). Each repo keeps at most
+    `max_per_repo` answers, least recently hit evicted first.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_per_repo: int = SEMANTIC_CACHE_MAX_PER_REPO,
+        max_repos: int = SEMANTIC_CACHE_MAX_REPOS,
+        ttl_seconds: Optional[float] = SEMANTIC_CACHE_TTL_S,
+        audit_margin: float = SEMANTIC_CACHE_AUDIT_MARGIN,
+        audit_samples: int = SEMANTIC_CACHE_AUDIT_SAMPLES,
+    ):
+        self.threshold = threshold
+        self.max_per_repo = max_per_repo
+        self.max_repos = max_repos
+        self.ttl_seconds = ttl_seconds
+        self.audit_margin = audit_margin
+
+        self._repos: "OrderedDict[tuple, _RepoAnswers]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._recent_hits: deque = deque(maxlen=audit_samples)
+
+        self.hits = 0
+        self.misses = 0
+        self.near_misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _bucket(self, namespace: str, repo_url: Optional[str], create: bool) -> Optional[_RepoAnswers]:
+        key = (namespace, repo_url or "")
+        generation = index_generation(repo_url)
+        bucket = self._repos.get(key)
+        if bucket is not None and bucket.generation != generation:
+            # The repo was re-ingested since these answers were computed.
+            self.invalidations += 1
+            del self._repos[key]
+            bucket = None
+
+        if bucket is None and create:
+            bucket = self._repos[key] = _RepoAnswers(generation)
+            while len(self._repos) > self.max_repos:
+                _, dropped = self._repos.popitem(last=False)
+                self.evictions += len(dropped.entries)
+        if bucket is not None:
+            self._repos.move_to_end(key)
+        return bucket
+
+    def _expire(self, bucket: _RepoAnswers) -> None:
+        if self.ttl_seconds is None:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        stale = [key for key, entry in bucket.entries.items() if entry.stored_at < cutoff]
+        for key in stale:
+            del bucket.entries[key]
+        if stale:
+            bucket.changed()
+
+    def lookup(self, namespace: str, repo_url: Optional[str], vector, question: str) -> Optional[SemanticHit]:
+        query = _unit(vector)
+        if query is None:
+            return None
+
+        with self._lock:
+            bucket = self._bucket(namespace, repo_url, create=False)
+            if bucket is not None:
+                self._expire(bucket)
+            if bucket is None or not bucket.entries:
+                self.misses += 1
+                return None
+
+            keys, matrix = bucket.matrix()
+            if matrix.shape[1] != query.shape[0]:
+                # Embedding model or dimension changed under us; nothing here is comparable.
+                self.misses += 1
+                return None
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            entry = bucket.entries[keys[best]]
+
+            if similarity < self.threshold:
+                self.misses += 1
+                if similarity >= self.threshold - self.audit_margin:
+                    self.near_misses += 1
+                    logger.info(
+                        "semantic_cache_near_miss namespace=%s repo=%s similarity=%.4f question=%r cached_question=%r",
+                        namespace,
+                        repo_url,
+                        similarity,
+                        question,
+                        entry.question,
+                    )
+                return None
+
+            self.hits += 1
+            entry.hits += 1
+            bucket.entries.move_to_end(keys[best])
+            self._recent_hits.append(
+                {
+                    "namespace": namespace,
+                    "repo_url": repo_url,
+                    "similarity": round(similarity, 4),
+                    "question": question,
+                    "cached_question": entry.question,
+                }
+            )
+
+        # Every hit is logged with both questions so false hits can be audited.
+        logger.info(
+            "semantic_cache_hit namespace=%s repo=%s similarity=%.4f question=%r cached_question=%r",
+            namespace,
+            repo_url,
+            similarity,
+            question,
+            entry.question,
+        )
+        return SemanticHit(
+            answer=entry.answer, payload=entry.payload, similarity=similarity, cached_question=entry.question
+        )
+
+    def store(
+        self,
+        namespace: str,
+        repo_url: Optional[str],
+        vector,
+        question: str,
+        answer: str,
+        payload: Any = None,
+        generation: Optional[int] = None,
+    ) -> bool:
+        """
+        Remembers an answer. `generation` is the index generation the answer
+        was computed under; it is not stored if the index moved on meanwhile.
+        """
+        unit = _unit(vector)
+        if unit is None or not answer or self.max_per_repo <= 0:
+            return False
+        if generation is not None and generation != index_generation(repo_url):
+            return False
+
+        key = normalize_query(question)
+        with self._lock:
+            bucket = self._bucket(namespace, repo_url, create=True)
+            bucket.entries.pop(key, None)
+            bucket.entries[key] = CachedAnswer(question=question, vector=unit, answer=answer, payload=payload)
+            while len(bucket.entries) > self.max_per_repo:
+                bucket.entries.popitem(last=False)
+                self.evictions += 1
+            bucket.changed()
+            self.stores += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._repos.clear()
+            self._recent_hits.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "repos": len(self._repos),
+                "entries": sum(len(bucket.entries) for bucket in self._repos.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "near_misses": self.near_misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "recent_hits": list(self._recent_hits),
+            }
+
+
+_answer_cache = register_cache("semantic_answers", SemanticAnswerCache())
+
+
+def lookup_answer(namespace: str, repo_url: Optional[str], vector, question: str) -> Optional[SemanticHit]:
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    return _answer_cache.lookup(namespace, repo_url, vector, question)
+
+
+def store_answer(
+    namespace: str,
+    repo_url: Optional[str],
+    vector,
+    question: str,
+    answer: str,
+    payload: Any = None,
+    generation: Optional[int] = None,
+) -> bool:
+    if not SEMANTIC_CACHE_ENABLED:
+        return False
+    return _answer_cache.store(namespace, repo_url, vector, question, answer, payload, generation)
@@ -1,9 +1,117 @@
-from backend.tasks.query.rag.embed_query import embed_query
-from backend.tasks.query.rag.retrieve import retrieve
-from backend.tasks.query.answer.generate import generate_answer
+import asyncio
+import json
+import logging
+import time
 
+from backend.infra.generation import index_generation
+from backend.tasks.query.answer.semantic_cache import lookup_answer, store_answer
+from backend.tasks.query.rag.agent_rag import build_scope_filter
+from backend.tasks.query.rag.embed_query import aembed_query, embed_query
+from backend.tasks.query.rag.retrieve import aretrieve, retrieve
+from backend.tasks.query.answer.generate import agenerate_answer, astream_answer, generate_answer
 
-def query_repo(question: str, top_k: int = 5) -> str:
+
+logger = logging.getLogger("backend.query")
+
+
+def _cache_namespace(top_k, path_prefix, path_glob, language, code_type) -> str:
+    # Answers are only interchangeable between questions asked with the same scope.
+    scope = [top_k, path_prefix, path_glob, language, code_type]
+    return "query:" + json.dumps(scope, sort_keys=True, default=str)
+
+
+def _file_paths(retrieved_chunks) -> list:
+    return [chunk["file_path"] for chunk in retrieved_chunks]
+
+
+def query_repo(
+    question: str,
+    top_k: int = 5,
+    repo_url=None,
+    path_prefix=None,
+    path_glob=None,
+    language=None,
+    code_type=None,
+) -> str:
     query_embedding = embed_query(question)
-    retrieved_chunks = retrieve(query_embedding, top_k=top_k)
-    return generate_answer(question, retrieved_chunks)
+    namespace = _cache_namespace(top_k, path_prefix, path_glob, language, code_type)
+    generation = index_generation(repo_url)
+    hit = lookup_answer(namespace, repo_url, query_embedding, question)
+    if hit is not None:
+        return hit.answer
+
+    query_filter = build_scope_filter(repo_url, path_prefix, path_glob, language, code_type)
+    retrieved_chunks = retrieve(query_embedding, top_k=top_k, query_filter=query_filter)
+    answer = generate_answer(question, retrieved_chunks)
+    store_answer(
+        namespace, repo_url, query_embedding, question, answer, _file_paths(retrieved_chunks), generation
+    )
+    return answer
+
+
+async def aquery_repo(
+    question: str,
+    top_k: int = 5,
+    repo_url=None,
+    path_prefix=None,
+    path_glob=None,
+    language=None,
+    code_type=None,
+) -> str:
+    query_embedding = await aembed_query(question)
+    namespace = _cache_namespace(top_k, path_prefix, path_glob, language, code_type)
+    generation = index_generation(repo_url)
+    hit = lookup_answer(namespace, repo_url, query_embedding, question)
+    if hit is not None:
+        return hit.answer
+
+    # Glob resolution may scroll the index, so the filter is built off the event loop.
+    query_filter = await asyncio.to_thread(
+        build_scope_filter, repo_url, path_prefix, path_glob, language, code_type
+    )
+    retrieved_chunks = await aretrieve(query_embedding, top_k=top_k, query_filter=query_filter)
+    answer = await agenerate_answer(question, retrieved_chunks)
+    store_answer(
+        namespace, repo_url, query_embedding, question, answer, _file_paths(retrieved_chunks), generation
+    )
+    return answer
+
+
+async def astream_query_repo(
+    question: str,
+    top_k: int = 5,
+    repo_url=None,
+    path_prefix=None,
+    path_glob=None,
+    language=None,
+    code_type=None,
+):
+    """Yields `(event, data)` pairs: the retrieved files, the answer's token deltas, then `done`."""
+    started = time.perf_counter()
+    query_embedding = await aembed_query(question)
+    namespace = _cache_namespace(top_k, path_prefix, path_glob, language, code_type)
+    generation = index_generation(repo_url)
+    hit = lookup_answer(namespace, repo_url, query_embedding, question)
+    if hit is not None:
+        yield "retrieval", {"file_paths": hit.payload or []}
+        yield "token", {"text": hit.answer}
+        yield "done", {"answer": hit.answer}
+        return
+
+    query_filter = await asyncio.to_thread(
+        build_scope_filter, repo_url, path_prefix, path_glob, language, code_type
+    )
+    retrieved_chunks = await aretrieve(query_embedding, top_k=top_k, query_filter=query_filter)
+    file_paths = _file_paths(retrieved_chunks)
+    yield "retrieval", {"file_paths": file_paths}
+
+    parts = []
+    async for delta in astream_answer(question, retrieved_chunks):
+        if not parts:
+            logger.info("query_stream_first_token ttft_ms=%.1f", (time.perf_counter() - started) * 1000)
+        parts.append(delta)
+        yield "token", {"text": delta}
+
+    answer = "".join(parts)
+    store_answer(namespace, repo_url, query_embedding, question, answer, file_paths, generation)
+    yield "done", {"answer": answer}
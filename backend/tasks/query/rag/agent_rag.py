@@ -1,16 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import fnmatch
 import heapq
+import json
 import os
+import re
 from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List, Optional, Set
 
-from qdrant_client.models import FieldCondition, Filter, MatchAny, MatchValue
+import numpy as np
+from qdrant_client.models import FieldCondition, Filter, MatchAny, MatchValue, Range, Record, SearchParams
 
-from backend.infra.db import get_collection_name, get_qdrant_client
-from backend.infra.llm import embed_text
+from backend.infra.cache import LRUCache, register_cache
+from backend.infra.content_store import fetch_content
+from backend.infra.db import (
+    files_collection_name,
+    get_async_qdrant_client,
+    get_collection_name,
+    get_qdrant_client,
+    get_search_params,
+)
+from backend.infra.generation import index_generation
+from backend.tasks.query.rag.embed_query import aembed_query, embed_query, normalize_query
+from backend.tasks.query.rag.grep import grep_for_agent
 
 
+# Code type of blind (parser-less) chunks: no imports or headers, just line spans.
+BLIND_CODE_TYPE = "text:chunk"
+
 CHUNK_TYPE_TO_CODE_TYPE = {
     "python_import": "py:imports",
     "python_class_header": "py:class_header",
@@ -31,7 +49,7 @@ CHUNK_TYPE_TO_CODE_TYPE = {
     "html_header": "html:header",
     "html_footer": "html:footer",
     "html_top_level_markup": "html:top_level",
-    "blind_chunk": "text:chunk",
+    "blind_chunk": BLIND_CODE_TYPE,
 }
 
 CODE_TYPE_TO_CHUNK_TYPES = {
@@ -47,11 +65,68 @@ CODE_TYPE_TO_CHUNK_TYPES = {
     "html:main": {"html_main"},
 }
 
-CANDIDATE_META_FIELDS = ["file_path", "chunk_type", "identifier", "uses", "class_name", "chunk_number"]
+CANDIDATE_META_FIELDS = [
+    "file_path",
+    "chunk_type",
+    "identifier",
+    "uses",
+    "class_name",
+    "chunk_number",
+    "start_line",
+    "end_line",
+]
 SCROLL_LIMIT = 256
 MAX_EXPAND_SCAN_POINTS = int(os.getenv("MAX_EXPAND_SCAN_POINTS", "1200"))
+ADJACENT_LINE_WINDOW = int(os.getenv("ADJACENT_LINE_WINDOW", "20"))
 RANKING_POOL_MULTIPLIER = 8
 MIN_RANKING_POOL = 24
+LOCATE_LIMIT = int(os.getenv("LOCATE_LIMIT", "10"))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "512"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "600"))
+CHUNK_CACHE_MAX_ENTRIES = int(os.getenv("CHUNK_CACHE_MAX_ENTRIES", "4096"))
+CHUNK_CACHE_MAX_BYTES = int(os.getenv("CHUNK_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CANDIDATE_CACHE_MAX_ENTRIES = int(os.getenv("CANDIDATE_CACHE_MAX_ENTRIES", "256"))
+GLOB_CACHE_MAX_ENTRIES = int(os.getenv("GLOB_CACHE_MAX_ENTRIES", "128"))
+# Two-stage retrieval: pick the top files by file-level vector, then search chunks within them.
+TWO_STAGE_RETRIEVAL = os.getenv("TWO_STAGE_RETRIEVAL", "false").lower() == "true"
+TWO_STAGE_TOP_FILES = int(os.getenv("TWO_STAGE_TOP_FILES", "20"))
+# Diversity-aware retrieval: "none", "mmr" (maximal marginal relevance) or "group" (per-file cap).
+RETRIEVAL_DIVERSITY = os.getenv("RETRIEVAL_DIVERSITY", "none").lower()
+DIVERSITY_OVERFETCH = int(os.getenv("DIVERSITY_OVERFETCH", "4"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+MAX_CHUNKS_PER_FILE = int(os.getenv("MAX_CHUNKS_PER_FILE", "2"))
+
+
+_retrieval_cache = register_cache(
+    "retrieval_results",
+    LRUCache(max_entries=RETRIEVAL_CACHE_MAX_ENTRIES, ttl_seconds=RETRIEVAL_CACHE_TTL_SECONDS),
+)
+
+
+def _payload_size(entry: tuple) -> int:
+    # Slim payloads carry no body, so measure the whole payload (spans, uses, paths...).
+    _, payload = entry
+    return len(json.dumps(payload, default=str)) + 64
+
+
+# Hot chunk payloads (point id -> (generation, payload)), bounded by bytes.
+_chunk_cache = register_cache(
+    "chunk_payloads",
+    LRUCache(max_entries=CHUNK_CACHE_MAX_ENTRIES, max_bytes=CHUNK_CACHE_MAX_BYTES, sizeof=_payload_size),
+)
+
+# Same-file expansion candidates (metadata only), keyed by file set and filters.
+_candidate_cache = register_cache(
+    "expansion_candidates",
+    LRUCache(max_entries=CANDIDATE_CACHE_MAX_ENTRIES),
+)
+
+
+# Resolved path globs ((repo, glob) -> (generation, matching file paths)).
+_glob_cache = register_cache(
+    "path_globs",
+    LRUCache(max_entries=GLOB_CACHE_MAX_ENTRIES),
+)
 
 
 @dataclass
@@ -59,11 +134,6 @@ class SourceMeta:
     file_paths: Set[str]
     entries: List[Dict[str, Any]]
 
-@dataclass
-class Candidate:
-    point: Any
-    score: float
-
 
 def _repo_filter(repo_url: Optional[str]) -> Optional[Filter]:
     if not repo_url:
@@ -71,11 +141,140 @@ def _repo_filter(repo_url: Optional[str]) -> Optional[Filter]:
     return Filter(must=[FieldCondition(key="repo_url", match=MatchValue(value=repo_url))])
 
 
+# -------------------------
+# Scope filters
+# -------------------------
+
+def _clean_path(path: str) -> str:
+    path = path.strip().replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.strip("/")
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    values = [value] if isinstance(value, str) else list(value)
+    return [v for v in values if v]
+
+
+def chunk_types_for(code_types: Any) -> List[str]:
+    """Maps agent code types (e.g. "py:function") to stored chunk types; raw chunk types pass through."""
+    wanted = set(_as_list(code_types))
+    chunk_types = {ct for ct, code in CHUNK_TYPE_TO_CODE_TYPE.items() if code in wanted}
+    chunk_types |= wanted & set(CHUNK_TYPE_TO_CODE_TYPE)
+    return sorted(chunk_types)
+
+
+def _glob_literal_prefix(pattern: str) -> str:
+    # Directory components before the first wildcard, served by the path_prefixes index.
+    parts = []
+    for part in pattern.split("/")[:-1]:
+        if any(ch in part for ch in "*?["):
+            break
+        parts.append(part)
+    return "/".join(parts)
+
+
+def _glob_file_paths(repo_url: Optional[str], pattern: str) -> List[str]:
+    pattern = _clean_path(pattern)
+    generation = index_generation(repo_url)
+    cache_key = (repo_url, pattern)
+    cached = _glob_cache.get(cache_key)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+
+    # The file-vector collection holds one point per file; fall back to chunks without it.
+    client = get_qdrant_client()
+    collection = files_collection_name()
+    if not client.collection_exists(collection):
+        collection = get_collection_name()
+
+    must = list(_repo_filter(repo_url).must) if repo_url else []
+    prefix = _glob_literal_prefix(pattern)
+    if prefix:
+        must.append(FieldCondition(key="path_prefixes", match=MatchValue(value=prefix)))
+
+    seen: Set[str] = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection,
+            scroll_filter=Filter(must=must) if must else None,
+            with_payload=["file_path"],
+            with_vectors=False,
+            limit=SCROLL_LIMIT,
+            offset=offset,
+        )
+        seen.update(p.payload["file_path"] for p in points if (p.payload or {}).get("file_path"))
+        if offset is None:
+            break
+
+    matches = sorted(fp for fp in seen if fnmatch.fnmatchcase(fp, pattern))
+    _glob_cache.set(cache_key, (generation, matches))
+    return matches
+
+
+def build_scope_filter(
+    repo_url: Optional[str],
+    path_prefix: Any = None,
+    path_glob: Optional[str] = None,
+    language: Any = None,
+    code_type: Any = None,
+) -> Optional[Filter]:
+    """
+    Builds the retrieval filter for a repo narrowed to a directory/file prefix,
+    an fnmatch-style path glob, language(s) and agent code type(s).
+    """
+    must: List[Any] = list(_repo_filter(repo_url).must) if repo_url else []
+
+    prefixes = [_clean_path(p) for p in _as_list(path_prefix)]
+    prefixes = [p for p in prefixes if p]
+    if prefixes:
+        # A prefix names either a directory (indexed ancestors) or a single file.
+        must.append(
+            Filter(
+                should=[
+                    FieldCondition(key="path_prefixes", match=MatchAny(any=prefixes)),
+                    FieldCondition(key="file_path", match=MatchAny(any=prefixes)),
+                ]
+            )
+        )
+
+    if path_glob:
+        # No file matches the glob: keep a condition that matches nothing.
+        file_paths = _glob_file_paths(repo_url, path_glob) or [""]
+        must.append(FieldCondition(key="file_path", match=MatchAny(any=file_paths)))
+
+    languages = [lang.lower() for lang in _as_list(language)]
+    if languages:
+        must.append(FieldCondition(key="language", match=MatchAny(any=languages)))
+
+    if code_type:
+        chunk_types = chunk_types_for(code_type) or [""]
+        must.append(FieldCondition(key="chunk_type", match=MatchAny(any=chunk_types)))
+
+    return Filter(must=must) if must else None
+
+
+def _chunk_content(point: Any) -> str:
+    payload = point.payload or {}
+    if "content" in payload:
+        return payload["content"] or ""
+    # Slim payloads: bodies live in the repo's local content store.
+    return fetch_content(payload.get("repo_url"), str(point.id), payload.get("index_version"))
+
+
 def _normalize_chunk(point: Any) -> Dict[str, Any]:
     payload = point.payload or {}
-    content = payload.get("content", "")
-    start_line = 1 if content else None
-    end_line = len(content.splitlines()) if content else None
+    content = _chunk_content(point)
+    start_line = payload.get("start_line")
+    end_line = payload.get("end_line")
+    if start_line is None and content:
+        # Points indexed before chunkers recorded spans: chunk-relative lines.
+        start_line = 1
+        end_line = content.count("\n") + 1
 
     symbols = []
     for key in ("identifier", "class_name"):
@@ -90,18 +289,377 @@ def _normalize_chunk(point: Any) -> Dict[str, Any]:
         "start_line": start_line,
         "end_line": end_line,
         "symbols": symbols or None,
+        # Search hits carry their similarity; fetched and scrolled points do not.
+        "score": getattr(point, "score", None),
+    }
+
+
+def _cache_payloads(points: Iterable[Any]) -> None:
+    for point in points:
+        payload = point.payload or {}
+        _chunk_cache.set(str(point.id), (index_generation(payload.get("repo_url")), payload))
+
+
+def _retrieve_points(ids: List[str]) -> List[Any]:
+    """
+    Fetches full points by id, serving hot payloads from the chunk cache.
+
+    All misses go to Qdrant in a single batched `retrieve`; results come back
+    in the order of `ids`, skipping ids that no longer exist.
+    """
+    by_id: Dict[str, Any] = {}
+    misses: List[str] = []
+
+    for pid in ids:
+        cached = _chunk_cache.get(pid)
+        if cached is not None and cached[0] == index_generation(cached[1].get("repo_url")):
+            by_id[pid] = Record(id=pid, payload=cached[1])
+        else:
+            misses.append(pid)
+
+    if misses:
+        fetched = get_qdrant_client().retrieve(
+            collection_name=get_collection_name(),
+            ids=misses,
+            with_payload=True,
+            with_vectors=False,
+        )
+        _cache_payloads(fetched)
+        for point in fetched:
+            by_id[str(point.id)] = point
+
+    return [by_id[pid] for pid in ids if pid in by_id]
+
+
+def _retrieval_cache_key(
+    repo_url: Optional[str],
+    query: str,
+    top_k: int,
+    query_filter: Optional[Filter],
+    search_params: Optional[SearchParams] = None,
+    **options: Any,
+):
+    filter_key = query_filter.model_dump_json() if query_filter is not None else None
+    params_key = search_params.model_dump_json() if search_params is not None else None
+    return (repo_url, normalize_query(query), top_k, filter_key, params_key, tuple(sorted(options.items())))
+
+
+def _restrict_to_files(query_filter: Optional[Filter], file_paths: List[str]) -> Filter:
+    must = list(query_filter.must or []) if query_filter is not None else []
+    must.append(FieldCondition(key="file_path", match=MatchAny(any=file_paths)))
+    return Filter(must=must)
+
+
+# -------------------------
+# Diversity
+# -------------------------
+
+def _mmr_order(points: List[Any], mmr_lambda: float) -> List[Any]:
+    """Orders points by maximal marginal relevance over their stored vectors."""
+    if len(points) < 2:
+        return list(points)
+
+    vectors = np.asarray([p.vector for p in points], dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = vectors @ vectors.T
+    relevance = np.asarray([p.score for p in points], dtype=np.float32)
+
+    order: List[int] = []
+    redundancy = np.zeros(len(points), dtype=np.float32)
+    available = np.ones(len(points), dtype=bool)
+    for _ in range(len(points)):
+        marginal = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * redundancy, -np.inf)
+        best = int(np.argmax(marginal))
+        order.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best]) if len(order) > 1 else similarity[best]
+    return [points[i] for i in order]
+
+
+def _overlapping_span(kept: List[Dict[str, Any]], payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if payload.get("chunk_type") != "blind_chunk" or payload.get("start_byte") is None:
+        return None
+    for span in kept:
+        if (
+            span["file_path"] == payload.get("file_path")
+            and span["start_byte"] is not None
+            and payload["start_byte"] <= span["end_byte"]
+            and payload["end_byte"] >= span["start_byte"]
+        ):
+            return span
+    return None
+
+
+def _merge_span(span: Dict[str, Any], payload: Dict[str, Any], chunk: Dict[str, Any]) -> None:
+    """Folds an overlapping blind chunk into an already selected one as a single contiguous span."""
+    left, right = (span, payload) if span["start_byte"] <= payload["start_byte"] else (payload, span)
+    left_bytes = (span["chunk"]["content"] if left is span else chunk["content"]).encode("utf-8")
+    right_bytes = (chunk["content"] if right is payload else span["chunk"]["content"]).encode("utf-8")
+    if right["end_byte"] > left["end_byte"]:
+        left_bytes += right_bytes[left["end_byte"] - right["start_byte"]:]
+
+    merged = span["chunk"]
+    merged["content"] = left_bytes.decode("utf-8", errors="ignore")
+    merged["start_line"] = min(merged["start_line"], chunk["start_line"])
+    merged["end_line"] = max(merged["end_line"], chunk["end_line"])
+    merged.setdefault("merged_chunk_ids", [merged["chunk_id"]]).append(chunk["chunk_id"])
+    span["start_byte"] = min(span["start_byte"], payload["start_byte"])
+    span["end_byte"] = max(span["end_byte"], payload["end_byte"])
+
+
+def _diverse_chunks(points: List[Any], top_k: int) -> List[Dict[str, Any]]:
+    """Walks ranked points, merging overlapping blind chunks, until `top_k` distinct chunks are kept."""
+    kept: List[Dict[str, Any]] = []
+    for point in points:
+        payload = point.payload or {}
+        span = _overlapping_span(kept, payload)
+        if span is not None:
+            _merge_span(span, payload, _normalize_chunk(point))
+            continue
+        if len(kept) >= top_k:
+            continue
+        kept.append(
+            {
+                "file_path": payload.get("file_path"),
+                "start_byte": payload.get("start_byte"),
+                "end_byte": payload.get("end_byte"),
+                "chunk": _normalize_chunk(point),
+            }
+        )
+    return [span["chunk"] for span in kept]
+
+
+# -------------------------
+# Retrieval
+# -------------------------
+
+# The sync and async entry points share everything but the embedding call
+# and the client: `_plan_retrieval` settles filters and the cache key, the
+# `_*_request` helpers build the Qdrant calls and `_finish_retrieval` turns
+# the search result into cached, normalized chunks.
+
+@dataclass
+class RetrievalPlan:
+    top_k: int
+    two_stage: bool
+    diversity: str
+    query_filter: Optional[Filter]
+    file_filter: Optional[Filter]
+    search_params: Optional[SearchParams]
+    cache_key: tuple
+    generation: int
+
+
+def _plan_retrieval(
+    query: str,
+    top_k: int,
+    repo_url: Optional[str],
+    hnsw_ef: Optional[int],
+    oversampling: Optional[float],
+    two_stage: Optional[bool],
+    diversity: Optional[str],
+    path_prefix: Any,
+    path_glob: Optional[str],
+    language: Any,
+    code_type: Any,
+) -> RetrievalPlan:
+    two_stage = TWO_STAGE_RETRIEVAL if two_stage is None else two_stage
+    diversity = (diversity or RETRIEVAL_DIVERSITY).lower()
+    query_filter = build_scope_filter(repo_url, path_prefix, path_glob, language, code_type)
+    search_params = get_search_params(hnsw_ef=hnsw_ef, oversampling=oversampling)
+    return RetrievalPlan(
+        top_k=top_k,
+        two_stage=two_stage,
+        diversity=diversity,
+        query_filter=query_filter,
+        # File points carry no chunk type, so the file stage drops that condition.
+        file_filter=build_scope_filter(repo_url, path_prefix, path_glob, language) if two_stage else None,
+        search_params=search_params,
+        cache_key=_retrieval_cache_key(
+            repo_url, query, top_k, query_filter, search_params, two_stage=two_stage, diversity=diversity
+        ),
+        generation=index_generation(repo_url),
+    )
+
+
+def _cached_chunks(plan: RetrievalPlan) -> Optional[List[Dict[str, Any]]]:
+    cached = _retrieval_cache.get(plan.cache_key)
+    if cached is not None and cached[0] == plan.generation:
+        return [dict(chunk) for chunk in cached[1]]
+    return None
+
+
+def _top_files_request(plan: RetrievalPlan, query_vector: List[float]) -> Dict[str, Any]:
+    return {
+        "collection_name": files_collection_name(),
+        "query": query_vector,
+        "limit": TWO_STAGE_TOP_FILES,
+        "query_filter": plan.file_filter,
+        "with_payload": ["file_path"],
+    }
+
+
+def _chunk_filter(plan: RetrievalPlan, file_result: Any) -> Optional[Filter]:
+    """The chunk-stage filter, restricted to the file stage's top files when it found any."""
+    if file_result is None:
+        return plan.query_filter
+    file_paths = [p.payload["file_path"] for p in file_result.points if (p.payload or {}).get("file_path")]
+    return _restrict_to_files(plan.query_filter, file_paths) if file_paths else plan.query_filter
+
+
+def _search_request(plan: RetrievalPlan, query_vector: List[float], query_filter: Optional[Filter]):
+    """(client method, kwargs) of the chunk search for the plan's diversity mode."""
+    request = {
+        "collection_name": get_collection_name(),
+        "query": query_vector,
+        "query_filter": query_filter,
+        "search_params": plan.search_params,
     }
+    if plan.diversity == "group":
+        return "query_points_groups", {
+            **request,
+            "group_by": "file_path",
+            "limit": plan.top_k,
+            "group_size": MAX_CHUNKS_PER_FILE,
+        }
+    if plan.diversity == "mmr":
+        return "query_points", {**request, "limit": plan.top_k * DIVERSITY_OVERFETCH, "with_vectors": True}
+    return "query_points", {**request, "limit": plan.top_k}
+
+
+def _finish_retrieval(plan: RetrievalPlan, result: Any) -> List[Dict[str, Any]]:
+    if plan.diversity == "group":
+        points = sorted((hit for group in result.groups for hit in group.hits), key=lambda p: p.score, reverse=True)
+    elif plan.diversity == "mmr":
+        points = _mmr_order(result.points, MMR_LAMBDA)
+    else:
+        points = result.points
+
+    _cache_payloads(points)
+    if plan.diversity in ("mmr", "group"):
+        chunks = _diverse_chunks(points, plan.top_k)
+    else:
+        chunks = [_normalize_chunk(point) for point in points]
+    _retrieval_cache.set(plan.cache_key, (plan.generation, chunks))
+    return [dict(chunk) for chunk in chunks]
 
 
-def retrieve_chunks_for_agent(query: str, top_k: int, repo_url: Optional[str]) -> List[Dict[str, Any]]:
+def retrieve_chunks_for_agent(
+    query: str,
+    top_k: int,
+    repo_url: Optional[str],
+    hnsw_ef: Optional[int] = None,
+    oversampling: Optional[float] = None,
+    two_stage: Optional[bool] = None,
+    diversity: Optional[str] = None,
+    path_prefix: Any = None,
+    path_glob: Optional[str] = None,
+    language: Any = None,
+    code_type: Any = None,
+) -> List[Dict[str, Any]]:
+    plan = _plan_retrieval(
+        query, top_k, repo_url, hnsw_ef, oversampling, two_stage, diversity, path_prefix, path_glob, language, code_type
+    )
+    cached = _cached_chunks(plan)
+    if cached is not None:
+        return cached
+
+    query_vector = embed_query(query)
     client = get_qdrant_client()
-    result = client.query_points(
+    file_result = None
+    # Falls back to a single-stage search when the index has no file vectors.
+    if plan.two_stage and client.collection_exists(files_collection_name()):
+        file_result = client.query_points(**_top_files_request(plan, query_vector))
+
+    method, request = _search_request(plan, query_vector, _chunk_filter(plan, file_result))
+    return _finish_retrieval(plan, getattr(client, method)(**request))
+
+
+async def aretrieve_chunks_for_agent(
+    query: str,
+    top_k: int,
+    repo_url: Optional[str],
+    hnsw_ef: Optional[int] = None,
+    oversampling: Optional[float] = None,
+    two_stage: Optional[bool] = None,
+    diversity: Optional[str] = None,
+    path_prefix: Any = None,
+    path_glob: Optional[str] = None,
+    language: Any = None,
+    code_type: Any = None,
+) -> List[Dict[str, Any]]:
+    """Async twin of `retrieve_chunks_for_agent`: the embedding and vector searches are awaited."""
+    args = (
+        query, top_k, repo_url, hnsw_ef, oversampling, two_stage, diversity, path_prefix, path_glob, language, code_type
+    )
+    # Resolving a glob may scroll the index; keep it off the event loop.
+    plan = await asyncio.to_thread(_plan_retrieval, *args) if path_glob else _plan_retrieval(*args)
+    cached = _cached_chunks(plan)
+    if cached is not None:
+        return cached
+
+    query_vector = await aembed_query(query)
+    client = get_async_qdrant_client()
+    file_result = None
+    if plan.two_stage and await client.collection_exists(files_collection_name()):
+        file_result = await client.query_points(**_top_files_request(plan, query_vector))
+
+    method, request = _search_request(plan, query_vector, _chunk_filter(plan, file_result))
+    result = await getattr(client, method)(**request)
+    # Slim payloads read their bodies from the content store (mmap + decompression); keep that off the loop.
+    return await asyncio.to_thread(_finish_retrieval, plan, result)
+
+
+def _symbol_filter(symbol: str, repo_url: Optional[str]) -> Filter:
+    # "Class.method" resolves through both keyword indexes; bare names hit `identifier`.
+    parts = symbol.split(".")
+    must = [FieldCondition(key="identifier", match=MatchValue(value=parts[-1]))]
+    if len(parts) > 1:
+        must.append(FieldCondition(key="class_name", match=MatchValue(value=parts[-2])))
+    if repo_url:
+        must.append(FieldCondition(key="repo_url", match=MatchValue(value=repo_url)))
+    return Filter(must=must)
+
+
+def locate_symbol_for_agent(
+    symbol: str, repo_url: Optional[str], limit: int = LOCATE_LIMIT, exact_only: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Chunks defining `symbol`, from the identifier/class_name indexes. Unless
+    `exact_only`, falls back to definition-looking lines in the grep index.
+    """
+    client = get_qdrant_client()
+    points, _ = client.scroll(
         collection_name=get_collection_name(),
-        query=embed_text(query),
-        limit=top_k,
-        query_filter=_repo_filter(repo_url),
+        scroll_filter=_symbol_filter(symbol, repo_url),
+        with_payload=True,
+        with_vectors=False,
+        limit=limit,
     )
-    return [_normalize_chunk(point) for point in result.points]
+    if points or exact_only:
+        return [_normalize_chunk(point) for point in points]
+
+    # Constants and other assignments are not chunk identifiers; fall back to
+    # the exact-match index for definition-looking lines.
+    name = re.escape(symbol.split(".")[-1])
+    matches = grep_for_agent(
+        pattern=rf"\b{name}\s*(?::|=(?!=))|\b(?:def|class|function)\s+{name}\b",
+        repo_url=repo_url,
+        regex=True,
+        max_results=limit,
+    )
+    return [
+        {
+            "chunk_id": m["chunk_id"] or f"grep:{m['file_path']}:{m['line']}",
+            "file_path": m["file_path"],
+            "content": m["text"],
+            "code_type": None,
+            "start_line": m["line"],
+            "end_line": m["line"],
+            "symbols": [symbol],
+        }
+        for m in matches
+    ]
 
 
 def _build_same_file_filter(
@@ -127,32 +685,57 @@ def _build_same_file_filter(
     return Filter(must=must)
 
 
-def _fetch_points_for_same_files(
-    file_paths: Set[str],
+def _build_adjacent_filter(
+    source_points: Iterable[Any],
     repo_url: Optional[str],
     allowed_chunk_types: Optional[Set[str]] = None,
-) -> List[Any]:
+) -> Optional[Filter]:
+    # One line-range clause per source chunk, served by the integer span indexes.
+    windows = []
+    for sp in source_points:
+        payload = sp.payload or {}
+        # Chunks without a stored span (older or span-less chunkers) have no neighbours to window.
+        if not payload.get("file_path") or payload.get("start_line") is None or payload.get("end_line") is None:
+            continue
+        windows.append(
+            Filter(
+                must=[
+                    FieldCondition(key="file_path", match=MatchValue(value=payload["file_path"])),
+                    FieldCondition(key="start_line", range=Range(lte=payload["end_line"] + ADJACENT_LINE_WINDOW)),
+                    FieldCondition(key="end_line", range=Range(gte=payload["start_line"] - ADJACENT_LINE_WINDOW)),
+                ]
+            )
+        )
 
-    if not file_paths:
-        return []
+    if not windows:
+        return None
 
-    client = get_qdrant_client()
+    must = []
+    if repo_url:
+        must.append(FieldCondition(key="repo_url", match=MatchValue(value=repo_url)))
+    if allowed_chunk_types:
+        must.append(FieldCondition(key="chunk_type", match=MatchAny(any=list(allowed_chunk_types))))
 
-    query_filter = _build_same_file_filter(
-        file_paths=file_paths,
-        repo_url=repo_url,
-        allowed_chunk_types=allowed_chunk_types,
-    )
+    return Filter(must=must or None, should=windows)
 
-    result = client.scroll(
-        collection_name=get_collection_name(),
-        limit=SCROLL_LIMIT,
-        scroll_filter=query_filter,
-        with_payload=True,
-    )
 
-    return result[0]
+def _fetch_adjacent_points(
+    source_points: List[Any],
+    repo_url: Optional[str],
+    allowed_chunk_types: Optional[Set[str]] = None,
+) -> List[Any]:
+    scroll_filter = _build_adjacent_filter(source_points, repo_url, allowed_chunk_types)
+    if scroll_filter is None:
+        return []
 
+    points, _ = get_qdrant_client().scroll(
+        collection_name=get_collection_name(),
+        scroll_filter=scroll_filter,
+        with_payload=CANDIDATE_META_FIELDS,
+        with_vectors=False,
+        limit=MAX_EXPAND_SCAN_POINTS,
+    )
+    return points
 
 
 def _fetch_points_for_same_files(
@@ -189,6 +772,34 @@ def _fetch_points_for_same_files(
     return all_points
 
 
+def _fetch_same_file_candidates(
+    file_paths: Set[str],
+    repo_url: Optional[str],
+    allowed_chunk_types: Optional[Set[str]] = None,
+) -> List[Any]:
+    cache_key = (
+        repo_url,
+        frozenset(file_paths),
+        frozenset(allowed_chunk_types or ()),
+        MAX_EXPAND_SCAN_POINTS,
+    )
+    generation = index_generation(repo_url)
+
+    cached = _candidate_cache.get(cache_key)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+
+    candidates = _fetch_points_for_same_files(
+        file_paths,
+        repo_url,
+        allowed_chunk_types,
+        payload_fields=CANDIDATE_META_FIELDS,
+        max_points=MAX_EXPAND_SCAN_POINTS,
+    )
+    _candidate_cache.set(cache_key, (generation, candidates))
+    return candidates
+
+
 def _prepare_source_meta(source_points: Iterable[Any]) -> SourceMeta:
     entries: List[Dict[str, Any]] = []
     file_paths: Set[str] = set()
@@ -277,42 +888,22 @@ def expand_context_for_agent(
     scope: str,
     max_chunks: int,
 ) -> List[Dict[str, Any]]:
-    client = get_qdrant_client()
-    source_points = client.retrieve(
-        collection_name=get_collection_name(),
-        ids=source_chunk_ids,
-        with_payload=CANDIDATE_META_FIELDS,
-        with_vectors=False,
-    )
+    source_points = _retrieve_points(source_chunk_ids)
     if not source_points:
         return []
 
-    file_paths = {((p.payload or {}).get("file_path")) for p in source_points if (p.payload or {}).get("file_path")}
-    if scope == "same_file":
-        candidates = _fetch_points_for_same_files(file_paths, repo_url)
-    else:
-        candidates = _fetch_points_for_same_files(file_paths, repo_url)
-
     allowed_chunk_types: Set[str] = set()
     for code_type in requested_code_types:
         allowed_chunk_types.update(CODE_TYPE_TO_CHUNK_TYPES.get(code_type, set()))
 
     source_meta = _prepare_source_meta(source_points)
-    if scope == "same_file":
-        candidates = _fetch_points_for_same_files(
-            source_meta.file_paths,
-            repo_url,
-            allowed_chunk_types,
-            payload_fields=CANDIDATE_META_FIELDS,
-            max_points=MAX_EXPAND_SCAN_POINTS,
-        )
+    if scope == "adjacent":
+        candidates = _fetch_adjacent_points(source_points, repo_url, allowed_chunk_types)
     else:
-        candidates = _fetch_points_for_same_files(
+        candidates = _fetch_same_file_candidates(
             source_meta.file_paths,
             repo_url,
             allowed_chunk_types,
-            payload_fields=CANDIDATE_META_FIELDS,
-            max_points=MAX_EXPAND_SCAN_POINTS,
         )
 
     source_ids = {str(p.id) for p in source_points}
@@ -320,31 +911,4 @@ def expand_context_for_agent(
     if not top_ids:
         return []
 
-    top_points = client.retrieve(
-        collection_name=get_collection_name(),
-        ids=top_ids,
-        with_payload=True,
-        with_vectors=False,
-    )
-    by_id = {str(point.id): point for point in top_points}
-    ordered = [by_id[pid] for pid in top_ids if pid in by_id]
-
-    return [_normalize_chunk(point) for point in ordered]
-    source_ids = {str(p.id) for p in source_points}
-    scored: List[Candidate] = []
-    for point in candidates:
-        pid = str(point.id)
-        if pid in source_ids:
-            continue
-
-        p_payload = point.payload or {}
-        if allowed_chunk_types and p_payload.get("chunk_type") not in allowed_chunk_types:
-            continue
-
-        score = _relation_score(source_points, point)
-        if score <= 0:
-            continue
-        scored.append(Candidate(point=point, score=score))
-
-    scored.sort(key=lambda c: c.score, reverse=True)
-    return [_normalize_chunk(c.point) for c in scored[:max_chunks]]
+    return [_normalize_chunk(point) for point in _retrieve_points(top_ids)]
@@ -1,5 +1,55 @@
-from backend.infra.llm import embed_text
+import hashlib
+import os
+
+from backend.config import EMBEDDING_DIM, EMBEDDING_MODEL
+from backend.infra.cache import LRUCache, SQLiteCache, TieredCache, register_cache
+from backend.infra.llm import aembed_text, embed_text
+
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+# Optional SQLite file shared by all workers; unset keeps the cache in-process only.
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+
+
+_embedding_cache = register_cache(
+    "query_embeddings",
+    TieredCache(
+        memory=LRUCache(max_entries=EMBEDDING_CACHE_MAX_ENTRIES),
+        disk=SQLiteCache(EMBEDDING_CACHE_PATH, table="query_embeddings") if EMBEDDING_CACHE_PATH else None,
+    ),
+)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split())
+
+
+def _cache_key(query: str) -> str:
+    digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+    model = f"{EMBEDDING_MODEL}@{EMBEDDING_DIM}" if EMBEDDING_DIM else EMBEDDING_MODEL
+    return f"{model}:{digest}"
 
 
 def embed_query(query: str) -> list:
-    return embed_text(query)
+    """Embeds a search query, reusing earlier embeddings of the same normalized text."""
+    key = _cache_key(query)
+    cached = _embedding_cache.get(key)
+    if cached is not None:
+        return cached
+
+    embedding = embed_text(normalize_query(query))
+    if embedding:
+        _embedding_cache.set(key, embedding)
+    return embedding
+
+
+async def aembed_query(query: str) -> list:
+    """Async twin of `embed_query`, sharing its cache."""
+    key = _cache_key(query)
+    cached = _embedding_cache.get(key)
+    if cached is not None:
+        return cached
+
+    embedding = await aembed_text(normalize_query(query))
+    if embedding:
+        _embedding_cache.set(key, embedding)
+    return embedding
@@ -0,0 +1,34 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from backend.infra.generation import active_index_version
+from backend.infra.trigram_index import load_trigram_index
+
+
+def grep_for_agent(
+    pattern: str,
+    repo_url: Optional[str],
+    regex: bool = False,
+    case_sensitive: bool = True,
+    max_results: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    Exact substring / regex search over indexed chunk content.
+
+    Candidates come from intersecting trigram posting lists and are then
+    verified against the real pattern, so no embedding or LLM call is made.
+    Raises `re.error` for an invalid regex, whether or not the repo is indexed.
+    """
+    if regex:
+        re.compile(pattern)
+
+    index = load_trigram_index(repo_url, active_index_version())
+    if index is None:
+        return []
+
+    return index.search(
+        pattern,
+        regex=regex,
+        case_sensitive=case_sensitive,
+        max_results=max_results,
+    )
@@ -1,22 +1,50 @@
-from backend.infra.db import get_qdrant_client, get_collection_name
+import asyncio
 
+from backend.infra.content_store import fetch_content
+from backend.infra.db import get_async_qdrant_client, get_qdrant_client, get_collection_name, get_search_params
 
-def retrieve(query_embedding, top_k=5):
+
+def _to_chunks(points):
+    chunks = []
+
+    for point in points:
+        payload = point.payload or {}
+        text = payload.get("content")
+        if text is None:
+            text = fetch_content(payload.get("repo_url"), str(point.id), payload.get("index_version"))
+        chunks.append({
+            "text": text,
+            "file_path": payload.get("file_path", "")
+        })
+
+    return chunks
+
+
+def retrieve(query_embedding, top_k=5, query_filter=None):
     client = get_qdrant_client()
     collection_name = get_collection_name()
 
     results = client.query_points(
         collection_name=collection_name,
         query=query_embedding,
-        limit=top_k
+        limit=top_k,
+        query_filter=query_filter,
+        search_params=get_search_params(),
     )
 
-    chunks = []
+    return _to_chunks(results.points)
 
-    for point in results.points:
-        chunks.append({
-            "text": point.payload.get("content", ""),
-            "file_path": point.payload.get("file_path", "")
-        })
 
-    return chunks
+async def aretrieve(query_embedding, top_k=5, query_filter=None):
+    client = get_async_qdrant_client()
+
+    results = await client.query_points(
+        collection_name=get_collection_name(),
+        query=query_embedding,
+        limit=top_k,
+        query_filter=query_filter,
+        search_params=get_search_params(),
+    )
+
+    # Bodies of slim payloads are disk reads from the content store.
+    return await asyncio.to_thread(_to_chunks, results.points)
@@ -0,0 +1,87 @@
+"""
+Ingest wall time with and without the bulk-load profile.
+
+Runs `process_repository` over a local checkout twice, once with
+QDRANT_BULK_LOAD=false (HNSW built incrementally during upserts) and once
+with QDRANT_BULK_LOAD=true (indexing deferred, restored at the end), each
+into a fresh scratch collection. Reports the time spent writing and the
+total time until the collection is green.
+
+Embeddings are deterministic hash-seeded vectors by default so the numbers
+isolate Qdrant write cost; pass --real-embeddings to go through Ollama.
+
+Needs a running Qdrant (QDRANT_HOST / QDRANT_PORT).
+
+Usage:
+    python -m benchmarks.bench_bulk_load [repo_path] [--dim 768] [--repeat 3]
+"""
+import argparse
+import hashlib
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import backend.infra.db as db
+import backend.infra.storage as storage
+import backend.tasks.ingest.embedding.dispatcher as dispatcher
+
+COLLECTION = "bench_bulk_load"
+
+
+def hashed_embedding(dim):
+    def embed(text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).normal(size=dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    return embed
+
+
+def run_once(repo_path, bulk):
+    client = db.get_qdrant_client()
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+
+    os.environ["QDRANT_BULK_LOAD"] = "true" if bulk else "false"
+    started = time.perf_counter()
+    dispatcher.process_repository(repo_path, repo_url="bench://bulk-load")
+    written = time.perf_counter() - started
+
+    # Without bulk mode the optimizer may still be catching up; count that too.
+    db.wait_for_green(COLLECTION)
+    return written, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("repo_path", nargs="?", default=str(Path(__file__).resolve().parents[1]))
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--real-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["QDRANT_COLLECTION_NAME"] = COLLECTION
+    if not args.real_embeddings:
+        dispatcher.embed_text = hashed_embedding(args.dim)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.INDEX_DATA_DIR = Path(tmp)
+        print(f"repo={args.repo_path} batch={dispatcher.INSERT_BATCH_SIZE} repeat={args.repeat}")
+        print(f"{'mode':<12}{'write s':>10}{'to green s':>12}")
+        for bulk in (False, True):
+            runs = [run_once(Path(args.repo_path), bulk) for _ in range(args.repeat)]
+            label = "bulk" if bulk else "incremental"
+            print(
+                f"{label:<12}{statistics.median(r[0] for r in runs):>10.2f}"
+                f"{statistics.median(r[1] for r in runs):>12.2f}"
+            )
+
+    db.get_qdrant_client().delete_collection(COLLECTION)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Groq key pool vs the previous round-robin failover under concurrent load.
+
+Starts a local stub of the Groq chat completions endpoint that enforces a
+per-key request bucket (`--rpm` requests per `--window` seconds), sends the
+`x-ratelimit-*` headers Groq sends, and answers over-limit calls with 429 +
+retry-after. Then `--workers` threads each make `--calls` completions,
+once through the old failover loop (try each key once, give up) and once
+through `GroqPool`. Reports throughput, failed calls and 429s served.
+
+Both clients run with SDK retries disabled so every 429 is visible.
+
+Usage:
+    python -m benchmarks.bench_groq_pool [--keys 2] [--rpm 20] [--window 2] [--workers 16] [--calls 10]
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from groq import Groq
+
+from backend.infra.groq_pool import GroqPool, is_rate_limited_error
+
+MODEL = "stub-model"
+
+
+class StubLimits:
+    def __init__(self, rpm, window, latency):
+        self.capacity = rpm
+        self.rate = rpm / window
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.served = 0
+        self.rejected = 0
+
+    def take(self, key):
+        """Returns (allowed, remaining, seconds until full, retry-after)."""
+        with self.lock:
+            now = time.monotonic()
+            level, updated = self.buckets.get(key, (self.capacity, now))
+            level = min(self.capacity, level + (now - updated) * self.rate)
+            allowed = level >= 1
+            if allowed:
+                level -= 1
+                self.served += 1
+            else:
+                self.rejected += 1
+            self.buckets[key] = (level, now)
+            return allowed, int(level), (self.capacity - level) / self.rate, (1 - level) / self.rate
+
+
+def make_handler(limits):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("content-length") or 0))
+            key = self.headers.get("authorization", "")
+            allowed, remaining, reset, retry_after = limits.take(key)
+            headers = {
+                "x-ratelimit-limit-requests": str(limits.capacity),
+                "x-ratelimit-remaining-requests": str(remaining),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s",
+            }
+            if not allowed:
+                headers["retry-after"] = f"{retry_after:.3f}"
+                self._reply(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}}, headers)
+                return
+
+            time.sleep(limits.latency)
+            body = {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": MODEL,
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}
+                ],
+            }
+            self._reply(200, body, headers)
+
+        def _reply(self, status, body, headers):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def failover_chat(clients, state, prompt):
+    """The previous `_chat_with_groq_failover`: round-robin start, next key on 429, else fail."""
+    errors = []
+    for attempt in range(len(clients)):
+        idx = (state["start"] + attempt) % len(clients)
+        try:
+            response = clients[idx].chat.completions.create(
+                model=MODEL, messages=[{"role": "user", "content": prompt}], max_tokens=16
+            )
+            state["start"] = (idx + 1) % len(clients)
+            return response.choices[0].message.content
+        except Exception as exc:
+            errors.append(exc)
+            if is_rate_limited_error(exc):
+                continue
+            raise
+    raise RuntimeError(f"All Groq keys exhausted/failed: {len(errors)}")
+
+
+def run(label, call, limits, workers, calls):
+    limits.rejected = 0
+    limits.served = 0
+    limits.buckets.clear()
+    failed = 0
+    lock = threading.Lock()
+
+    def worker(i):
+        nonlocal failed
+        for j in range(calls):
+            try:
+                call(f"question {i}-{j}")
+            except Exception:
+                with lock:
+                    failed += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(worker, range(workers)))
+    elapsed = time.perf_counter() - started
+
+    ok = workers * calls - failed
+    print(f"{label:<10}{ok:>6}{failed:>8}{limits.rejected:>7}{elapsed:>9.2f}{ok / elapsed:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=2)
+    parser.add_argument("--rpm", type=int, default=20, help="requests per key per window")
+    parser.add_argument("--window", type=float, default=2.0, help="seconds")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub response time in seconds")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--queue-timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    limits = StubLimits(args.rpm, args.window, args.latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(limits))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    keys = [f"stub-key-{i}" for i in range(args.keys)]
+
+    def client(key):
+        return Groq(api_key=key, base_url=base_url, max_retries=0)
+
+    print(
+        f"keys={args.keys} limit={args.rpm}/{args.window:g}s per key "
+        f"workers={args.workers} calls/worker={args.calls}"
+    )
+    print(f"{'mode':<10}{'ok':>6}{'failed':>8}{'429s':>7}{'wall s':>9}{'ok/s':>10}")
+
+    clients = [client(key) for key in keys]
+    state = {"start": 0}
+    run("failover", lambda prompt: failover_chat(clients, state, prompt), limits, args.workers, args.calls)
+
+    pool = GroqPool(keys, client_factory=client, queue_timeout_s=args.queue_timeout)
+    run("pool", lambda prompt: pool.complete(MODEL, prompt, 16), limits, args.workers, args.calls)
+    stats = pool.stats()
+    print(f"pool queued={stats['queued']} queue_wait_s={stats['queue_wait_s']} rejected={stats['rejected']}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
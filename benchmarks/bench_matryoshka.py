@@ -0,0 +1,92 @@
+"""
+Recall@k, index memory and query latency of Matryoshka-truncated embeddings.
+
+Embeds the chunks of a local checkout once at full width through Ollama,
+then for each target dimension truncates + renormalizes (the same
+`truncate_embedding` used by `embed_text`) and runs exact search. Recall is
+measured against full-width exact search.
+
+Queries are the first line of a sample of chunks (signatures, headings),
+which resembles the short symbol-ish questions the agent retrieves for.
+
+Needs a running Ollama with the embedding model pulled.
+
+Usage:
+    python -m benchmarks.bench_matryoshka [repo_path] [--dims 128,256,384,512,768] [--queries 100] [--k 10]
+"""
+import argparse
+import random
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.config import EMBEDDING_MODEL
+from backend.infra.llm import truncate_embedding
+from benchmarks.bench_payload_size import collect_chunks
+
+import ollama
+
+
+def embed_full(texts):
+    return np.array(
+        [ollama.embeddings(model=EMBEDDING_MODEL, prompt=text)["embedding"] for text in texts],
+        dtype=np.float32,
+    )
+
+
+def truncate_all(matrix, dim):
+    truncated = np.array([truncate_embedding(row.tolist(), dim) for row in matrix], dtype=np.float32)
+    # Full-width rows come back untouched; normalize everything so scores are cosine.
+    return truncated / np.linalg.norm(truncated, axis=1, keepdims=True)
+
+
+def top_k(index, queries, k):
+    ids, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        scores = index @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        latencies.append((time.perf_counter() - started) * 1000)
+        ids.append(set(top.tolist()))
+    return ids, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("repo_path", nargs="?", default=str(Path(__file__).resolve().parents[1]))
+    parser.add_argument("--dims", default="128,256,384,512,768")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    chunks = [c for c in collect_chunks(Path(args.repo_path)) if (c.get("content") or "").strip()]
+    sample = random.Random(7).sample(chunks, min(args.queries, len(chunks)))
+    query_texts = [c["content"].strip().splitlines()[0] for c in sample]
+
+    print(f"embedding {len(chunks)} chunks and {len(query_texts)} queries with {EMBEDDING_MODEL} ...")
+    full_index = embed_full([c["content"] for c in chunks])
+    full_queries = embed_full(query_texts)
+    full_dim = full_index.shape[1]
+
+    truth, _ = top_k(truncate_all(full_index, full_dim), truncate_all(full_queries, full_dim), args.k)
+
+    print(f"chunks={len(chunks)} full_dim={full_dim} k={args.k}")
+    print(f"{'dim':>6}{'recall@k':>10}{'index MB':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for dim in sorted(int(d) for d in args.dims.split(",")):
+        if dim > full_dim:
+            continue
+        index = truncate_all(full_index, dim)
+        queries = truncate_all(full_queries, dim)
+        found, latencies = top_k(index, queries, args.k)
+        recall = statistics.mean(len(f & t) / args.k for f, t in zip(found, truth))
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        print(
+            f"{dim:>6}{recall:>10.3f}{index.nbytes / (1024 * 1024):>10.2f}"
+            f"{statistics.median(latencies):>9.3f}{p95:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
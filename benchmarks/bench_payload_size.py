@@ -0,0 +1,100 @@
+"""
+Payload footprint before/after moving chunk bodies into the content store.
+
+Chunks a local checkout (no embeddings or Qdrant needed) and reports:
+  - payload bytes per point, with and without `content`
+  - estimated Qdrant memory per point (payload + float32 vector)
+  - scroll payload bytes for the largest file (the `_fetch_points_for_same_files` pattern)
+  - content store bytes on disk vs raw chunk bodies
+
+Usage:
+    python -m benchmarks.bench_payload_size [repo_path] [--dim 768]
+"""
+import argparse
+import json
+import tempfile
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import backend.infra.storage as storage
+from backend.infra.content_store import ContentStoreWriter
+from backend.tasks.ingest.embedding.blind_chunker import extract_chunks as fallback_extract
+from backend.tasks.ingest.embedding.dispatcher import load_language_modules
+from backend.tasks.ingest.vector_store.qdrant_store import build_payload
+
+IGNORED_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", ".pytest_cache", "dist", "build"}
+
+
+def collect_chunks(repo_path: Path):
+    modules = load_language_modules()
+    by_ext = {ext.lower(): m for m in modules for ext in m.SUPPORTED_EXTENSIONS}
+    chunks = []
+
+    for file_path in repo_path.rglob("*"):
+        if not file_path.is_file() or any(part in IGNORED_DIRS for part in file_path.parts):
+            continue
+        module = by_ext.get(file_path.suffix.lower())
+        extracted = module.extract_chunks(file_path) if module else fallback_extract(file_path)
+        for idx, chunk in enumerate(extracted):
+            chunk["file_path"] = str(file_path.relative_to(repo_path))
+            chunk["chunk_number"] = idx
+            chunk["repo_url"] = "bench://repo"
+            chunk["id"] = str(uuid.uuid4())
+            chunks.append(chunk)
+
+    return chunks
+
+
+def _bytes(payload) -> int:
+    return len(json.dumps(payload).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("repo_path", nargs="?", default=str(Path(__file__).resolve().parents[1]))
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    chunks = collect_chunks(Path(args.repo_path))
+    if not chunks:
+        print("no chunks found")
+        return
+
+    slim = [build_payload(c) for c in chunks]
+    full = [{**p, "content": c.get("content")} for p, c in zip(slim, chunks)]
+    vector_bytes = args.dim * 4
+
+    by_file = defaultdict(list)
+    for payload in full:
+        by_file[payload["file_path"]].append(payload)
+    largest = max(by_file, key=lambda f: len(by_file[f]))
+    slim_by_file = [p for p in slim if p["file_path"] == largest]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.INDEX_DATA_DIR = Path(tmp)
+        writer = ContentStoreWriter("bench://repo")
+        for chunk in chunks:
+            writer.put(chunk["id"], chunk.get("content"))
+        writer.close()
+        stored, raw = writer.stored_bytes, writer.raw_bytes
+
+    n = len(chunks)
+    full_total = sum(_bytes(p) for p in full)
+    slim_total = sum(_bytes(p) for p in slim)
+
+    print(f"chunks: {n}")
+    print(f"payload bytes/point      before={full_total / n:10.1f}  after={slim_total / n:10.1f}")
+    print(
+        f"qdrant bytes/point (est) before={(full_total / n) + vector_bytes:10.1f}"
+        f"  after={(slim_total / n) + vector_bytes:10.1f}  (vector={vector_bytes})"
+    )
+    print(
+        f"scroll payload bytes     before={sum(_bytes(p) for p in by_file[largest]):10d}"
+        f"  after={sum(_bytes(p) for p in slim_by_file):10d}  ({largest}, {len(slim_by_file)} points)"
+    )
+    print(f"content store bytes      raw={raw:10d}  compressed={stored:10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Recall / latency / memory trade-offs of the Qdrant storage options in `create_collection`.
+
+Loads the same synthetic clustered vectors into one collection per
+configuration (using the same env knobs as `backend.infra.db`) and reports:
+  - recall@k against exact float32 search
+  - p50 / p95 query latency
+  - estimated resident vector memory (original + quantized vectors)
+
+Needs a running Qdrant (QDRANT_HOST / QDRANT_PORT). Collections are
+prefixed `bench_quant_` and dropped afterwards.
+
+Usage:
+    python -m benchmarks.bench_quantization [--points 20000] [--dim 768] [--queries 200] [--ef 128] [--oversampling 2.0]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+from qdrant_client.models import PointStruct, SearchParams
+
+import backend.infra.db as db
+
+CONFIGS = {
+    "float32": {},
+    "float16": {"QDRANT_VECTOR_DATATYPE": "float16"},
+    "scalar": {"QDRANT_QUANTIZATION": "scalar"},
+    "scalar_on_disk": {"QDRANT_QUANTIZATION": "scalar", "QDRANT_VECTORS_ON_DISK": "true"},
+    "binary": {"QDRANT_QUANTIZATION": "binary"},
+    "binary_on_disk": {"QDRANT_QUANTIZATION": "binary", "QDRANT_VECTORS_ON_DISK": "true"},
+}
+ENV_KEYS = {key for env in CONFIGS.values() for key in env}
+
+
+def make_vectors(n, dim, clusters=64, seed=7):
+    # Clustered data is closer to code embeddings than uniform noise.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, n)] + 0.35 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def resident_bytes(n, dim, env):
+    datatype_bytes = 2 if env.get("QDRANT_VECTOR_DATATYPE") == "float16" else 4
+    quantization = env.get("QDRANT_QUANTIZATION", "none")
+    quantized = {"scalar": n * dim, "binary": n * dim // 8}.get(quantization, 0)
+    originals = 0 if env.get("QDRANT_VECTORS_ON_DISK") == "true" else n * dim * datatype_bytes
+    return originals + quantized
+
+
+def wait_green(client, name, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if client.get_collection(name).status.value == "green":
+            return
+        time.sleep(0.5)
+
+
+def load(client, name, vectors, env, batch=512):
+    previous = {key: os.environ.pop(key, None) for key in ENV_KEYS}
+    os.environ.update(env)
+    try:
+        if client.collection_exists(name):
+            client.delete_collection(name)
+        client.create_collection(
+            collection_name=name,
+            vectors_config=db._vectors_config(vectors.shape[1]),
+            hnsw_config=db._hnsw_config(),
+            quantization_config=db._quantization_config(),
+        )
+    finally:
+        for key, value in previous.items():
+            os.environ.pop(key, None)
+            if value is not None:
+                os.environ[key] = value
+
+    for start in range(0, len(vectors), batch):
+        client.upsert(
+            collection_name=name,
+            points=[
+                PointStruct(id=start + i, vector=vec.tolist())
+                for i, vec in enumerate(vectors[start:start + batch])
+            ],
+        )
+    wait_green(client, name)
+
+
+def run_queries(client, name, queries, k, params):
+    ids, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        result = client.query_points(collection_name=name, query=query.tolist(), limit=k, search_params=params)
+        latencies.append((time.perf_counter() - started) * 1000)
+        ids.append({p.id for p in result.points})
+    return ids, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", type=int, default=None)
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--keep", action="store_true", help="keep benchmark collections")
+    args = parser.parse_args()
+
+    client = db.get_qdrant_client()
+    vectors = make_vectors(args.points, args.dim)
+    queries = make_vectors(args.queries, args.dim, seed=11)
+
+    print(f"points={args.points} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'config':<16}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'vector MB':>12}")
+
+    truth = None
+    for label, env in CONFIGS.items():
+        name = f"bench_quant_{label}"
+        load(client, name, vectors, env)
+
+        if truth is None:
+            truth, _ = run_queries(client, name, queries, args.k, SearchParams(exact=True))
+
+        quantized = env.get("QDRANT_QUANTIZATION", "none") != "none"
+        params = SearchParams(
+            hnsw_ef=args.ef,
+            quantization=db.QuantizationSearchParams(rescore=True, oversampling=args.oversampling)
+            if quantized
+            else None,
+        )
+        found, latencies = run_queries(client, name, queries, args.k, params)
+        recall = statistics.mean(len(f & t) / args.k for f, t in zip(found, truth))
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        mb = resident_bytes(args.points, args.dim, env) / (1024 * 1024)
+        print(f"{label:<16}{recall:>10.3f}{statistics.median(latencies):>10.2f}{p95:>10.2f}{mb:>12.1f}")
+
+        if not args.keep:
+            client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Two-stage (file -> chunk) retrieval vs single-stage chunk search.
+
+Runs against an already ingested index (ingest with file vectors enabled,
+the default). Queries are identifiers / first lines of a random sample of
+indexed chunks. For each query it measures:
+  - single-stage `retrieve_chunks_for_agent` latency and recall@k
+  - two-stage latency and recall@k
+Recall is against exact (brute-force) chunk search. Query embeddings are
+computed up front so latencies cover search only.
+
+Works with either backend (VECTOR_BACKEND); embeddings need Ollama.
+
+Usage:
+    python -m benchmarks.bench_two_stage --repo-url URL [--queries 100] [--k 10] [--top-files 20]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from qdrant_client.models import SearchParams
+
+import backend.tasks.query.rag.agent_rag as agent_rag
+from backend.infra.cache import LRUCache
+from backend.infra.content_store import fetch_content
+from backend.infra.db import get_collection_name, get_qdrant_client
+from backend.infra.llm import embed_text
+
+
+def sample_queries(repo_url, n):
+    points, offset = [], None
+    while True:
+        page, offset = get_qdrant_client().scroll(
+            collection_name=get_collection_name(),
+            scroll_filter=agent_rag._repo_filter(repo_url),
+            with_payload=True,
+            limit=1024,
+            offset=offset,
+        )
+        points.extend(page)
+        if offset is None:
+            break
+
+    queries = []
+    for point in random.Random(7).sample(points, min(n, len(points))):
+        payload = point.payload or {}
+        text = payload.get("identifier")
+        if not text:
+            body = payload.get("content") or fetch_content(repo_url, str(point.id), payload.get("index_version"))
+            lines = body.strip().splitlines()
+            text = lines[0] if lines else ""
+        if text.strip():
+            queries.append(text.strip())
+    return queries, len(points)
+
+
+def run(queries, repo_url, k, two_stage):
+    ids, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        chunks = agent_rag.retrieve_chunks_for_agent(query, top_k=k, repo_url=repo_url, two_stage=two_stage)
+        latencies.append((time.perf_counter() - started) * 1000)
+        ids.append({c["chunk_id"] for c in chunks})
+    return ids, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repo-url", required=True)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--top-files", type=int, default=20)
+    args = parser.parse_args()
+
+    queries, total = sample_queries(args.repo_url, args.queries)
+    vectors = {q: embed_text(q) for q in queries}
+
+    agent_rag.embed_query = lambda query: vectors[query]
+    agent_rag._retrieval_cache = LRUCache(max_entries=0)
+    agent_rag.TWO_STAGE_TOP_FILES = args.top_files
+
+    truth = []
+    for query in queries:
+        result = get_qdrant_client().query_points(
+            collection_name=get_collection_name(),
+            query=vectors[query],
+            limit=args.k,
+            query_filter=agent_rag._repo_filter(args.repo_url),
+            search_params=SearchParams(exact=True),
+        )
+        truth.append({str(p.id) for p in result.points})
+
+    print(f"chunks={total} queries={len(queries)} k={args.k} top_files={args.top_files}")
+    print(f"{'mode':<14}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for label, two_stage in (("single-stage", False), ("two-stage", True)):
+        found, latencies = run(queries, args.repo_url, args.k, two_stage)
+        recall = statistics.mean(len(f & t) / max(len(t), 1) for f, t in zip(found, truth))
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        print(f"{label:<14}{recall:>10.3f}{statistics.median(latencies):>10.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ import React, { useState } from "react";
 import Landing from "./components/Landing";
 import Chat from "./components/Chat";
 
-import { apiGet, apiPost, apiAgentQuery } from "./services/api";
+import { apiGet, apiPost, apiStream } from "./services/api";
 
 import "./styles/main.css";
 
@@ -108,43 +108,47 @@ function App() {
 
     setQuestion("");
 
+    // The bot reply is appended empty and filled in as tokens stream in.
+    setMessages(prev => [
+      ...prev,
+      { text: "", sender: "bot" }
+    ]);
+
+    const setReply = (update) => {
+      setMessages(prev => [
+        ...prev.slice(0, -1),
+        { ...prev[prev.length - 1], text: update(prev[prev.length - 1].text) }
+      ]);
+    };
+
+    const onEvent = (event, data) => {
+      if (event === "session" && data.session_id) {
+        setAgentSessionId(data.session_id);
+      }
+      if (event === "token") {
+        setReply(text => text + data.text);
+      }
+      if (event === "done") {
+        setReply(() => data.answer);
+      }
+    };
+
     try {
 
       if (useAgent) {
-        const data = await apiAgentQuery(repoUrl, currentQuestion, agentSessionId);
-        if (data.session_id) {
-          setAgentSessionId(data.session_id);
-        }
-
-        setMessages(prev => [
-          ...prev,
-          {
-            text: data.answer,
-            sender: "bot"
-          }
-        ]);
-
+        await apiStream(
+          "/agent/query/stream",
+          { repo_url: repoUrl, question: currentQuestion, session_id: agentSessionId },
+          onEvent
+        );
         return;
       }
 
-      const data = await apiPost("/query", {
-        question: currentQuestion
-      });
-
-      setMessages(prev => [
-        ...prev,
-        { text: data.answer, sender: "bot" }
-      ]);
+      await apiStream("/query/stream", { question: currentQuestion }, onEvent);
 
     } catch {
 
-      setMessages(prev => [
-        ...prev,
-        {
-          text: "Server error",
-          sender: "bot"
-        }
-      ]);
+      setReply(() => "Server error");
     }
   };
 
@@ -36,3 +36,41 @@ export const apiAgentQuery = async (repo_url, question, session_id) => {
 
   return res.json();
 };
+
+
+// POSTs to a server-sent-events endpoint and calls onEvent(event, data) per event.
+export const apiStream = async (url, body, onEvent) => {
+  const res = await fetch(`${API}${url}`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json"
+    },
+    body: JSON.stringify(body)
+  });
+
+  if (!res.ok || !res.body) throw new Error();
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const blocks = buffer.split("\n\n");
+    buffer = blocks.pop();
+
+    for (const block of blocks) {
+      let event = "message";
+      let data = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      if (event === "error") throw new Error(data);
+      onEvent(event, data ? JSON.parse(data) : null);
+    }
+  }
+};
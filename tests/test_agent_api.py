@@ -1,19 +1,25 @@
+import json
+
 from fastapi.testclient import TestClient
 
 import backend.main as main
+from AI_Agent.memory.store import memory
+from AI_Agent.schemas.chunk import Chunk
 
 
 client = TestClient(main.app)
 
 
 def test_agent_query_endpoint(monkeypatch):
-    def fake_run_agent(user_query: str, repo_url: str, session_id=None):
+    async def fake_arun_agent(user_query: str, repo_url: str, session_id=None, deadline_ms=None):
+        assert deadline_ms == 5000
         return {
             "session_id": session_id or "sess-1",
             "explanation": f"agent answer for {user_query} @ {repo_url}",
+            "skipped_stages": ["expansion"],
         }
 
-    monkeypatch.setattr(main, "run_agent", fake_run_agent)
+    monkeypatch.setattr(main, "arun_agent", fake_arun_agent)
 
     response = client.post(
         "/agent/query",
@@ -21,6 +27,7 @@ def test_agent_query_endpoint(monkeypatch):
             "repo_url": "https://github.com/example/repo",
             "question": "what does this do?",
             "session_id": "abc123",
+            "deadline_ms": 5000,
         },
     )
 
@@ -28,3 +35,41 @@ def test_agent_query_endpoint(monkeypatch):
     payload = response.json()
     assert payload["session_id"] == "abc123"
     assert "agent answer" in payload["answer"]
+    assert payload["skipped_stages"] == ["expansion"]
+
+
+def _sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_agent_query_stream_emits_stages_then_tokens(monkeypatch):
+    async def fake_retrieve(**kwargs):
+        return [Chunk(chunk_id="c1", file_path="a.py", content="def a(): pass", code_type="py:function",
+                      start_line=1, end_line=1, symbols=["a"])]
+
+    async def fake_astream_chat(prompt, max_tokens=300):
+        for delta in ("Streams ", "an ", "answer."):
+            yield delta
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.retrieval.rag.aretrieve_chunks", fake_retrieve)
+    monkeypatch.setattr("AI_Agent.graph.nodes.expansion.rag.expand_context", lambda **kwargs: [])
+    monkeypatch.setattr("AI_Agent.graph.nodes.reasoning.astream_chat", fake_astream_chat)
+
+    response = client.post(
+        "/agent/query/stream",
+        json={"repo_url": "https://github.com/example/repo", "question": "Explain a", "session_id": "stream-1"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(response.text)
+    assert [name for name, _ in events] == [
+        "session", "intent", "retrieval", "expansion", "token", "token", "token", "done",
+    ]
+    assert events[2][1] == {"chunk_ids": ["c1"]}
+    assert events[-1][1] == {"session_id": "stream-1", "answer": "Streams an answer.", "skipped_stages": []}
+    assert memory.get_history("stream-1")[-1]["response"] == "Streams an answer."
@@ -0,0 +1,154 @@
+from types import SimpleNamespace
+
+import backend.tasks.query.rag.agent_rag as agent_rag
+from AI_Agent.graph.graph import OrchestratorGraph
+from AI_Agent.graph.nodes.intent import _heuristic_intent, extract_locate_symbol, parse_locate_query
+from AI_Agent.schemas.chunk import Chunk
+from AI_Agent.schemas.intent import Intent
+
+
+def _state(query: str):
+    return {
+        "user_query": query,
+        "repo_url": "https://github.com/example/repo",
+        "session_id": "s-locate",
+        "chat_history": [],
+        "intent": None,
+        "plan": None,
+        "retrieved_chunks": [],
+        "expanded_chunks": [],
+        "file_chunks": [],
+        "explanation": None,
+        "proposed_diff_id": None,
+        "approved": False,
+    }
+
+
+def test_heuristic_detects_locate_questions():
+    assert _heuristic_intent("where is `MAX_EXPAND_SCAN_POINTS` set") == Intent.LOCATE
+    assert _heuristic_intent("Which file defines embed_text?") == Intent.LOCATE
+    assert _heuristic_intent("where is `update_state` defined") == Intent.LOCATE
+    assert _heuristic_intent("where should I add retries?") == Intent.MODIFY
+    assert _heuristic_intent("What does this repository do?") == Intent.EXPLAIN
+
+
+def test_heuristic_matches_change_hints_on_whole_words():
+    # Words that merely contain a hint ("add", "edit", "fix") are not change requests.
+    assert _heuristic_intent("where is the address parsed") == Intent.LOCATE
+    assert _heuristic_intent("how does the editor plugin load files?") == Intent.EXPLAIN
+    assert _heuristic_intent("what fixture sets up the database?") == Intent.EXPLAIN
+    assert _heuristic_intent("why does the debugger stop here?") == Intent.EXPLAIN
+
+    assert _heuristic_intent("fix the crash in the address parser") == Intent.DEBUG
+    assert _heuristic_intent("start refactoring the loader into two modules") == Intent.REFACTOR
+    assert _heuristic_intent("added a cache, now update the docs") == Intent.MODIFY
+
+
+def test_unclear_queries_are_left_to_the_llm_classifier(monkeypatch):
+    from AI_Agent.graph.nodes.intent import intent_node
+
+    prompts = []
+
+    def fake_chat(prompt, max_tokens):
+        prompts.append(prompt)
+        return "Analyze"
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.intent.chat", fake_chat)
+
+    assert _heuristic_intent("the fixture data in conftest looks odd") is None
+    assert intent_node(_state("the fixture data in conftest looks odd"))["intent"] == Intent.ANALYZE
+    assert len(prompts) == 1
+
+
+def test_extract_locate_symbol():
+    assert extract_locate_symbol("where is `MAX_EXPAND_SCAN_POINTS` set") == "MAX_EXPAND_SCAN_POINTS"
+    assert extract_locate_symbol("where is the class RAGClient defined?") == "RAGClient"
+    assert extract_locate_symbol("definition of AgentMemory.add_turn") == "AgentMemory.add_turn"
+    assert extract_locate_symbol("where is it?") is None
+
+
+def test_locate_fast_path_skips_retrieval_and_llm(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("full pipeline should not run for a resolved Locate query")
+
+    monkeypatch.setattr("AI_Agent.graph.graph.retrieval_node", fail)
+    monkeypatch.setattr("AI_Agent.graph.graph.reasoning_node", fail)
+    monkeypatch.setattr(
+        "AI_Agent.graph.nodes.locate.rag.locate_symbol",
+        lambda symbol, repo_url, exact_only: [
+            Chunk(
+                chunk_id="1",
+                file_path="backend/infra/llm.py",
+                content="def embed_text(text): ...",
+                code_type="py:function",
+                start_line=14,
+                end_line=19,
+                symbols=["embed_text"],
+            )
+        ],
+    )
+
+    result = OrchestratorGraph().invoke(_state("where is `embed_text` defined?"))
+
+    assert result["intent"] == Intent.LOCATE
+    assert "backend/infra/llm.py:14-19" in result["explanation"]
+
+
+def test_locate_symbol_falls_back_to_exact_match_index(monkeypatch):
+    fake_client = SimpleNamespace(scroll=lambda **kwargs: ([], None))
+    monkeypatch.setattr(agent_rag, "get_qdrant_client", lambda: fake_client)
+    monkeypatch.setattr(
+        agent_rag,
+        "grep_for_agent",
+        lambda pattern, repo_url, regex, max_results: [
+            {"chunk_id": "7", "file_path": "rag.py", "line": 3, "text": "MAX_SCAN = 10"}
+        ],
+    )
+
+    chunks = agent_rag.locate_symbol_for_agent("MAX_SCAN", repo_url="https://github.com/example/repo")
+
+    assert chunks[0]["file_path"] == "rag.py"
+    assert chunks[0]["start_line"] == 3
+
+
+def test_plain_words_are_not_confident_locate_symbols():
+    assert parse_locate_query("where is user data stored") == ("user", False)
+    assert parse_locate_query("where are the tests") == ("tests", False)
+    assert parse_locate_query("find all usages of embed_text") == ("all", False)
+    assert parse_locate_query("What is the definition of done here?") == ("done", False)
+    assert parse_locate_query("where is the config loaded?") == ("config", False)
+
+    assert parse_locate_query("where is `config` loaded?") == ("config", True)
+    assert parse_locate_query("where is MAX_EXPAND_SCAN_POINTS set") == ("MAX_EXPAND_SCAN_POINTS", True)
+    assert parse_locate_query("where is the class RAGClient defined?") == ("RAGClient", True)
+    assert parse_locate_query("definition of AgentMemory.add_turn") == ("AgentMemory.add_turn", True)
+
+
+def test_plain_word_without_index_hit_falls_through_to_full_pipeline(monkeypatch):
+    lookups = []
+    grep_calls = []
+    fake_client = SimpleNamespace(scroll=lambda **kwargs: ([], None))
+    monkeypatch.setattr(agent_rag, "get_qdrant_client", lambda: fake_client)
+    monkeypatch.setattr(agent_rag, "grep_for_agent", lambda **kwargs: grep_calls.append(kwargs) or [
+        {"chunk_id": "7", "file_path": "settings.py", "line": 3, "text": "config = load()"}
+    ])
+
+    def locate(symbol, repo_url, exact_only):
+        lookups.append((symbol, exact_only))
+        return [Chunk(**c) for c in agent_rag.locate_symbol_for_agent(symbol, repo_url, exact_only=exact_only)]
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.locate.rag.locate_symbol", locate)
+    monkeypatch.setattr("AI_Agent.graph.graph.retrieval_node", lambda state: state)
+    monkeypatch.setattr("AI_Agent.graph.graph.expansion_node", lambda state: state)
+
+    def reasoning(state):
+        state["explanation"] = "The config is loaded in settings.load()."
+        return state
+
+    monkeypatch.setattr("AI_Agent.graph.graph.reasoning_node", reasoning)
+
+    result = OrchestratorGraph().invoke(_state("where is the config loaded?"))
+
+    assert lookups == [("config", True)]
+    assert grep_calls == []
+    assert result["explanation"] == "The config is loaded in settings.load()."
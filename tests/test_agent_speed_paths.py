@@ -1,5 +1,12 @@
+import asyncio
+import time
+
+import pytest
+
 from AI_Agent.graph.nodes.intent import intent_node
 from AI_Agent.graph.nodes.planner import planner_node
+from AI_Agent.graph.graph import build_graph
+from AI_Agent.schemas.chunk import Chunk
 from AI_Agent.schemas.intent import Intent
 
 
@@ -45,3 +52,251 @@ def test_planner_node_uses_static_plan_for_explain_without_llm(monkeypatch):
     assert result["plan"].intent == Intent.EXPLAIN.value
     assert result["plan"].requires_expansion is True
     assert result["plan"].requires_full_file is False
+
+
+def test_sync_invoke_inside_running_loop_fails_clearly():
+    async def call_sync_from_loop():
+        return build_graph().invoke(_state("Explain the API flow"))
+
+    with pytest.raises(RuntimeError, match="ainvoke"):
+        asyncio.run(call_sync_from_loop())
+
+
+def test_async_pipeline_overlaps_concurrent_queries(monkeypatch):
+    async def slow_retrieve(**kwargs):
+        await asyncio.sleep(0.2)
+        return [Chunk(chunk_id="c1", file_path="a.py", content="def a(): pass", code_type="py:function",
+                      start_line=1, end_line=1, symbols=["a"])]
+
+    async def slow_achat(prompt, max_tokens=300):
+        await asyncio.sleep(0.2)
+        return "answer"
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.retrieval.rag.aretrieve_chunks", slow_retrieve)
+    monkeypatch.setattr("AI_Agent.graph.nodes.expansion.rag.expand_context", lambda **kwargs: [])
+    monkeypatch.setattr("AI_Agent.graph.nodes.reasoning.achat", slow_achat)
+
+    async def run_many():
+        graph = build_graph()
+        return await asyncio.gather(*(graph.ainvoke(_state(f"Explain part {i}")) for i in range(50)))
+
+    started = time.perf_counter()
+    states = asyncio.run(run_many())
+    elapsed = time.perf_counter() - started
+
+    assert all(s["explanation"] == "answer" for s in states)
+    # 50 queries x 0.4s of awaited I/O each would take 20s if serialized.
+    assert elapsed < 3
+
+
+def _slow_change_pipeline(monkeypatch, plan_json):
+    calls = []
+
+    async def slow_retrieve(**kwargs):
+        calls.append(kwargs.get("path_prefix"))
+        await asyncio.sleep(0.3)
+        return [Chunk(chunk_id=f"c{len(calls)}", file_path="a.py", content="def a(): pass",
+                      code_type="py:function", start_line=1, end_line=1, symbols=["a"])]
+
+    async def slow_plan(prompt, max_tokens=300):
+        await asyncio.sleep(0.3)
+        return plan_json
+
+    async def fast_propose(prompt, max_tokens=300):
+        return "diff --git a/a.py b/a.py"
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.retrieval.rag.aretrieve_chunks", slow_retrieve)
+    monkeypatch.setattr("AI_Agent.graph.nodes.planner.achat", slow_plan)
+    monkeypatch.setattr("AI_Agent.graph.nodes.expansion.rag.expand_context", lambda **kwargs: [])
+    monkeypatch.setattr("AI_Agent.graph.nodes.propose.achat", fast_propose)
+    monkeypatch.setattr("AI_Agent.graph.nodes.propose.git.store_bundle", lambda bundle: None)
+
+    state = asyncio.run(build_graph().ainvoke(_state("Add retries to the fetch helper")))
+    return state, calls
+
+
+def test_retrieval_nodes_fall_back_to_whole_repo_when_targets_are_unindexed(monkeypatch):
+    from AI_Agent.graph.nodes.retrieval import aretrieval_node, retrieval_node
+    from AI_Agent.schemas.plan import Plan
+
+    calls = []
+    hit = Chunk(chunk_id="c1", file_path="a.py", content="def a(): pass", code_type="py:function",
+                start_line=1, end_line=1, symbols=["a"])
+
+    def fake_retrieve(**kwargs):
+        calls.append(kwargs.get("path_prefix"))
+        return [] if kwargs.get("path_prefix") else [hit]
+
+    async def afake_retrieve(**kwargs):
+        return fake_retrieve(**kwargs)
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.retrieval.rag.retrieve_chunks", fake_retrieve)
+    monkeypatch.setattr("AI_Agent.graph.nodes.retrieval.rag.aretrieve_chunks", afake_retrieve)
+
+    def planned_state():
+        state = _state("Add retries to the fetch helper")
+        state["intent"] = Intent.MODIFY
+        state["plan"] = Plan(intent="Modify", steps=["edit"], target_files=["net/fetch.py"])
+        return state
+
+    assert retrieval_node(planned_state())["retrieved_chunks"] == [hit]
+    assert asyncio.run(aretrieval_node(planned_state()))["retrieved_chunks"] == [hit]
+    assert calls == [["net/fetch.py"], None, ["net/fetch.py"], None]
+
+
+def test_speculative_retrieval_overlaps_planning(monkeypatch):
+    state, calls = _slow_change_pipeline(
+        monkeypatch, '{"intent": "Modify", "steps": ["edit"], "requires_expansion": false}'
+    )
+
+    timings = state["timings"]
+    assert calls == [None]
+    assert [c.chunk_id for c in state["retrieved_chunks"]] == ["c1"]
+    assert timings["stages"]["retrieval:speculative"]["start_ms"] < timings["stages"]["planner"]["ms"]
+    assert timings["wall_ms"] < 500
+    assert timings["saved_ms"] > 200
+
+
+def test_speculative_retrieval_discarded_when_plan_targets_files(monkeypatch):
+    state, calls = _slow_change_pipeline(
+        monkeypatch,
+        '{"intent": "Modify", "steps": ["edit"], "requires_expansion": false, "target_files": ["net/fetch.py"]}',
+    )
+
+    assert calls == [None, ["net/fetch.py"]]
+    assert [c.chunk_id for c in state["retrieved_chunks"]] == ["c2"]
+    assert state["timings"]["stages"]["retrieval:speculative"]["discarded"] is True
+
+
+def test_tight_deadline_skips_optional_stages(monkeypatch):
+    from AI_Agent.graph.deadline import deadline_after
+    from AI_Agent.graph.nodes import reasoning
+
+    timeouts = []
+    tokens = []
+
+    def fake_retrieve(**kwargs):
+        timeouts.append(kwargs["timeout"])
+        return [Chunk(chunk_id="c1", file_path="a.py", content="x" * 5000, code_type="py:function",
+                      start_line=1, end_line=1, symbols=["a"])]
+
+    def fail_expand(**kwargs):
+        raise AssertionError("expansion should be skipped when the deadline is close")
+
+    def fake_chat(prompt, max_tokens=300):
+        tokens.append(max_tokens)
+        assert "x" * reasoning.MAX_CONTEXT_CHARS_PER_CHUNK not in prompt
+        return "short answer"
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.retrieval.rag.retrieve_chunks", fake_retrieve)
+    monkeypatch.setattr("AI_Agent.graph.nodes.expansion.rag.expand_context", fail_expand)
+    monkeypatch.setattr("AI_Agent.graph.nodes.reasoning.chat", fake_chat)
+
+    state = _state("Explain the API flow")
+    state["deadline"] = deadline_after(2000)
+    result = build_graph().invoke(state)
+
+    assert result["explanation"] == "short answer"
+    assert result["skipped_stages"] == ["expansion", "reasoning:full_context"]
+    assert 0 < timeouts[0] <= 2
+    assert tokens[0] < reasoning.REASONING_MAX_TOKENS
+
+
+def test_no_deadline_runs_every_stage(monkeypatch):
+    chat_kwargs = []
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.retrieval.rag.retrieve_chunks", lambda **kwargs: [])
+    monkeypatch.setattr("AI_Agent.graph.nodes.expansion.rag.expand_context", lambda **kwargs: [])
+    monkeypatch.setattr(
+        "AI_Agent.graph.nodes.reasoning.chat",
+        lambda prompt, **kwargs: chat_kwargs.append(kwargs) or "answer",
+    )
+
+    result = build_graph().invoke(_state("Explain the API flow"))
+
+    assert result["explanation"] == "answer"
+    assert not result.get("skipped_stages")
+    assert chat_kwargs == [{}]
+
+
+def _scored(chunk_id, code_type, score, symbols=("handler",)):
+    return Chunk(chunk_id=chunk_id, file_path="api.py", content=f"# {chunk_id}", code_type=code_type,
+                 start_line=1, end_line=2, symbols=list(symbols), score=score)
+
+
+def test_confident_covered_retrieval_skips_expansion(monkeypatch):
+    from AI_Agent.graph.confidence import CONFIDENT_MAX_TOKENS, pipeline_stats, reset_pipeline_stats
+
+    reset_pipeline_stats()
+    chat_calls = []
+    hits = [
+        _scored("fn", "py:function", 0.82),
+        _scored("imports", "py:imports", 0.78, symbols=()),
+        _scored("noise", "py:function", 0.41),
+    ]
+
+    def fail_expand(**kwargs):
+        raise AssertionError("expansion should be skipped when imports are already retrieved")
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.retrieval.rag.retrieve_chunks", lambda **kwargs: list(hits))
+    monkeypatch.setattr("AI_Agent.graph.nodes.expansion.rag.expand_context", fail_expand)
+    monkeypatch.setattr(
+        "AI_Agent.graph.nodes.reasoning.chat",
+        lambda prompt, **kwargs: chat_calls.append((prompt, kwargs)) or "answer",
+    )
+
+    result = build_graph().invoke(_state("Explain the API flow"))
+
+    assert [c.chunk_id for c in result["retrieved_chunks"]] == ["fn", "imports"]
+    assert result["confidence"]["path"] == "narrow"
+    prompt, kwargs = chat_calls[0]
+    assert "# noise" not in prompt
+    assert kwargs == {"max_tokens": CONFIDENT_MAX_TOKENS}
+    assert pipeline_stats()["decisions"] == {"narrow": 1}
+
+
+def test_low_scoring_imports_are_kept_when_they_justify_skipping_expansion():
+    from AI_Agent.graph.confidence import assess_retrieval
+
+    state = {
+        "session_id": "s-margin",
+        "retrieved_chunks": [
+            _scored("fn", "py:function", 0.80),
+            _scored("fn2", "py:function", 0.78),
+            _scored("imports", "py:imports", 0.50, symbols=()),
+            _scored("other", "py:function", 0.40),
+        ],
+    }
+
+    decision = assess_retrieval(state)
+
+    # The imports chunk is outside the score margin, but expansion is only
+    # skipped because it was retrieved, so it must reach the prompt.
+    assert decision["path"] == "narrow" and decision["expand"] is False
+    assert [c.chunk_id for c in state["retrieved_chunks"]] == ["fn", "fn2", "imports"]
+
+
+def test_uncovered_method_hit_still_expands(monkeypatch):
+    from AI_Agent.graph.confidence import pipeline_stats, reset_pipeline_stats
+
+    reset_pipeline_stats()
+    expanded = []
+    hits = [
+        _scored("method", "py:function", 0.9, symbols=("handle", "Api")),
+        _scored("imports", "py:imports", 0.85, symbols=()),
+    ]
+
+    def fake_expand(**kwargs):
+        expanded.append(kwargs["source_chunk_ids"])
+        return []
+
+    monkeypatch.setattr("AI_Agent.graph.nodes.retrieval.rag.retrieve_chunks", lambda **kwargs: list(hits))
+    monkeypatch.setattr("AI_Agent.graph.nodes.expansion.rag.expand_context", fake_expand)
+    monkeypatch.setattr("AI_Agent.graph.nodes.reasoning.chat", lambda prompt, **kwargs: "answer")
+
+    result = build_graph().invoke(_state("Explain the API flow"))
+
+    # The method's class header is missing, so same-file expansion still runs.
+    assert result["confidence"]["path"] == "expand"
+    assert expanded == [["method", "imports"]]
+    assert pipeline_stats()["latency_ms"]["expand"]["count"] == 1
@@ -0,0 +1,148 @@
+import copy
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+import backend.infra.db as db
+import backend.infra.generation as generation
+import backend.infra.storage as storage
+import backend.tasks.ingest.embedding.dispatcher as dispatcher
+import backend.tasks.ingest.ingest as ingest_module
+from backend.infra.numpy_store import NumpyVectorStore
+from backend.tasks.ingest.vector_store import file_vectors
+
+
+ALIAS = "code_embeddings"
+
+
+@pytest.fixture(params=["qdrant", "numpy"])
+def client(request, tmp_path, monkeypatch):
+    client = QdrantClient(":memory:") if request.param == "qdrant" else NumpyVectorStore(tmp_path / "vectors")
+    monkeypatch.setattr(db, "_client", client)
+    monkeypatch.setenv("QDRANT_COLLECTION_NAME", ALIAS)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def isolated_generations(monkeypatch):
+    # Ingests publish versions; keep them out of the process-wide state other tests see.
+    monkeypatch.setattr(generation, "_state", copy.deepcopy(generation._state))
+    monkeypatch.setattr(generation, "_signature", None)
+
+
+def _collection_with_point(client, name, point_id):
+    client.create_collection(name, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert(name, points=[PointStruct(id=point_id, vector=[1.0, 0.0], payload={"v": name})])
+
+
+def test_switch_alias_migrates_and_retires_previous_version(client):
+    _collection_with_point(client, ALIAS, 1)  # pre-alias deployment
+
+    first = db.next_collection_version()
+    _collection_with_point(client, first, 2)
+    assert db.switch_alias(first) is None
+    assert db.resolve_alias() == first
+
+    second = db.next_collection_version()
+    assert db.list_collection_versions() == [first]
+    _collection_with_point(client, second, 3)
+
+    # The alias still serves the first version while the second is built.
+    assert client.query_points(ALIAS, query=[1.0, 0.0], limit=1).points[0].id == 2
+
+    previous = db.switch_alias(second)
+    assert previous == first
+    assert client.query_points(ALIAS, query=[1.0, 0.0], limit=1).points[0].id == 3
+
+    db.drop_collection_later(previous, delay=0).join()
+    assert db.list_collection_versions() == [second]
+
+
+def test_ingest_builds_new_version_and_switches_alias(client, tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "notes.txt").write_text("blue green\n")
+
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path / "index")
+    monkeypatch.setattr(ingest_module, "clone_repo", lambda url: repo)
+    monkeypatch.setattr(ingest_module, "register_repo", lambda url, path: None)
+    monkeypatch.setattr(ingest_module, "drop_collection_later", lambda name: db.drop_collection_later(name, 0).join())
+    monkeypatch.setattr(dispatcher, "embed_text", lambda text: [0.6, 0.8])
+    monkeypatch.setattr(file_vectors, "embed_text", lambda text: [0.8, 0.6])
+
+    ingest_module.ingest("https://github.com/example/blue")
+    first = db.resolve_alias()
+    ingest_module.ingest("https://github.com/example/green")
+
+    assert db.resolve_alias() != first
+    assert db.list_collection_versions() == [db.resolve_alias()]
+    assert client.count(ALIAS, exact=True).count == 1
+    # The file-level companion alias moved in the same transaction.
+    assert client.count(f"{ALIAS}_files", exact=True).count == 1
+    assert len(client.get_collections().collections) == 2
+
+
+def test_side_stores_are_versioned_with_their_collection(client, tmp_path, monkeypatch):
+    from backend.infra.content_store import fetch_content
+    from backend.tasks.query.rag.grep import grep_for_agent
+
+    repo_url = "https://github.com/example/blue"
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    notes = repo / "notes.txt"
+    retired = []
+
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path / "index")
+    monkeypatch.setattr(ingest_module, "clone_repo", lambda url: repo)
+    monkeypatch.setattr(ingest_module, "register_repo", lambda url, path: None)
+    monkeypatch.setattr(ingest_module, "drop_collection_later", retired.append)
+    monkeypatch.setattr(dispatcher, "embed_text", lambda text: [0.6, 0.8])
+    monkeypatch.setattr(file_vectors, "embed_text", lambda text: [0.8, 0.6])
+
+    notes.write_text("blue version\n")
+    ingest_module.ingest(repo_url)
+    first = db.resolve_alias()
+    old_point = client.scroll(first, limit=1, with_payload=True)[0][0]
+
+    notes.write_text("green version\n")
+    ingest_module.ingest(repo_url)
+
+    # Inside the grace window the retired collection still reads its own bodies...
+    assert old_point.payload["index_version"] == first
+    assert fetch_content(repo_url, str(old_point.id), old_point.payload["index_version"]).startswith("blue")
+    # ...while grep follows the served version.
+    assert generation.active_index_version() == db.resolve_alias() != first
+    assert grep_for_agent("version", repo_url)[0]["text"] == "green version"
+
+    db.drop_collection_later(retired[0], delay=0).join()
+    assert not storage.version_data_dir(first).exists()
+    assert storage.version_data_dir(db.resolve_alias()).exists()
+
+
+def test_failed_ingest_writes_no_file_vectors_and_keeps_serving(client, tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for i in range(3):
+        (repo / f"notes_{i}.txt").write_text(f"note {i}\n")
+    embedded = []
+
+    def flaky_embed(text):
+        if len(embedded) == 2:
+            raise RuntimeError("embedding backend down")
+        embedded.append(text)
+        return [0.6, 0.8]
+
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path / "index")
+    monkeypatch.setattr(ingest_module, "clone_repo", lambda url: repo)
+    monkeypatch.setattr(ingest_module, "register_repo", lambda url, path: None)
+    monkeypatch.setattr(dispatcher, "INSERT_BATCH_SIZE", 1)
+    monkeypatch.setattr(dispatcher, "embed_text", flaky_embed)
+    monkeypatch.setattr(file_vectors, "embed_text", lambda text: pytest.fail("pooled a failed ingest"))
+
+    with pytest.raises(RuntimeError, match="embedding backend down"):
+        ingest_module.ingest("https://github.com/example/broken")
+
+    assert db.resolve_alias() is None
+    assert client.get_collections().collections == []
+    assert storage.list_version_data() == []
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import pytest
+
+import backend.infra.db as db
+import backend.infra.storage as storage
+import backend.tasks.ingest.embedding.dispatcher as dispatcher
+
+
+class FakeClient:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.events = []
+
+    def get_collection(self, collection_name):
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return SimpleNamespace(
+            status=SimpleNamespace(value=status),
+            config=SimpleNamespace(
+                optimizer_config=SimpleNamespace(indexing_threshold=20000, max_segment_size=None)
+            ),
+        )
+
+    def update_collection(self, collection_name, optimizers_config):
+        self.events.append(("update", optimizers_config.indexing_threshold, optimizers_config.max_segment_size))
+
+
+def test_process_repository_bulk_loads_in_batches(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for i in range(5):
+        (repo / f"notes_{i}.txt").write_text(f"note number {i}\n")
+
+    fake = FakeClient(["green", "yellow", "green"])
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path / "index")
+    monkeypatch.setattr(db, "get_qdrant_client", lambda: fake)
+    monkeypatch.setattr(db.time, "sleep", lambda _s: None)
+    monkeypatch.setenv("QDRANT_BULK_LOAD", "true")
+    monkeypatch.setattr(dispatcher, "INSERT_BATCH_SIZE", 2)
+    monkeypatch.setattr(dispatcher, "embed_text", lambda text: [0.1, 0.2])
+    monkeypatch.setattr(dispatcher, "FILE_VECTORS_ENABLED", False)
+    monkeypatch.setattr(dispatcher, "create_collection", lambda size, collection_name=None: fake.events.append(("create", size)))
+    monkeypatch.setattr(
+        dispatcher,
+        "insert_chunks",
+        lambda chunks, content_store=None, collection_name=None: fake.events.append(("insert", len(chunks))),
+    )
+
+    dispatcher.process_repository(repo, repo_url="https://github.com/example/bulk")
+
+    assert fake.events[0] == ("create", 2)
+    # The collection and its payload indexes are set up once, not per batch.
+    assert [e for e in fake.events if e[0] == "create"] == [("create", 2)]
+    assert fake.events[1] == ("update", 0, 1_000_000)
+    assert [e[1] for e in fake.events if e[0] == "insert"] == [2, 2, 1]
+    # Normal indexing is restored after the last batch, with an explicit segment
+    # size since an unset one cannot be cleared; then we wait for green.
+    assert fake.events[-1] == ("update", 20000, db.DEFAULT_MAX_SEGMENT_SIZE)
+    assert fake.statuses == ["green"]
+
+
+def test_failed_ingest_restores_settings_without_waiting(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for i in range(3):
+        (repo / f"notes_{i}.txt").write_text(f"note number {i}\n")
+
+    fake = FakeClient(["yellow"])
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path / "index")
+    monkeypatch.setattr(db, "get_qdrant_client", lambda: fake)
+    monkeypatch.setattr(db, "wait_for_green", lambda *a, **k: pytest.fail("waited on a failed ingest"))
+    monkeypatch.setenv("QDRANT_BULK_LOAD", "true")
+    monkeypatch.setattr(dispatcher, "INSERT_BATCH_SIZE", 1)
+    monkeypatch.setattr(dispatcher, "FILE_VECTORS_ENABLED", False)
+    monkeypatch.setattr(dispatcher, "create_collection", lambda size, collection_name=None: None)
+    monkeypatch.setattr(dispatcher, "insert_chunks", lambda chunks, content_store=None, collection_name=None: None)
+
+    embedded = []
+
+    def flaky_embed(text):
+        if embedded:
+            raise RuntimeError("embedding backend down")
+        embedded.append(text)
+        return [0.1, 0.2]
+
+    monkeypatch.setattr(dispatcher, "embed_text", flaky_embed)
+
+    with pytest.raises(RuntimeError, match="embedding backend down"):
+        dispatcher.process_repository(repo, repo_url="https://github.com/example/bulk")
+    assert fake.events[-1] == ("update", 20000, db.DEFAULT_MAX_SEGMENT_SIZE)
+
+
+def test_wait_for_green_raises_on_timeout(monkeypatch):
+    monkeypatch.setattr(db, "get_qdrant_client", lambda: FakeClient(["yellow"]))
+    monkeypatch.setattr(db.time, "sleep", lambda _s: None)
+
+    with pytest.raises(db.IndexingTimeout):
+        db.wait_for_green("code_embeddings", timeout=0)
+
+
+def test_bulk_load_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("QDRANT_BULK_LOAD", "false")
+    monkeypatch.setattr(db, "get_qdrant_client", lambda: (_ for _ in ()).throw(AssertionError("unused")))
+
+    assert db.begin_bulk_load("code_embeddings") is None
+    db.end_bulk_load(None)
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import backend.tasks.query.rag.agent_rag as agent_rag
+from backend.infra.cache import LRUCache
+from backend.infra.generation import bump_index_generation
+
+
+REPO = "https://github.com/example/chunk-repo"
+
+POINTS = {
+    "s1": {"file_path": "svc.py", "repo_url": REPO, "chunk_type": "python_function",
+           "identifier": "handle", "uses": ["build"], "chunk_number": 1, "content": "def handle(): build()"},
+    "c1": {"file_path": "svc.py", "repo_url": REPO, "chunk_type": "python_import",
+           "identifier": None, "uses": [], "chunk_number": 0, "content": "import os"},
+}
+
+
+class FakeClient:
+    def __init__(self):
+        self.retrieve_calls = []
+        self.scroll_calls = 0
+
+    def retrieve(self, ids, **kwargs):
+        self.retrieve_calls.append(list(ids))
+        return [SimpleNamespace(id=pid, payload=POINTS[pid]) for pid in ids if pid in POINTS]
+
+    def scroll(self, **kwargs):
+        self.scroll_calls += 1
+        return [SimpleNamespace(id=pid, payload=payload) for pid, payload in POINTS.items()], None
+
+
+def _setup(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(agent_rag, "get_qdrant_client", lambda: fake)
+    monkeypatch.setattr(agent_rag, "_chunk_cache", LRUCache(max_entries=16, max_bytes=1 << 20, sizeof=agent_rag._payload_size))
+    monkeypatch.setattr(agent_rag, "_candidate_cache", LRUCache(max_entries=16))
+    return fake
+
+
+def _expand():
+    return agent_rag.expand_context_for_agent(
+        repo_url=REPO,
+        source_chunk_ids=["s1"],
+        requested_code_types=["py:imports"],
+        scope="same_file",
+        max_chunks=3,
+    )
+
+
+def test_repeated_expansion_hits_no_qdrant_payload_reads(monkeypatch):
+    fake = _setup(monkeypatch)
+
+    first = _expand()
+    calls_after_first = (len(fake.retrieve_calls), fake.scroll_calls)
+    second = _expand()
+
+    assert [c["chunk_id"] for c in first] == ["c1"]
+    assert first == second
+    assert (len(fake.retrieve_calls), fake.scroll_calls) == calls_after_first
+
+
+def test_misses_are_batched_and_generation_invalidates(monkeypatch):
+    fake = _setup(monkeypatch)
+
+    points = agent_rag._retrieve_points(["s1", "c1", "missing"])
+    assert [str(p.id) for p in points] == ["s1", "c1"]
+    assert fake.retrieve_calls == [["s1", "c1", "missing"]]
+
+    bump_index_generation(REPO)
+    agent_rag._retrieve_points(["s1"])
+    assert fake.retrieve_calls[-1] == ["s1"]
+
+
+def test_slim_payloads_are_sized_by_their_metadata():
+    slim = {"file_path": "pkg/" + "deep/" * 40 + "svc.py", "repo_url": REPO, "chunk_type": "python_function",
+            "identifier": "handle", "uses": [f"helper_{i}" for i in range(200)], "start_line": 1, "end_line": 9}
+    assert "content" not in slim
+
+    size = agent_rag._payload_size((0, slim))
+    assert size > 2000
+    # The byte bound holds even though none of the entries carries a body.
+    cache = LRUCache(max_entries=100, max_bytes=size * 3, sizeof=agent_rag._payload_size)
+    for i in range(10):
+        cache.set(f"p{i}", (0, slim))
+    assert len(cache) == 3
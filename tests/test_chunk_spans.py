@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+from backend.tasks.ingest.embedding import blind_chunker, embedding_python
+from backend.tasks.query.rag.agent_rag import _build_adjacent_filter, _normalize_chunk
+from AI_Agent.tools.filesystem import FileSystemClient
+
+
+SOURCE = '''"""Module doc."""
+import os
+
+
+class Service:
+    limit = 3
+
+    @staticmethod
+    def handle(x):
+        return x
+
+
+def helper():
+    return os.getcwd()
+'''
+
+
+def test_python_chunker_emits_real_spans(tmp_path):
+    path = tmp_path / "svc.py"
+    path.write_text(SOURCE, encoding="utf-8")
+    source_bytes = SOURCE.encode("utf-8")
+
+    chunks = {c.get("identifier") or c["chunk_type"]: c for c in embedding_python.extract_chunks(path)}
+
+    handle = chunks["handle"]
+    assert (handle["start_line"], handle["end_line"]) == (8, 10)
+    assert source_bytes[handle["start_byte"]:handle["end_byte"]].decode().startswith("    @staticmethod")
+    assert (chunks["helper"]["start_line"], chunks["helper"]["end_line"]) == (13, 14)
+    assert (chunks["Service"]["start_line"], chunks["Service"]["end_line"]) == (5, 10)
+    assert chunks["python_import"]["start_line"] == 2
+
+
+def test_blind_chunker_tracks_lines_and_bytes(tmp_path):
+    text = "".join(f"line {i} é\n" for i in range(300))
+    path = tmp_path / "notes.txt"
+    path.write_text(text, encoding="utf-8")
+    encoded = text.encode("utf-8")
+
+    chunks = blind_chunker.extract_chunks(path)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert encoded[chunk["start_byte"]:chunk["end_byte"]].decode() == chunk["content"]
+        start_char = len(encoded[:chunk["start_byte"]].decode())
+        assert text.count("\n", 0, start_char) + 1 == chunk["start_line"]
+
+
+def test_normalize_chunk_uses_stored_spans_and_adjacent_filter_ranges():
+    point = SimpleNamespace(
+        id="p1",
+        payload={"file_path": "a.py", "content": "x = 1", "chunk_type": "python_top_level_code",
+                 "start_line": 40, "end_line": 41},
+    )
+
+    normalized = _normalize_chunk(point)
+    assert (normalized["start_line"], normalized["end_line"]) == (40, 41)
+
+    filt = _build_adjacent_filter([point], repo_url="https://github.com/example/repo")
+    window = filt.should[0].must
+    assert {cond.key for cond in window} == {"file_path", "start_line", "end_line"}
+
+
+def test_adjacent_filter_skips_chunks_without_a_full_span():
+    spans = [(None, None), (12, None), (None, 30)]
+    points = [
+        SimpleNamespace(id=f"p{i}", payload={"file_path": "page.html", "start_line": start, "end_line": end})
+        for i, (start, end) in enumerate(spans)
+    ]
+
+    assert _build_adjacent_filter(points, repo_url=None) is None
+
+
+def test_file_loader_slices_requested_regions(tmp_path):
+    (tmp_path / "big.py").write_text("\n".join(f"line{i}" for i in range(1, 101)), encoding="utf-8")
+
+    chunks = FileSystemClient().get_file_chunks("big.py", spans=[(10, 12), (12, 14), (50, 50)], root=tmp_path)
+
+    assert [(c.start_line, c.end_line) for c in chunks] == [(10, 14), (50, 50)]
+    assert chunks[0].content.splitlines()[0] == "line10"
+
+
+def test_expansion_uses_adjacent_scope_for_blind_chunks(monkeypatch):
+    from AI_Agent.graph.nodes.expansion import expansion_node
+    from AI_Agent.schemas.chunk import Chunk
+    from AI_Agent.schemas.intent import Intent
+    from AI_Agent.schemas.plan import Plan
+
+    calls = []
+    monkeypatch.setattr(
+        "AI_Agent.graph.nodes.expansion.rag.expand_context",
+        lambda **kwargs: calls.append(kwargs) or [],
+    )
+
+    def run(chunk):
+        expansion_node({
+            "intent": Intent.EXPLAIN,
+            "plan": Plan(intent="Explain", steps=[], requires_expansion=True),
+            "repo_url": "https://github.com/example/repo",
+            "retrieved_chunks": [chunk],
+        })
+        return calls[-1]
+
+    blind_point = SimpleNamespace(
+        id="b1",
+        payload={"file_path": "notes.txt", "content": "line 40\n", "chunk_type": "blind_chunk",
+                 "start_line": 40, "end_line": 60, "start_byte": 400, "end_byte": 600},
+    )
+    blind = run(Chunk(**_normalize_chunk(blind_point)))
+    assert blind["scope"] == "adjacent"
+    assert blind["requested_code_types"] == []
+
+    typed = run(Chunk(chunk_id="f1", file_path="svc.py", content="def f(): pass", code_type="py:function",
+                      start_line=3, end_line=4, symbols=["f"]))
+    assert typed["scope"] == "same_file"
+    assert typed["requested_code_types"] == ["py:imports", "py:class_header"]
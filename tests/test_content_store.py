@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import backend.infra.storage as storage
+import backend.tasks.ingest.vector_store.qdrant_store as qdrant_store
+from backend.infra.content_store import ContentStoreWriter, load_content_store
+from backend.tasks.query.rag.agent_rag import _normalize_chunk
+
+
+REPO = "https://github.com/example/content-repo"
+
+
+class FakeClient:
+    def __init__(self):
+        self.points = []
+
+    def upsert(self, collection_name, points):
+        self.points.extend(points)
+
+
+def test_content_store_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path)
+
+    writer = ContentStoreWriter(REPO)
+    writer.put("a", "def a():\n    return 'é'")
+    writer.put("b", "")
+    writer.close()
+
+    store = load_content_store(REPO)
+    assert store.get("a") == "def a():\n    return 'é'"
+    assert store.get("b") == ""
+    assert store.get("missing") is None
+
+
+def test_insert_chunks_keeps_bodies_out_of_qdrant_payload(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path)
+    fake = FakeClient()
+    monkeypatch.setattr(qdrant_store, "get_qdrant_client", lambda: fake)
+
+    writer = ContentStoreWriter(REPO)
+    chunk = {
+        "content": "import os",
+        "language": "python",
+        "chunk_type": "python_import",
+        "file_path": "a.py",
+        "chunk_number": 0,
+        "repo_url": REPO,
+        "start_line": 1,
+        "end_line": 1,
+        "embedding": [0.1, 0.2],
+    }
+    qdrant_store.insert_chunks([chunk], content_store=writer)
+    writer.close()
+
+    point = fake.points[0]
+    assert "content" not in point.payload
+    normalized = _normalize_chunk(SimpleNamespace(id=point.id, payload=point.payload))
+    assert normalized["content"] == "import os"
+
+
+def test_replaced_store_is_closed(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path)
+
+    writer = ContentStoreWriter(REPO)
+    writer.put("a", "old")
+    writer.close()
+    old = load_content_store(REPO)
+
+    writer = ContentStoreWriter(REPO)
+    writer.put("a", "new")
+    writer.close()
+
+    assert old._file.closed and old._mmap.closed
+    assert load_content_store(REPO).get("a") == "new"
+
+
+def test_async_retrieval_reads_bodies_off_the_event_loop(monkeypatch):
+    import asyncio
+    import threading
+
+    import backend.tasks.query.rag.agent_rag as agent_rag
+    import backend.tasks.query.rag.retrieve as retrieve
+
+    payload = {"repo_url": REPO, "file_path": "a.py", "chunk_type": "blind_chunk"}
+    slim = SimpleNamespace(id="p1", score=0.9, payload=payload)
+    readers = []
+
+    class AsyncFakeClient:
+        async def query_points(self, **kwargs):
+            return SimpleNamespace(points=[slim])
+
+    def fake_fetch(repo_url, point_id, version=None):
+        readers.append(threading.get_ident())
+        return "body"
+
+    async def fake_embed(query):
+        return [1.0, 0.0]
+
+    for module in (agent_rag, retrieve):
+        monkeypatch.setattr(module, "get_async_qdrant_client", lambda: AsyncFakeClient())
+        monkeypatch.setattr(module, "fetch_content", fake_fetch)
+    monkeypatch.setattr(agent_rag, "aembed_query", fake_embed)
+
+    async def run():
+        chunks = await agent_rag.aretrieve_chunks_for_agent("off-loop body read", 1, REPO, two_stage=False)
+        texts = await retrieve.aretrieve([1.0, 0.0], top_k=1)
+        return threading.get_ident(), chunks, texts
+
+    loop_thread, chunks, texts = asyncio.run(run())
+    assert chunks[0]["content"] == texts[0]["text"] == "body"
+    assert len(readers) == 2 and loop_thread not in readers
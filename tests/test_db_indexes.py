@@ -1,6 +1,7 @@
 from types import SimpleNamespace
 
 import backend.infra.db as db
+from qdrant_client.models import Datatype, ScalarQuantization, ScalarType
 
 
 class FakeClient:
@@ -8,10 +9,14 @@ class FakeClient:
         self.created = []
         self.collections = [SimpleNamespace(name="code_embeddings")]
 
+    def collection_exists(self, collection_name):
+        return any(c.name == collection_name for c in self.collections)
+
     def get_collections(self):
         return SimpleNamespace(collections=self.collections)
 
     def create_collection(self, **kwargs):
+        self.create_kwargs = kwargs
         self.collections.append(SimpleNamespace(name=kwargs["collection_name"]))
 
     def create_payload_index(self, **kwargs):
@@ -26,4 +31,51 @@ def test_create_collection_ensures_payload_indexes(monkeypatch):
     db.create_collection(768)
 
     fields = {name for name, _ in fake.created}
-    assert fields == {"repo_url", "file_path", "chunk_type"}
+    assert fields == {
+        "repo_url",
+        "file_path",
+        "chunk_type",
+        "language",
+        "path_prefixes",
+        "identifier",
+        "class_name",
+        "start_line",
+        "end_line",
+    }
+
+
+def test_create_collection_applies_storage_options(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(db, "get_qdrant_client", lambda: fake)
+    monkeypatch.setattr(db, "get_collection_name", lambda: "quantized")
+    monkeypatch.setenv("QDRANT_QUANTIZATION", "scalar")
+    monkeypatch.setenv("QDRANT_VECTOR_DATATYPE", "float16")
+    monkeypatch.setenv("QDRANT_VECTORS_ON_DISK", "true")
+    monkeypatch.setenv("QDRANT_HNSW_M", "32")
+    monkeypatch.delenv("QDRANT_HNSW_EF_CONSTRUCT", raising=False)
+
+    db.create_collection(768)
+
+    vectors = fake.create_kwargs["vectors_config"]
+    assert vectors.size == 768
+    assert vectors.on_disk is True
+    assert vectors.datatype == Datatype.FLOAT16
+    assert fake.create_kwargs["hnsw_config"].m == 32
+
+    quantization = fake.create_kwargs["quantization_config"]
+    assert isinstance(quantization, ScalarQuantization)
+    assert quantization.scalar.type == ScalarType.INT8
+
+
+def test_search_params_default_to_none_and_honour_overrides(monkeypatch):
+    for name in ("QDRANT_QUANTIZATION", "QDRANT_SEARCH_EF", "QDRANT_SEARCH_OVERSAMPLING"):
+        monkeypatch.delenv(name, raising=False)
+
+    assert db.get_search_params() is None
+
+    monkeypatch.setenv("QDRANT_QUANTIZATION", "binary")
+    monkeypatch.setenv("QDRANT_SEARCH_EF", "64")
+    params = db.get_search_params(oversampling=3.0)
+    assert params.hnsw_ef == 64
+    assert params.quantization.rescore is True
+    assert params.quantization.oversampling == 3.0
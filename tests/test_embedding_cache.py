@@ -0,0 +1,56 @@
+import backend.tasks.query.rag.embed_query as embed_query_module
+from backend.infra.cache import LRUCache, SQLiteCache, TieredCache
+
+
+def test_repeated_query_skips_embedding_call(monkeypatch):
+    calls = []
+
+    def fake_embed_text(text):
+        calls.append(text)
+        return [0.1, 0.2]
+
+    monkeypatch.setattr(embed_query_module, "embed_text", fake_embed_text)
+    monkeypatch.setattr(
+        embed_query_module,
+        "_embedding_cache",
+        TieredCache(memory=LRUCache(max_entries=8)),
+    )
+
+    first = embed_query_module.embed_query("What does   this repo do?")
+    second = embed_query_module.embed_query("  What does this repo do?\n")
+
+    assert first == second == [0.1, 0.2]
+    assert calls == ["What does this repo do?"]
+    assert embed_query_module._embedding_cache.stats()["memory"]["hits"] == 1
+
+
+def test_lru_evicts_by_entries_and_bytes():
+    cache = LRUCache(max_entries=2, max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    cache.get("a")
+    cache.set("c", "xxxx")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxxx"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_is_shared_and_promoted(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    writer = TieredCache(LRUCache(max_entries=4), SQLiteCache(path, table="t"))
+    writer.set("k", [1.0, 2.0])
+
+    reader = TieredCache(LRUCache(max_entries=4), SQLiteCache(path, table="t"))
+    assert reader.get("k") == [1.0, 2.0]
+    assert reader.memory.get("k") == [1.0, 2.0]
+
+
+def test_matryoshka_truncation_renormalizes(monkeypatch):
+    import backend.infra.llm as llm
+
+    monkeypatch.setattr(llm.ollama, "embeddings", lambda model, prompt: {"embedding": [3.0, 4.0, 12.0]})
+    monkeypatch.setattr(llm, "EMBEDDING_DIM", 2)
+
+    assert llm.embed_text("x") == [0.6, 0.8]
+    assert llm.truncate_embedding([3.0, 4.0, 12.0], None) == [3.0, 4.0, 12.0]
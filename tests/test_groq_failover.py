@@ -1,37 +1,85 @@
+import asyncio
+import threading
+import time
 from types import SimpleNamespace
 
+import pytest
+
 import AI_Agent.infra.llm as agent_llm
+import backend.infra.groq_pool as groq_pool
 import backend.infra.llm as backend_llm
+import backend.infra.llm_cache as llm_cache
+from backend.infra.cache import LRUCache, TieredCache
+from backend.infra.groq_pool import GroqPool, GroqPoolExhausted, TokenBucket, parse_duration
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_response_cache", TieredCache(memory=LRUCache(max_entries=64)))
 
 
 class RateLimitError(Exception):
-    def __init__(self, message="rate limit"):
+    def __init__(self, message="rate limit", retry_after="0.05"):
         super().__init__(message)
         self.status_code = 429
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+def _completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
 
 
 class FakeClient:
-    def __init__(self, outcomes):
-        self.outcomes = outcomes
-        self.call_idx = 0
-        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    """Mimics `client.chat.completions.with_raw_response.create` of the Groq SDK."""
 
-    def _create(self, **kwargs):
-        outcome = self.outcomes[self.call_idx]
-        self.call_idx += 1
+    def __init__(self, outcomes, headers=None):
+        self.outcomes = list(outcomes)
+        self.headers = headers or {}
+        self.calls = 0
+        raw = SimpleNamespace(create=self._create)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=raw))
+
+    def _next(self):
+        outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+        self.calls += 1
         if isinstance(outcome, Exception):
             raise outcome
-        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=outcome))])
+        return outcome
+
+    def _create(self, **kwargs):
+        outcome = self._next()
+        return SimpleNamespace(headers=self.headers, parse=lambda: _completion(outcome))
+
+
+class AsyncFakeClient(FakeClient):
+    async def _create(self, **kwargs):
+        outcome = self._next()
+
+        async def parse():
+            if kwargs.get("stream"):
+                return _stream(outcome)
+            return _completion(outcome)
+
+        return SimpleNamespace(headers=self.headers, parse=parse)
+
+
+async def _stream(deltas):
+    for delta in deltas:
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+
+def _pool(clients, **kwargs):
+    return GroqPool(
+        [f"key-{i}" for i in range(len(clients))],
+        client_factory=lambda key: clients[int(key.split("-")[1])],
+        async_client_factory=lambda key: clients[int(key.split("-")[1])],
+        **kwargs,
+    )
 
 
 def test_backend_groq_failover_to_second_key(monkeypatch):
     monkeypatch.setattr(backend_llm, "USE_GROQ", True)
-    monkeypatch.setattr(backend_llm, "_GROQ_START_INDEX", 0)
-    monkeypatch.setattr(
-        backend_llm,
-        "_GROQ_CLIENTS",
-        [FakeClient([RateLimitError()]), FakeClient(["ok-from-second"])],
-    )
+    monkeypatch.setattr(groq_pool, "_POOL", _pool([FakeClient([RateLimitError()]), FakeClient(["ok-from-second"])]))
 
     result = backend_llm.chat("hi", max_tokens=50)
     assert result == "ok-from-second"
@@ -39,12 +87,116 @@ def test_backend_groq_failover_to_second_key(monkeypatch):
 
 def test_agent_groq_failover_to_second_key(monkeypatch):
     monkeypatch.setattr(agent_llm, "USE_GROQ", True)
-    monkeypatch.setattr(agent_llm, "_GROQ_START_INDEX", 0)
-    monkeypatch.setattr(
-        agent_llm,
-        "_GROQ_CLIENTS",
-        [FakeClient([RateLimitError()]), FakeClient(["ok-agent-second"])],
-    )
+    monkeypatch.setattr(groq_pool, "_POOL", _pool([FakeClient([RateLimitError()]), FakeClient(["ok-agent-second"])]))
 
     result = agent_llm.chat("hi", max_tokens=50)
     assert result == "ok-agent-second"
+
+
+def test_async_groq_failover_to_second_key(monkeypatch):
+    for module, expected in ((backend_llm, "ok-async-backend"), (agent_llm, "ok-async-agent")):
+        clients = [AsyncFakeClient([RateLimitError()]), AsyncFakeClient([expected])]
+        monkeypatch.setattr(module, "USE_GROQ", True)
+        monkeypatch.setattr(groq_pool, "_POOL", _pool(clients))
+
+        assert asyncio.run(module.achat(f"hi from {expected}", max_tokens=50)) == expected
+
+
+def test_async_groq_stream_fails_over_before_first_token(monkeypatch):
+    async def collect(module):
+        return [delta async for delta in module.astream_chat("hi", max_tokens=50)]
+
+    clients = [AsyncFakeClient([RateLimitError()]), AsyncFakeClient([["to", "ken", None, "s"]])]
+    monkeypatch.setattr(backend_llm, "USE_GROQ", True)
+    monkeypatch.setattr(groq_pool, "_POOL", _pool(clients))
+
+    assert asyncio.run(collect(backend_llm)) == ["to", "ken", "s"]
+    assert groq_pool._POOL.stats()["keys"][1]["in_flight"] == 0
+
+
+def test_parse_duration_reads_groq_reset_headers():
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("3") == 3.0
+    assert parse_duration(None) is None
+
+
+def test_token_bucket_syncs_from_headers():
+    bucket = TokenBucket(6000)
+    now = time.monotonic()
+    bucket.sync(limit=6000, remaining=0, reset_s=6.0, now=now)
+
+    assert bucket.wait_for(500, now) == pytest.approx(0.5)
+    assert bucket.available(now + 6.0) == pytest.approx(6000)
+
+
+def test_pool_schedules_least_loaded_key_from_headers():
+    # The first key reports it is nearly out of tokens; the second has plenty.
+    low = FakeClient(["a"], headers={"x-ratelimit-limit-tokens": "6000", "x-ratelimit-remaining-tokens": "300",
+                                    "x-ratelimit-reset-tokens": "1m"})
+    high = FakeClient(["b"], headers={"x-ratelimit-limit-tokens": "6000", "x-ratelimit-remaining-tokens": "5500",
+                                     "x-ratelimit-reset-tokens": "5s"})
+    pool = _pool([low, high])
+
+    assert [pool.complete("m", "hi", 50) for _ in range(2)] == ["a", "b"]
+    # Key 0 now has ~300 tokens left, key 1 ~5500: the rest go to key 1.
+    assert [pool.complete("m", "hi", 50) for _ in range(3)] == ["b", "b", "b"]
+
+
+def test_pool_queues_until_a_key_refills_instead_of_failing():
+    client = FakeClient(["ok"], headers={"x-ratelimit-limit-requests": "10", "x-ratelimit-remaining-requests": "0",
+                                        "x-ratelimit-reset-requests": "200ms"})
+    pool = _pool([client], queue_timeout_s=2)
+
+    started = time.perf_counter()
+    assert pool.complete("m", "hi", 10) == "ok"
+    assert pool.complete("m", "hi", 10) == "ok"
+
+    # The second call waited for a request to refill (200ms / 10) rather than erroring.
+    assert time.perf_counter() - started >= 0.015
+    assert pool.stats()["queued"] == 1
+
+
+def test_pool_rejects_when_queue_timeout_is_too_short():
+    client = FakeClient(["ok"], headers={"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "30s",
+                                        "x-ratelimit-limit-requests": "10"})
+    pool = _pool([client], queue_timeout_s=0.1)
+
+    pool.complete("m", "hi", 10)
+    with pytest.raises(GroqPoolExhausted):
+        pool.complete("m", "hi", 10)
+    assert pool.stats()["rejected"] == 1
+
+
+def test_pool_is_consistent_under_threads_and_event_loops():
+    clients = [AsyncFakeClient(["x"]), AsyncFakeClient(["y"])]
+    sync_clients = [FakeClient(["x"]), FakeClient(["y"])]
+    pool = GroqPool(
+        ["key-0", "key-1"],
+        client_factory=lambda key: sync_clients[int(key[-1])],
+        async_client_factory=lambda key: clients[int(key[-1])],
+    )
+    for slot in pool.slots:
+        slot.requests = TokenBucket(10_000)
+        slot.tokens = TokenBucket(10_000_000)
+
+    def threaded():
+        for _ in range(25):
+            pool.complete("m", "hi", 10)
+
+    async def gathered():
+        await asyncio.gather(*(pool.acomplete("m", "hi", 10) for _ in range(50)))
+
+    threads = [threading.Thread(target=threaded) for _ in range(4)]
+    threads.append(threading.Thread(target=lambda: asyncio.run(gathered())))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = pool.stats()["keys"]
+    assert sum(k["calls"] for k in stats) == 150
+    assert all(k["in_flight"] == 0 for k in stats)
+    # Least-loaded scheduling spreads the work over both keys.
+    assert all(k["calls"] > 0 for k in stats)
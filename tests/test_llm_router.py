@@ -0,0 +1,334 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import backend.infra.llm as backend_llm
+import backend.infra.llm_cache as llm_cache
+import backend.infra.llm_router as llm_router
+from backend.infra.cache import LRUCache, TieredCache
+from backend.infra.llm_router import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LLMUnavailable, Provider
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(llm_router, "_BREAKERS", {})
+    monkeypatch.setattr(llm_cache, "_response_cache", TieredCache(memory=LRUCache(max_entries=64)))
+
+
+def _provider(name, outcomes, calls):
+    def complete(prompt, max_tokens):
+        calls.append(name)
+        outcome = outcomes.pop(0) if len(outcomes) > 1 else outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def acomplete(prompt, max_tokens):
+        return complete(prompt, max_tokens)
+
+    async def astream(prompt, max_tokens):
+        for delta in complete(prompt, max_tokens):
+            yield delta
+
+    return Provider(name, complete, acomplete, astream)
+
+
+def test_breaker_trips_after_consecutive_failures_and_probes_half_open():
+    breaker = CircuitBreaker("p", failure_threshold=3, open_s=0.05)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure(0.01)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only a single probe is let through while half-open.
+    assert not breaker.allow()
+
+    breaker.record_success(0.02)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["trips"] == 1
+
+
+def test_breaker_trips_on_error_rate():
+    breaker = CircuitBreaker("p", failure_threshold=100, error_rate=0.5, min_calls=4)
+    for ok in (True, False, True, False):
+        breaker.record_success(0.01) if ok else breaker.record_failure(0.01)
+
+    assert breaker.state == OPEN
+    assert breaker.stats()["error_rate"] == 0.5
+
+
+def test_failed_half_open_probe_reopens():
+    breaker = CircuitBreaker("p", failure_threshold=1, open_s=0)
+    breaker.record_failure(0.01)
+    assert breaker.allow()
+    breaker.record_failure(0.01)
+
+    assert breaker.state == OPEN
+    assert breaker.stats()["trips"] == 1
+
+
+def test_router_falls_back_and_stops_calling_a_down_provider():
+    calls = []
+    groq = _provider("groq", [TimeoutError("groq down")], calls)
+    local = _provider("ollama", ["local answer"], calls)
+
+    answers = [llm_router.complete([groq, local], f"question {i}", 10) for i in range(5)]
+
+    assert answers == ["local answer"] * 5
+    # After the breaker trips, requests go straight to the fallback.
+    assert calls.count("groq") == llm_router.BREAKER_FAILURE_THRESHOLD
+    assert llm_router.breaker_stats()["groq"]["state"] == OPEN
+    assert llm_router.breaker_stats()["groq"]["rejected"] == 5 - llm_router.BREAKER_FAILURE_THRESHOLD
+
+
+def test_router_raises_when_every_provider_fails():
+    calls = []
+    providers = [_provider("groq", [RuntimeError("a")], calls), _provider("ollama", [RuntimeError("b")], calls)]
+
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(llm_router.acomplete(providers, "hi", 10))
+
+
+def test_chat_falls_back_from_groq_to_ollama(monkeypatch):
+    calls = []
+    monkeypatch.setattr(backend_llm, "USE_GROQ", True)
+    monkeypatch.setattr(backend_llm, "GROQ", _provider("groq", [RuntimeError("all keys failed")], calls))
+    monkeypatch.setattr(backend_llm, "OLLAMA", _provider("ollama", ["from ollama"], calls))
+
+    assert backend_llm.chat("hi") == "from ollama"
+    assert calls == ["groq", "ollama"]
+
+
+def test_stream_falls_back_before_first_token():
+    calls = []
+    providers = [_provider("groq", [ConnectionError("refused")], calls), _provider("ollama", [["a", "b"]], calls)]
+
+    async def collect():
+        return [d async for d in llm_router.astream(providers, "hi", 10)]
+
+    assert asyncio.run(collect()) == ["a", "b"]
+    assert llm_router.breaker_stats()["ollama"]["calls"] == 1
+
+
+def _timed_provider(name, delay, answer, events, hedge_self=False):
+    async def acomplete(prompt, max_tokens):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            events.append(f"{name} cancelled")
+            raise
+        return answer
+
+    async def astream(prompt, max_tokens):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            events.append(f"{name} cancelled")
+            raise
+        for delta in answer:
+            yield delta
+
+    def complete(prompt, max_tokens):
+        return answer
+
+    return Provider(name, complete, acomplete, astream, hedge_self=hedge_self)
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_HEDGE", True)
+    monkeypatch.setattr(llm_router, "LLM_HEDGE_DEFAULT_DELAY_MS", 50)
+    monkeypatch.setattr(llm_router, "LLM_HEDGE_MIN_DELAY_MS", 10)
+    monkeypatch.setattr(llm_router, "_hedge_counters", {"requests": 0, "fired": 0, "backup_wins": 0, "saved_ms": 0.0})
+
+
+def test_hedge_fires_for_slow_primary_and_cancels_it(hedging):
+    events = []
+    providers = [_timed_provider("groq", 1.0, "slow", events), _timed_provider("ollama", 0.01, "fast", events)]
+
+    started = time.perf_counter()
+    assert asyncio.run(llm_router.acomplete(providers, "hi", 10)) == "fast"
+
+    assert time.perf_counter() - started < 0.5
+    assert events == ["groq cancelled"]
+    stats = llm_router.hedge_stats()
+    assert (stats["requests"], stats["fired"], stats["backup_wins"]) == (1, 1, 1)
+    # Cancelling the loser is not held against its breaker.
+    assert llm_router.breaker_stats()["groq"]["failures"] == 0
+
+
+def test_hedge_not_fired_when_primary_is_fast(hedging):
+    events = []
+    providers = [_timed_provider("groq", 0.0, "quick", events), _timed_provider("ollama", 0.0, "unused", events)]
+
+    assert asyncio.run(llm_router.acomplete(providers, "hi", 10)) == "quick"
+    assert llm_router.hedge_stats()["fired"] == 0
+    assert "ollama" not in llm_router.breaker_stats()
+
+
+def test_hedged_stream_takes_first_token_winner(hedging):
+    events = []
+    providers = [
+        _timed_provider("groq", 1.0, ["s", "low"], events, hedge_self=False),
+        _timed_provider("ollama", 0.01, ["fa", "st"], events),
+    ]
+
+    async def collect():
+        return [d async for d in llm_router.astream(providers, "hi", 10)]
+
+    assert asyncio.run(collect()) == ["fa", "st"]
+    assert events == ["groq cancelled"]
+    assert llm_router.hedge_stats()["backup_wins"] == 1
+
+
+def test_primary_failing_before_the_hedge_delay_falls_back_to_backup(hedging):
+    events = []
+
+    async def fail_fast(prompt, max_tokens):
+        events.append("groq")
+        raise RuntimeError("429 fast")
+
+    async def fail_fast_stream(prompt, max_tokens):
+        events.append("groq")
+        raise RuntimeError("429 fast")
+        yield  # pragma: no cover
+
+    groq = Provider("groq", lambda p, m: "unused", fail_fast, fail_fast_stream)
+    providers = [groq, _timed_provider("ollama", 0.0, ["local"], events)]
+
+    assert asyncio.run(llm_router.acomplete(providers, "hi", 10)) == ["local"]
+
+    async def collect():
+        return [d async for d in llm_router.astream(providers, "hi again", 10)]
+
+    assert asyncio.run(collect()) == ["local"]
+    assert events == ["groq", "groq"]
+    assert llm_router.hedge_stats()["fired"] == 0
+
+
+def test_hedging_is_off_by_default():
+    events = []
+    providers = [_timed_provider("groq", 0.1, "primary", events), _timed_provider("ollama", 0.0, "backup", events)]
+
+    assert asyncio.run(llm_router.acomplete(providers, "hi", 10)) == "primary"
+    assert "ollama" not in llm_router.breaker_stats()
+
+
+def test_groq_hedge_goes_to_a_different_key(hedging):
+    from backend.infra.groq_pool import GroqPool
+
+    used = []
+
+    class SlowFirstKey:
+        def __init__(self, index):
+            self.index = index
+            self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self.create)))
+
+        async def create(self, **kwargs):
+            used.append(self.index)
+            await asyncio.sleep(1.0 if self.index == 0 else 0.01)
+
+            async def parse():
+                return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"key-{self.index}"))])
+
+            return SimpleNamespace(headers={}, parse=parse)
+
+    pool = GroqPool(["k0", "k1"], async_client_factory=lambda key: SlowFirstKey(int(key[1])))
+    groq = Provider(
+        "groq",
+        lambda p, m: pool.complete("m", p, m),
+        lambda p, m: pool.acomplete("m", p, m),
+        lambda p, m: pool.astream("m", p, m),
+        hedge_self=True,
+    )
+
+    assert asyncio.run(llm_router.acomplete([groq], "hi", 10)) == "key-1"
+    assert used == [0, 1]
+    # The cancelled call released its reservation on key 0.
+    assert [k["in_flight"] for k in pool.stats()["keys"]] == [0, 0]
+
+
+def test_groq_hedges_onto_itself_only_with_several_keys(monkeypatch):
+    from backend.infra.groq_pool import GroqPool
+
+    providers = [backend_llm.GROQ, backend_llm.OLLAMA]
+
+    monkeypatch.setattr(backend_llm, "get_groq_pool", lambda: GroqPool(["k0"]))
+    assert llm_router._hedge_pair(providers) == (backend_llm.GROQ, backend_llm.OLLAMA)
+    assert llm_router._hedge_pair(providers[:1]) is None
+
+    monkeypatch.setattr(backend_llm, "get_groq_pool", lambda: GroqPool(["k0", "k1"]))
+    assert llm_router._hedge_pair(providers) == (backend_llm.GROQ, backend_llm.GROQ)
+
+
+def test_agent_uses_the_backend_groq_provider(monkeypatch):
+    import AI_Agent.infra.llm as agent_llm
+    from backend.infra.groq_pool import GroqPool
+
+    monkeypatch.setattr(agent_llm, "USE_GROQ", True)
+    monkeypatch.setattr(backend_llm, "get_groq_pool", lambda: GroqPool(["k0"]))
+
+    assert agent_llm.GROQ is backend_llm.GROQ
+    # A single key is never hedged onto itself on the agent path either.
+    assert llm_router._hedge_pair(agent_llm._providers()) == (backend_llm.GROQ, agent_llm.OLLAMA)
+
+
+def test_identical_prompt_is_served_from_response_cache():
+    calls = []
+    provider = _provider("ollama", ["generated"], calls)
+    provider.model = "llama3.2:3b"
+
+    assert llm_router.complete([provider], "same prompt", 10) == "generated"
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        assert llm_router.complete([provider], "same prompt", 10) == "generated"
+    per_hit = (time.perf_counter() - started) / 1000
+
+    assert calls == ["ollama"]
+    assert per_hit < 0.0005
+    # A different token budget is a different request.
+    llm_router.complete([provider], "same prompt", 20)
+    assert calls == ["ollama", "ollama"]
+
+
+def test_cache_key_covers_provider_model_budget_and_temperature():
+    keys = {
+        llm_cache.response_key("groq", "m", 100, None, "p"),
+        llm_cache.response_key("ollama", "m", 100, None, "p"),
+        llm_cache.response_key("groq", "m2", 100, None, "p"),
+        llm_cache.response_key("groq", "m", 200, None, "p"),
+        llm_cache.response_key("groq", "m", 100, 0, "p"),
+        llm_cache.response_key("groq", "m", 100, None, "p2"),
+    }
+    assert len(keys) == 6
+
+
+def test_completed_stream_is_cached_for_chat_and_stream(tmp_path):
+    from backend.infra.cache import SQLiteCache
+
+    llm_cache._response_cache = TieredCache(
+        memory=LRUCache(max_entries=8), disk=SQLiteCache(tmp_path / "llm.sqlite", table="llm_responses", ttl_seconds=60)
+    )
+    calls = []
+    provider = _provider("ollama", [["stre", "amed"]], calls)
+
+    async def collect():
+        return [d async for d in llm_router.astream([provider], "p", 10)]
+
+    assert asyncio.run(collect()) == ["stre", "amed"]
+    assert asyncio.run(collect()) == ["streamed"]
+    assert asyncio.run(llm_router.acomplete([provider], "p", 10)) == "streamed"
+    assert calls == ["ollama"]
+
+    # The disk tier survives a cold in-memory tier (e.g. another worker).
+    llm_cache._response_cache.memory.clear()
+    assert llm_router.complete([provider], "p", 10) == "streamed"
+    assert calls == ["ollama"]
@@ -55,3 +55,22 @@ def test_expand_context_uses_internal_path(monkeypatch):
     )
     assert len(chunks) == 1
     assert chunks[0].chunk_id == "2"
+
+
+def test_async_locate_forwards_exact_only(monkeypatch):
+    import asyncio
+
+    client = RAGClient()
+    client.BASE_URL = "http://localhost:8000"
+    client.USE_INTERNAL_RAG = True
+    calls = []
+
+    def fake_locate(symbol, repo_url, exact_only):
+        calls.append((symbol, exact_only))
+        return []
+
+    monkeypatch.setattr("backend.tasks.query.rag.agent_rag.locate_symbol_for_agent", fake_locate)
+
+    asyncio.run(client.alocate_symbol("config", "https://github.com/example/repo", exact_only=True))
+    asyncio.run(client.alocate_symbol("Config", "https://github.com/example/repo", timeout=5))
+    assert calls == [("config", True), ("Config", False)]
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import backend.tasks.query.rag.agent_rag as agent_rag
+from backend.infra.cache import LRUCache
+from backend.infra.generation import bump_index_generation, index_generation
+
+
+REPO = "https://github.com/example/cache-repo"
+
+
+class FakeClient:
+    def __init__(self):
+        self.queries = 0
+
+    def query_points(self, **kwargs):
+        self.queries += 1
+        return SimpleNamespace(
+            points=[SimpleNamespace(id="p1", payload={"file_path": "a.py", "content": "x = 1"})]
+        )
+
+
+def _setup(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(agent_rag, "get_qdrant_client", lambda: fake)
+    monkeypatch.setattr(agent_rag, "embed_query", lambda query: [0.0, 1.0])
+    monkeypatch.setattr(agent_rag, "_retrieval_cache", LRUCache(max_entries=16, ttl_seconds=60))
+    return fake
+
+
+def test_identical_retrieve_is_served_from_cache(monkeypatch):
+    fake = _setup(monkeypatch)
+
+    first = agent_rag.retrieve_chunks_for_agent("what is x?", 5, REPO)
+    second = agent_rag.retrieve_chunks_for_agent("  what is   x? ", 5, REPO)
+    agent_rag.retrieve_chunks_for_agent("what is x?", 3, REPO)
+
+    assert first == second
+    assert fake.queries == 2
+    assert agent_rag._retrieval_cache.stats()["hits"] == 1
+
+
+def test_ingest_generation_bump_invalidates_entries(monkeypatch):
+    fake = _setup(monkeypatch)
+
+    agent_rag.retrieve_chunks_for_agent("what is x?", 5, REPO)
+    before = index_generation(REPO)
+    bump_index_generation(REPO)
+    agent_rag.retrieve_chunks_for_agent("what is x?", 5, REPO)
+
+    assert index_generation(REPO) == before + 1
+    assert fake.queries == 2
+
+
+def test_generation_bump_from_another_worker_is_seen(tmp_path, monkeypatch):
+    import copy
+    import json
+
+    import backend.infra.generation as generation
+    import backend.infra.storage as storage
+
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path)
+    monkeypatch.setattr(generation, "GENERATION_CHECK_INTERVAL_S", 0)
+    # Keep this process's numbers for the other tests, which use the default data dir.
+    monkeypatch.setattr(generation, "_state", copy.deepcopy(generation._state))
+    monkeypatch.setattr(generation, "_signature", None)
+    before = index_generation(REPO)
+    bump_index_generation(REPO)
+    assert index_generation(REPO) == before + 1
+
+    # Another worker process ran an ingest and rewrote the shared file.
+    path = tmp_path / generation.GENERATION_FILE
+    state = json.loads(path.read_text())
+    state["base"] += 1
+    path.write_text(json.dumps(state) + " ")
+
+    assert index_generation(REPO) == before + 2
+    assert index_generation("https://github.com/example/other") == state["base"]
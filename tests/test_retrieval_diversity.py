@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from backend.tasks.query.rag.agent_rag import _diverse_chunks, _mmr_order
+
+
+TEXT = "alpha line\nbeta line\ngamma line\ndelta line\n"
+
+
+def _blind(pid, start, end, score, file_path="notes.txt"):
+    content = TEXT[start:end]
+    return SimpleNamespace(
+        id=pid,
+        score=score,
+        payload={
+            "file_path": file_path,
+            "chunk_type": "blind_chunk",
+            "content": content,
+            "start_byte": start,
+            "end_byte": end,
+            "start_line": TEXT.count("\n", 0, start) + 1,
+            "end_line": TEXT.count("\n", 0, start) + 1 + content.count("\n"),
+        },
+    )
+
+
+def test_overlapping_blind_chunks_merge_into_one_span():
+    points = [
+        _blind("b", 11, 32, 0.9),
+        _blind("a", 0, 21, 0.8),
+        _blind("c", 0, 10, 0.7, file_path="other.txt"),
+    ]
+
+    chunks = _diverse_chunks(points, top_k=2)
+
+    assert [c["chunk_id"] for c in chunks] == ["b", "c"]
+    merged = chunks[0]
+    assert merged["content"] == TEXT[0:32]
+    assert merged["start_line"] == 1 and merged["end_line"] == points[0].payload["end_line"]
+    assert merged["merged_chunk_ids"] == ["b", "a"]
+
+
+def test_mmr_order_prefers_novel_vectors():
+    points = [
+        SimpleNamespace(id="x", score=0.95, vector=[1.0, 0.0]),
+        SimpleNamespace(id="x2", score=0.94, vector=[0.99, 0.01]),
+        SimpleNamespace(id="y", score=0.60, vector=[0.0, 1.0]),
+    ]
+
+    assert [p.id for p in _mmr_order(points, 0.5)] == ["x", "y", "x2"]
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+
+import pytest
+
+import AI_Agent.app as app
+import backend.tasks.query.answer.semantic_cache as semantic_cache
+import backend.tasks.query.query as query
+from AI_Agent.memory.store import memory
+from backend.infra.generation import bump_index_generation, index_generation
+from backend.tasks.query.answer.semantic_cache import SemanticAnswerCache
+
+
+REPO = "https://github.com/example/repo"
+
+# Paraphrases sit close together, an unrelated question points elsewhere.
+VECTORS = {
+    "what does this project do?": [1.0, 0.0, 0.0],
+    "what is this project for?": [0.99, 0.05, 0.0],
+    "explain the ingest flow": [0.0, 1.0, 0.0],
+    "refactor the ingest flow": [0.0, 0.99, 0.05],
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_answer_cache(monkeypatch):
+    cache = SemanticAnswerCache(threshold=0.95, max_per_repo=8)
+    monkeypatch.setattr(semantic_cache, "_answer_cache", cache)
+    return cache
+
+
+def test_paraphrase_hits_and_unrelated_question_misses(fresh_answer_cache, caplog):
+    cache = fresh_answer_cache
+    cache.store("agent", REPO, VECTORS["what does this project do?"], "what does this project do?", "It indexes code.")
+
+    with caplog.at_level(logging.INFO, logger="backend.semantic_cache"):
+        hit = cache.lookup("agent", REPO, VECTORS["what is this project for?"], "what is this project for?")
+    assert hit.answer == "It indexes code."
+    assert hit.similarity > 0.95
+    # The audit log names both questions so false hits can be spotted.
+    assert "what is this project for?" in caplog.text and "what does this project do?" in caplog.text
+
+    assert cache.lookup("agent", REPO, VECTORS["explain the ingest flow"], "explain the ingest flow") is None
+    assert cache.lookup("query:[]", REPO, VECTORS["what is this project for?"], "what is this project for?") is None
+    assert cache.lookup("agent", "https://github.com/other/repo", [1.0, 0.0, 0.0], "q") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3
+    assert stats["hit_rate"] == 0.25
+    assert stats["recent_hits"][0]["cached_question"] == "what does this project do?"
+
+
+def test_reingest_invalidates_and_stale_answers_are_not_stored(fresh_answer_cache):
+    cache = fresh_answer_cache
+    cache.store("agent", REPO, [1.0, 0.0], "q", "old answer")
+
+    started_under = index_generation(REPO)
+    bump_index_generation(REPO)
+
+    assert cache.lookup("agent", REPO, [1.0, 0.0], "q") is None
+    assert cache.stats()["invalidations"] == 1
+    # An answer computed before the re-ingest finished must not repopulate the cache.
+    assert cache.store("agent", REPO, [1.0, 0.0], "q", "stale", generation=started_under) is False
+    assert cache.lookup("agent", REPO, [1.0, 0.0], "q") is None
+
+
+def test_each_repo_is_bounded_least_recently_hit_first():
+    cache = SemanticAnswerCache(threshold=0.99, max_per_repo=2)
+    cache.store("agent", REPO, [1.0, 0.0, 0.0], "a", "A")
+    cache.store("agent", REPO, [0.0, 1.0, 0.0], "b", "B")
+    cache.store("agent", "other", [0.0, 0.0, 1.0], "c", "C")
+    assert cache.lookup("agent", REPO, [1.0, 0.0, 0.0], "a").answer == "A"
+    cache.store("agent", REPO, [0.0, 0.0, 1.0], "d", "D")
+
+    assert cache.lookup("agent", REPO, [0.0, 1.0, 0.0], "b") is None
+    assert cache.lookup("agent", REPO, [1.0, 0.0, 0.0], "a").answer == "A"
+    assert cache.lookup("agent", "other", [0.0, 0.0, 1.0], "c").answer == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_query_paraphrase_skips_retrieval_and_llm(monkeypatch):
+    calls = []
+
+    async def fake_embed(question):
+        return VECTORS[question]
+
+    async def fake_retrieve(embedding, top_k, query_filter):
+        calls.append("retrieve")
+        return [{"file_path": "backend/main.py", "text": "app = FastAPI()"}]
+
+    async def fake_generate(question, chunks):
+        calls.append("llm")
+        return "It serves a RAG API."
+
+    monkeypatch.setattr(query, "aembed_query", fake_embed)
+    monkeypatch.setattr(query, "build_scope_filter", lambda *args: None)
+    monkeypatch.setattr(query, "aretrieve", fake_retrieve)
+    monkeypatch.setattr(query, "agenerate_answer", fake_generate)
+
+    assert asyncio.run(query.aquery_repo("what does this project do?", repo_url=REPO)) == "It serves a RAG API."
+    assert asyncio.run(query.aquery_repo("what is this project for?", repo_url=REPO)) == "It serves a RAG API."
+    assert calls == ["retrieve", "llm"]
+
+    # A different scope is a different question.
+    asyncio.run(query.aquery_repo("what is this project for?", repo_url=REPO, language="python"))
+    assert calls == ["retrieve", "llm", "retrieve", "llm"]
+
+    async def collect():
+        return [event async for event in query.astream_query_repo("what is this project for?", repo_url=REPO)]
+
+    assert asyncio.run(collect()) == [
+        ("retrieval", {"file_paths": ["backend/main.py"]}),
+        ("token", {"text": "It serves a RAG API."}),
+        ("done", {"answer": "It serves a RAG API."}),
+    ]
+    assert len(calls) == 4
+
+
+class FakeGraph:
+    def __init__(self, runs):
+        self.runs = runs
+
+    async def ainvoke(self, state):
+        self.runs.append(state["user_query"])
+        state["explanation"] = f"answer to {state['user_query']}"
+        return state
+
+
+def test_agent_reuses_answers_only_for_history_free_questions(monkeypatch):
+    runs = []
+
+    async def fake_embed(question):
+        return VECTORS[question]
+
+    monkeypatch.setattr(app, "aembed_query", fake_embed)
+    monkeypatch.setattr(app, "build_graph", lambda: FakeGraph(runs))
+
+    first = asyncio.run(app.arun_agent("what does this project do?", REPO, session_id="sem-1"))
+    second = asyncio.run(app.arun_agent("what is this project for?", REPO, session_id="sem-2"))
+
+    assert runs == ["what does this project do?"]
+    assert second["explanation"] == first["explanation"] == "answer to what does this project do?"
+    assert memory.get_history("sem-2")[-1]["response"] == "answer to what does this project do?"
+
+    # sem-2 now has history, so its follow-up goes through the graph.
+    asyncio.run(app.arun_agent("what does this project do?", REPO, session_id="sem-2"))
+    assert runs == ["what does this project do?", "what does this project do?"]
+
+
+def test_agent_does_not_cache_deadline_trimmed_answers(monkeypatch):
+    runs = []
+
+    class TrimmedGraph(FakeGraph):
+        async def ainvoke(self, state):
+            state = await super().ainvoke(state)
+            state["skipped_stages"] = ["expansion"]
+            return state
+
+    async def fake_embed(question):
+        return VECTORS[question]
+
+    monkeypatch.setattr(app, "aembed_query", fake_embed)
+    monkeypatch.setattr(app, "build_graph", lambda: TrimmedGraph(runs))
+
+    asyncio.run(app.arun_agent("explain the ingest flow", REPO, session_id="sem-3"))
+    asyncio.run(app.arun_agent("explain the ingest flow", REPO, session_id="sem-4"))
+    assert len(runs) == 2
+
+
+def test_agent_skips_cache_for_code_changes_and_locate(monkeypatch, fresh_answer_cache):
+    runs = []
+    embedded = []
+
+    async def fake_embed(question):
+        embedded.append(question)
+        return VECTORS[question]
+
+    monkeypatch.setattr(app, "aembed_query", fake_embed)
+    monkeypatch.setattr(app, "build_graph", lambda: FakeGraph(runs))
+
+    # A near-identical change request must not be answered with the cached explanation.
+    fresh_answer_cache.store("agent", REPO, VECTORS["explain the ingest flow"], "explain the ingest flow", "It clones.")
+    asyncio.run(app.arun_agent("refactor the ingest flow", REPO, session_id="sem-5"))
+    asyncio.run(app.arun_agent("where is `process_repository` defined?", REPO, session_id="sem-6"))
+
+    assert runs == ["refactor the ingest flow", "where is `process_repository` defined?"]
+    # Neither question paid for an embedding just to consult the cache.
+    assert embedded == []
@@ -0,0 +1,103 @@
+import backend.infra.storage as storage
+from backend.infra.trigram_index import TrigramIndex, TrigramIndexBuilder, load_trigram_index, plan_query
+from backend.tasks.query.rag.grep import grep_for_agent
+
+
+DOCS = [
+    {"chunk_id": "c1", "file_path": "rag.py", "content": "import os\nMAX_EXPAND_SCAN_POINTS = int(os.getenv('X', '1200'))"},
+    {"chunk_id": "c2", "file_path": "db.py", "content": "def get_qdrant_client():\n    return _client"},
+    {"chunk_id": "c3", "file_path": "llm.py", "content": "def embed_text(text):\n    return ollama.embeddings(text)"},
+]
+
+
+def test_literal_search_returns_line_of_match():
+    index = TrigramIndex.build(DOCS)
+
+    matches = index.search("MAX_EXPAND_SCAN_POINTS")
+
+    assert len(matches) == 1
+    assert matches[0]["chunk_id"] == "c1"
+    assert matches[0]["line"] == 2
+    assert matches[0]["text"].startswith("MAX_EXPAND_SCAN_POINTS =")
+
+
+def test_regex_search_uses_required_literals_and_verifies():
+    index = TrigramIndex.build(DOCS)
+
+    matches = index.search(r"def (get_qdrant|embed)_\w+", regex=True)
+
+    assert {m["file_path"] for m in matches} == {"db.py", "llm.py"}
+    assert plan_query(r"def (get_qdrant|embed)_\w+", regex=True) is not None
+
+
+def test_case_insensitive_search_and_unconstrained_regex():
+    index = TrigramIndex.build(DOCS)
+
+    assert index.search("max_expand", case_sensitive=False)[0]["chunk_id"] == "c1"
+    assert index.search("max_expand") == []
+    assert len(index.search(r"^\w", regex=True)) == 3
+
+
+def test_builder_persists_index_for_repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "INDEX_DATA_DIR", tmp_path)
+    repo_url = "https://github.com/example/repo"
+
+    builder = TrigramIndexBuilder()
+    for doc in DOCS:
+        builder.add({"id": doc["chunk_id"], "file_path": doc["file_path"], "content": doc["content"]})
+    builder.save(repo_url)
+
+    assert load_trigram_index(repo_url) is not None
+    matches = grep_for_agent("_client", repo_url=repo_url)
+    assert [m["chunk_id"] for m in matches] == ["c2", "c2"]
+    assert grep_for_agent("anything", repo_url="https://github.com/example/other") == []
+
+
+def test_stitched_chunks_report_real_file_lines(tmp_path):
+    from backend.tasks.ingest.embedding import embedding_python
+
+    source = (
+        "import os\n"
+        "\n"
+        "A = 1\n"
+        "\n"
+        "\n"
+        "def helper():\n"
+        "    return 1\n"
+        "\n"
+        "\n"
+        "B = 2\n"
+        "MAX_EXPAND_SCAN_POINTS = int(os.getenv('X', '1200'))\n"
+        "\n"
+        "\n"
+        "class Service:\n"
+        "    def run(self):\n"
+        "        return 1\n"
+        "\n"
+        "    LIMIT = 3\n"
+    )
+    path = tmp_path / "rag.py"
+    path.write_text(source, encoding="utf-8")
+
+    builder = TrigramIndexBuilder()
+    for chunk in embedding_python.extract_chunks(path):
+        builder.add({**chunk, "file_path": "rag.py"})
+    index = TrigramIndex.build(builder.docs)
+
+    assert index.search("MAX_EXPAND_SCAN_POINTS")[0]["line"] == 11
+    assert index.search("B = 2")[0]["line"] == 10
+    assert index.search("LIMIT = 3")[0]["line"] == 18
+    assert index.search("import os")[0]["line"] == 1
+
+
+def test_invalid_regex_is_a_client_error():
+    from fastapi.testclient import TestClient
+
+    import backend.main as main
+
+    response = TestClient(main.app).post(
+        "/rag/grep", json={"pattern": "def (unclosed", "regex": True, "repo_url": "https://github.com/example/repo"}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid regex: missing )")
@@ -0,0 +1,205 @@
+import asyncio
+import uuid
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    MatchAny,
+    MatchValue,
+    PointStruct,
+    Range,
+    VectorParams,
+)
+
+import backend.infra.db as db
+import backend.tasks.query.rag.agent_rag as agent_rag
+from backend.infra.cache import LRUCache
+from backend.infra.numpy_store import NumpyVectorStore
+from backend.tasks.ingest.vector_store import file_vectors
+from backend.tasks.ingest.vector_store.qdrant_store import path_prefixes
+
+
+REPO = "https://github.com/example/backend-repo"
+COLLECTION = "code_embeddings"
+
+CHUNKS = [
+    ([1.0, 0.0, 0.0], {"file_path": "svc.py", "chunk_type": "python_import", "start_line": 1, "end_line": 2,
+                       "uses": [], "content": "import os"}),
+    ([0.9, 0.1, 0.0], {"file_path": "svc.py", "chunk_type": "python_function", "identifier": "handle",
+                       "start_line": 4, "end_line": 9, "uses": ["build"], "content": "def handle(): build()"}),
+    ([0.0, 1.0, 0.0], {"file_path": "svc.py", "chunk_type": "python_function", "identifier": "build",
+                       "start_line": 40, "end_line": 44, "uses": [], "content": "def build(): pass"}),
+    ([0.0, 0.0, 1.0], {"file_path": "web.js", "chunk_type": "javascript_function", "identifier": "render",
+                       "start_line": 1, "end_line": 3, "uses": [], "content": "function render() {}"}),
+]
+
+
+@pytest.fixture(params=["qdrant", "numpy"])
+def store(request, tmp_path, monkeypatch):
+    client = QdrantClient(":memory:") if request.param == "qdrant" else NumpyVectorStore(tmp_path / "vectors")
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=3, distance=Distance.COSINE))
+    ids = [str(uuid.uuid4()) for _ in CHUNKS]
+    client.upsert(
+        COLLECTION,
+        points=[
+            PointStruct(id=pid, vector=vector, payload={**payload, "repo_url": REPO})
+            for pid, (vector, payload) in zip(ids, CHUNKS)
+        ],
+    )
+
+    monkeypatch.setattr(db, "_client", client)
+    monkeypatch.setenv("QDRANT_COLLECTION_NAME", COLLECTION)
+    monkeypatch.setattr(agent_rag, "embed_query", lambda query: [1.0, 0.05, 0.0])
+
+    async def fake_aembed_query(query):
+        return [1.0, 0.05, 0.0]
+
+    monkeypatch.setattr(agent_rag, "aembed_query", fake_aembed_query)
+    monkeypatch.setattr(agent_rag, "_retrieval_cache", LRUCache(max_entries=16))
+    monkeypatch.setattr(agent_rag, "_chunk_cache", LRUCache(max_entries=16))
+    monkeypatch.setattr(agent_rag, "_candidate_cache", LRUCache(max_entries=16))
+    monkeypatch.setattr(agent_rag, "_glob_cache", LRUCache(max_entries=16))
+    return client, ids
+
+
+def test_query_points_ranks_and_filters(store):
+    client, ids = store
+
+    ranked = client.query_points(COLLECTION, query=[1.0, 0.0, 0.0], limit=2).points
+    assert [p.id for p in ranked] == ids[:2]
+    assert ranked[0].score == pytest.approx(1.0, abs=1e-3)
+
+    js_only = Filter(must=[FieldCondition(key="chunk_type", match=MatchValue(value="javascript_function"))])
+    assert [p.id for p in client.query_points(COLLECTION, query=[1.0, 0.0, 0.0], limit=5, query_filter=js_only).points] == [ids[3]]
+
+
+def test_scroll_count_and_retrieve_share_filter_semantics(store):
+    client, ids = store
+    window = Filter(
+        must=[FieldCondition(key="file_path", match=MatchValue(value="svc.py"))],
+        should=[
+            FieldCondition(key="start_line", range=Range(lte=10)),
+            FieldCondition(key="uses", match=MatchAny(any=["nothing", "build"])),
+        ],
+        must_not=[FieldCondition(key="chunk_type", match=MatchValue(value="python_import"))],
+    )
+
+    points, _ = client.scroll(COLLECTION, scroll_filter=window, limit=10)
+    assert {p.id for p in points} == {ids[1]}
+    assert client.count(COLLECTION, count_filter=window, exact=True).count == 1
+    assert client.count(COLLECTION, exact=True).count == 4
+    assert [r.id for r in client.retrieve(COLLECTION, ids=[ids[2], "missing-id-0000"])] == [ids[2]]
+
+
+def test_agent_rag_paths_run_on_backend(store):
+    _client, ids = store
+
+    retrieved = agent_rag.retrieve_chunks_for_agent("handle", top_k=2, repo_url=REPO)
+    assert [c["chunk_id"] for c in retrieved] == ids[:2]
+
+    located = agent_rag.locate_symbol_for_agent("build", REPO)
+    assert [c["chunk_id"] for c in located] == [ids[2]]
+
+    adjacent = agent_rag.expand_context_for_agent(
+        repo_url=REPO,
+        source_chunk_ids=[ids[1]],
+        requested_code_types=["py:imports"],
+        scope="adjacent",
+        max_chunks=3,
+    )
+    assert [c["chunk_id"] for c in adjacent] == [ids[0]]
+
+
+def test_async_retrieval_matches_sync(store):
+    _client, _ids = store
+
+    for kwargs in ({}, {"diversity": "mmr"}, {"diversity": "group"}, {"path_glob": "*.py"}):
+        expected = agent_rag.retrieve_chunks_for_agent("handle", top_k=3, repo_url=REPO, **kwargs)
+        agent_rag._retrieval_cache.clear()
+        assert asyncio.run(agent_rag.aretrieve_chunks_for_agent("handle", top_k=3, repo_url=REPO, **kwargs)) == expected
+
+
+def test_numpy_store_persists_across_restarts(tmp_path):
+    path = tmp_path / "vectors"
+    first = NumpyVectorStore(path)
+    first.create_collection("c_v1", vectors_config=VectorParams(size=3, distance=Distance.COSINE))
+    first.upsert("c_v1", points=[PointStruct(id=7, vector=[0.0, 2.0, 0.0], payload={"k": "v"})])
+    first.upsert("c_v1", points=[PointStruct(id=7, vector=[0.0, 0.0, 3.0], payload={"k": "w"})])
+
+    reopened = NumpyVectorStore(path)
+    hit = reopened.query_points("c_v1", query=[0.0, 0.0, 1.0], limit=1).points[0]
+    assert (hit.id, hit.payload, reopened.count("c_v1").count) == (7, {"k": "w"}, 1)
+    assert hit.score == pytest.approx(1.0, abs=1e-3)
+
+
+def test_two_stage_retrieval_restricts_chunks_to_top_files(store, monkeypatch):
+    client, ids = store
+    monkeypatch.setattr(file_vectors, "FILE_PATH_WEIGHT", 0.0)
+    monkeypatch.setattr(agent_rag, "TWO_STAGE_TOP_FILES", 1)
+
+    builder = file_vectors.FileVectorBuilder(REPO)
+    for pid, (vector, payload) in zip(ids, CHUNKS):
+        builder.add({"file_path": payload["file_path"], "embedding": vector})
+    builder.save()
+
+    single = agent_rag.retrieve_chunks_for_agent("handle", top_k=4, repo_url=REPO)
+    two_stage = agent_rag.retrieve_chunks_for_agent("handle", top_k=4, repo_url=REPO, two_stage=True)
+
+    assert ids[3] in [c["chunk_id"] for c in single]
+    assert [c["chunk_id"] for c in two_stage] == ids[:3]
+
+
+def test_group_diversity_caps_chunks_per_file(store, monkeypatch):
+    _client, ids = store
+    monkeypatch.setattr(agent_rag, "MAX_CHUNKS_PER_FILE", 1)
+
+    chunks = agent_rag.retrieve_chunks_for_agent("handle", top_k=2, repo_url=REPO, diversity="group")
+
+    assert [c["chunk_id"] for c in chunks] == [ids[0], ids[3]]
+
+
+def test_mmr_diversity_skips_near_duplicates(store, monkeypatch):
+    _client, ids = store
+    monkeypatch.setattr(agent_rag, "MMR_LAMBDA", 0.5)
+
+    chunks = agent_rag.retrieve_chunks_for_agent("handle", top_k=2, repo_url=REPO, diversity="mmr")
+
+    assert [c["chunk_id"] for c in chunks] == [ids[0], ids[2]]
+
+
+def test_scope_filters_narrow_retrieval(store):
+    client, _ids = store
+    scoped = [
+        ("backend/tasks/jobs.py", "python", "python_function"),
+        ("backend/tasks/jobs.py", "python", "python_import"),
+        ("backend/web/app.js", "javascript", "javascript_function"),
+    ]
+    scoped_ids = [str(uuid.uuid4()) for _ in scoped]
+    client.upsert(
+        COLLECTION,
+        points=[
+            PointStruct(
+                id=pid,
+                vector=[1.0, 0.0, 0.0],
+                payload={"file_path": fp, "path_prefixes": path_prefixes(fp), "language": lang,
+                         "chunk_type": chunk_type, "content": fp, "repo_url": REPO},
+            )
+            for pid, (fp, lang, chunk_type) in zip(scoped_ids, scoped)
+        ],
+    )
+
+    def retrieved(**scope):
+        chunks = agent_rag.retrieve_chunks_for_agent("handle", top_k=10, repo_url=REPO, **scope)
+        return sorted(c["chunk_id"] for c in chunks)
+
+    assert retrieved(path_prefix="backend") == sorted(scoped_ids)
+    assert retrieved(path_prefix="./backend/tasks/") == sorted(scoped_ids[:2])
+    assert retrieved(path_prefix="backend/web/app.js") == [scoped_ids[2]]
+    assert retrieved(path_glob="backend/*/*.js") == [scoped_ids[2]]
+    assert retrieved(path_glob="docs/*.md") == []
+    assert retrieved(language="JavaScript") == [scoped_ids[2]]
+    assert retrieved(path_prefix="backend", code_type="py:function") == [scoped_ids[0]]
+    assert retrieved(path_prefix="backend", language="python", code_type=["py:imports", "js:function"]) == [scoped_ids[1]]